@@ -1,18 +1,57 @@
 from __future__ import annotations
 
 import os
-from contextlib import contextmanager
+import threading
+import time
+from contextlib import contextmanager, suppress
 from typing import Iterator, Mapping
 
+import httpx
 import psycopg2
 from flask import Flask, Response, current_app, g, jsonify, request, send_from_directory
 from psycopg2 import errors
 from psycopg2.extensions import cursor as PsycopgCursor
-from psycopg2.pool import SimpleConnectionPool
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from bounded_executor import ExecutorSaturated
+from data_version import read_data_version
 from database import resolve_connection_kwargs
-from querying import get_most_similar_courses
+from db_pool import PoolExhausted, ThreadSafeConnectionPool
+from embedding_cache import normalise_query
+from embeddings_gen import (
+    embedding_client,
+    inference_executor,
+    model_ready,
+    query_cache,
+    shared_query_cache,
+)
+from metrics import begin_request, metrics, request_timings, server_timing_header
+from querying import (
+    SEARCH_MODES,
+    BatchQuery,
+    get_course_equivalents,
+    get_hybrid_courses,
+    get_most_similar_courses,
+    get_most_similar_courses_batch,
+    get_most_similar_courses_in_memory,
+    get_most_similar_courses_in_memory_batch,
+    get_similar_to_course,
+    get_similar_to_course_in_memory,
+)
+from request_profiler import PROFILE_HEADER, RequestProfiler
+from response_cache import (
+    DEFAULT_MAX_AGE,
+    DEFAULT_VERSION_TTL,
+    CachedResponse,
+    DataVersionTracker,
+    ResponseCache,
+)
+from vector_index import default_search_knobs, search_knob
+from vector_search import InMemoryIndex, source_fingerprint
+
+SEARCH_BACKENDS = {"pgvector", "numpy"}
+MAX_BATCH_QUERIES = 100
+PROFILED_ENDPOINTS = {"search"}
 
 
 def create_app() -> Flask:
@@ -23,12 +62,133 @@ def create_app() -> Flask:
     # Honour reverse proxies such as load balancers (needed for production deployments).
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)  # type: ignore[arg-type]
 
+    app.config["VECTOR_EF_SEARCH"], app.config["VECTOR_PROBES"] = default_search_knobs()
+    app.config["SEARCH_BACKEND"] = os.getenv("SEARCH_BACKEND", "pgvector").lower()
+    if app.config["SEARCH_BACKEND"] not in SEARCH_BACKENDS:
+        raise ValueError(
+            f"SEARCH_BACKEND must be one of: {', '.join(sorted(SEARCH_BACKENDS))}"
+        )
+    app.config["SEARCH_MODE"] = os.getenv("SEARCH_MODE", "vector").lower()
+    if app.config["SEARCH_MODE"] not in SEARCH_MODES:
+        raise ValueError(f"SEARCH_MODE must be one of: {', '.join(SEARCH_MODES)}")
+    app.config["VECTOR_SNAPSHOT"] = os.getenv("VECTOR_SNAPSHOT") or None
+    app.config["VECTOR_INDEX"] = None
+    # Data version the index was loaded at; a reload bumps it, see _get_vector_index.
+    app.config["VECTOR_INDEX_VERSION"] = None
+    app.config["VECTOR_INDEX_LOCK"] = threading.Lock()
+    app.config["RESPONSE_CACHE"] = ResponseCache.from_env()
+    app.config["RESPONSE_CACHE_MAX_AGE"] = int(
+        os.getenv("RESPONSE_CACHE_MAX_AGE", str(DEFAULT_MAX_AGE))
+    )
+    app.config["DATA_VERSION"] = DataVersionTracker(
+        ttl=float(os.getenv("DATA_VERSION_TTL", str(DEFAULT_VERSION_TTL)))
+    )
+    app.config["SERVER_TIMING"] = os.getenv("SERVER_TIMING", "1") == "1"
+    app.config["PROFILER"] = RequestProfiler.from_env()
+
     _initialise_connection_pool(app)
+    if app.config["PROFILER"] is not None:
+        _register_profiler(app, app.config["PROFILER"])
+    _register_request_metrics(app)
     _register_routes(app)
 
     return app
 
 
+def _register_profiler(app: Flask, profiler: RequestProfiler) -> None:
+    """Profile sampled ``/search`` requests, or those sending the admin token.
+
+    Registered before the metrics hooks, so writing a profile is not counted
+    in the request's latency.
+    """
+
+    @app.before_request
+    def _start_profile() -> None:
+        if request.endpoint in PROFILED_ENDPOINTS:
+            g.profile = profiler.start(request.headers.get(PROFILE_HEADER))
+
+    @app.after_request
+    def _note_status(response: Response) -> Response:
+        if g.get("profile") is not None:
+            g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(_: BaseException | None) -> None:
+        session = g.pop("profile", None)
+        if session is None:
+            return
+        cursor = None
+        try:
+            payload = (
+                request.get_json(silent=True)
+                if request.method == "POST"
+                else request.args
+            )
+            connection = g.get("db_conn")
+            if connection is not None and not connection.closed:
+                cursor = connection.cursor()
+            path = profiler.finish(
+                session,
+                cursor=cursor,
+                details={
+                    "path": request.full_path,
+                    "method": request.method,
+                    "status": g.pop("profile_status", None),
+                    "query": (
+                        payload.get("query") if isinstance(payload, Mapping) else None
+                    ),
+                    "stages": {
+                        name: seconds * 1000
+                        for name, seconds in request_timings().items()
+                    },
+                },
+            )
+        except Exception:
+            # A teardown hook must not raise; the profile is simply lost.
+            current_app.logger.exception("Could not write request profile")
+            return
+        finally:
+            profiler.close(session)
+            if cursor is not None:
+                with suppress(psycopg2.Error):
+                    cursor.close()
+        current_app.logger.info("Wrote request profile %s", path)
+
+    @app.route("/admin/profiles", methods=["GET"])
+    def recent_profiles() -> Response:
+        if not profiler.authorised(request.headers.get(PROFILE_HEADER)):
+            return jsonify({"error": "Not found."}), 404
+        limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+        return jsonify({"profiles": profiler.store.recent(limit)})
+
+
+def _register_request_metrics(app: Flask) -> None:
+    """Time every request and report its stages in a ``Server-Timing`` header."""
+
+    @app.before_request
+    def _start_timer() -> None:
+        begin_request()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response: Response) -> Response:
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        metrics.observe("request_seconds", elapsed, endpoint=endpoint)
+        metrics.increment(
+            "requests_total", endpoint=endpoint, status=str(response.status_code)
+        )
+        if app.config["SERVER_TIMING"]:
+            timings = request_timings()
+            timings["total"] = elapsed
+            response.headers["Server-Timing"] = server_timing_header(timings)
+        return response
+
+
 def _register_routes(app: Flask) -> None:
     @app.route("/")
     def index() -> tuple[str, int] | str:
@@ -36,7 +196,35 @@ def _register_routes(app: Flask) -> None:
 
     @app.route("/healthz", methods=["GET"])
     def healthcheck() -> Response:
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "model": _model_status()})
+
+    @app.route("/readyz", methods=["GET"])
+    def readiness() -> Response:
+        status = _model_status(probe_remote=True)
+        if status not in {"ready", "remote"}:
+            return jsonify({"status": "starting", "model": status}), 503
+        return jsonify({"status": "ready", "model": status})
+
+    @app.route("/stats", methods=["GET"])
+    def stats() -> Response:
+        payload = {
+            "queryEmbeddingCache": query_cache.stats(),
+            "responseCache": app.config["RESPONSE_CACHE"].stats(),
+            "databasePool": app.config["DB_POOL"].stats(),
+        }
+        if shared_query_cache is not None:
+            payload["sharedQueryEmbeddingCache"] = shared_query_cache.stats()
+        if inference_executor is not None:
+            payload["embeddingExecutor"] = inference_executor.stats()
+        return jsonify(payload)
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics() -> Response:
+        """Prometheus text format; covers every worker when ``METRICS_PATH`` is set."""
+
+        return Response(
+            metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
 
     @app.route("/search", methods=["GET", "POST"])
     def search() -> Response:
@@ -60,53 +248,360 @@ def _register_routes(app: Flask) -> None:
 
         limit = max(1, min(limit, 50))
 
+        try:
+            ef_search = search_knob(
+                payload, "ef_search", app.config["VECTOR_EF_SEARCH"]
+            )
+            probes = search_knob(payload, "probes", app.config["VECTOR_PROBES"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "'ef_search' and 'probes' must be integers."}), 400
+
+        mode = str(payload.get("mode") or app.config["SEARCH_MODE"]).lower()
+        if mode not in SEARCH_MODES:
+            return jsonify(
+                {"error": f"'mode' must be one of: {', '.join(SEARCH_MODES)}."}
+            ), 400
+
         resolved_school = None if school in {"", "ALL", "*"} else school
+        response_cache: ResponseCache = app.config["RESPONSE_CACHE"]
 
         try:
-            with _get_db_cursor() as cursor:
-                results = get_most_similar_courses(
-                    cursor, query=query, school=resolved_school, limit=limit
+            version = app.config["DATA_VERSION"].get(_load_data_version)
+            cache_key = (
+                version,
+                normalise_query(query),
+                resolved_school,
+                limit,
+                mode,
+                ef_search,
+                probes,
+            )
+            cached = response_cache.get(cache_key)
+            metrics.cache_lookup("response", cached is not None)
+            # A profiled request runs the search even when a response is cached.
+            if cached is not None and g.get("profile") is None:
+                return _json_response(cached)
+
+            if mode == "hybrid":
+                results = _hybrid_search(
+                    query,
+                    school=resolved_school,
+                    limit=limit,
+                    ef_search=ef_search,
+                    probes=probes,
+                )
+            elif app.config["SEARCH_BACKEND"] == "numpy":
+                results = get_most_similar_courses_in_memory(
+                    _get_vector_index(),
+                    query=query,
+                    school=resolved_school,
+                    limit=limit,
                 )
-        except errors.UndefinedTable:
-            current_app.logger.exception(
-                "Database tables missing during search request"
+            else:
+                with _get_db_cursor() as cursor:
+                    results = get_most_similar_courses(
+                        cursor,
+                        query=query,
+                        school=resolved_school,
+                        limit=limit,
+                        ef_search=ef_search,
+                        probes=probes,
+                    )
+        except Exception as exc:
+            return _search_error_response(exc, "search")
+
+        with metrics.stage("serialise"):
+            body = app.json.dumps({"results": results}).encode("utf-8")
+        return _json_response(response_cache.put(cache_key, body, version=version))
+
+    @app.route("/search/batch", methods=["POST"])
+    def search_batch() -> Response:
+        """Vector search for many queries with one batched embedding pass.
+
+        Items that fail validation get an ``error`` entry in place; the rest
+        are answered together and returned in request order.
+        """
+
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, Mapping):
+            return jsonify({"error": "Request body must be a JSON object."}), 400
+        items = payload.get("queries")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'queries' must be a non-empty list."}), 400
+        if len(items) > MAX_BATCH_QUERIES:
+            return jsonify(
+                {"error": f"At most {MAX_BATCH_QUERIES} queries per batch."}
+            ), 400
+
+        try:
+            ef_search = search_knob(
+                payload, "ef_search", app.config["VECTOR_EF_SEARCH"]
             )
-            return (
-                jsonify(
-                    {
-                        "error": "Course data not initialised. Run the data loading scripts (make_dbs.py) and retry.",
-                    }
-                ),
-                503,
+            probes = search_knob(payload, "probes", app.config["VECTOR_PROBES"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "'ef_search' and 'probes' must be integers."}), 400
+
+        entries: list[dict] = []
+        queries: list[BatchQuery] = []
+        for item in items:
+            parsed = _parse_batch_item(item)
+            if isinstance(parsed, str):
+                entries.append({"error": parsed})
+            else:
+                entries.append({})
+                queries.append(parsed)
+
+        try:
+            if not queries:
+                batches = []
+            elif app.config["SEARCH_BACKEND"] == "numpy":
+                batches = get_most_similar_courses_in_memory_batch(
+                    _get_vector_index(), queries
+                )
+            else:
+                with _get_db_cursor() as cursor:
+                    batches = get_most_similar_courses_batch(
+                        cursor, queries, ef_search=ef_search, probes=probes
+                    )
+        except Exception as exc:
+            return _search_error_response(exc, "batch-search")
+
+        answered = iter(batches)
+        for entry in entries:
+            if "error" not in entry:
+                entry["results"] = next(answered)
+        with metrics.stage("serialise"):
+            return jsonify({"results": entries})
+
+    @app.route("/courses/<school>/<subject>/<number>/similar", methods=["GET"])
+    def similar_courses(school: str, subject: str, number: str) -> Response:
+        """Courses nearest to a catalog course, using its stored embedding only."""
+
+        try:
+            limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+            ef_search = search_knob(
+                request.args, "ef_search", app.config["VECTOR_EF_SEARCH"]
             )
-        except psycopg2.Error as exc:
-            current_app.logger.exception(
-                "Unexpected database error during search request"
+            probes = search_knob(request.args, "probes", app.config["VECTOR_PROBES"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "'ef_search' and 'probes' must be integers."}), 400
+
+        target = (request.args.get("school") or "").strip().upper()
+        target_school = None if target in {"", "ALL", "*"} else target
+        response_cache: ResponseCache = app.config["RESPONSE_CACHE"]
+
+        try:
+            version = app.config["DATA_VERSION"].get(_load_data_version)
+            cache_key = (
+                version,
+                "similar",
+                school.upper(),
+                subject.upper(),
+                number.upper(),
+                target_school,
+                limit,
+                ef_search,
+                probes,
             )
-            error_payload = {"error": "Search failed due to a database error."}
-            if exc.pgerror:
-                error_payload["detail"] = exc.pgerror.strip()
-            return jsonify(error_payload), 500
-        except Exception:
-            current_app.logger.exception("Unhandled error during search request")
-            return jsonify({"error": "Search failed due to an unexpected error."}), 500
+            cached = response_cache.get(cache_key)
+            metrics.cache_lookup("response", cached is not None)
+            if cached is not None:
+                return _json_response(cached)
+
+            if app.config["SEARCH_BACKEND"] == "numpy":
+                results = get_similar_to_course_in_memory(
+                    _get_vector_index(),
+                    school=school,
+                    subject=subject,
+                    number=number,
+                    target_school=target_school,
+                    limit=limit,
+                )
+            else:
+                with _get_db_cursor() as cursor:
+                    results = get_similar_to_course(
+                        cursor,
+                        school=school,
+                        subject=subject,
+                        number=number,
+                        target_school=target_school,
+                        limit=limit,
+                        ef_search=ef_search,
+                        probes=probes,
+                    )
+        except Exception as exc:
+            return _search_error_response(exc, "similar-courses")
+
+        if results is None:
+            return jsonify({"error": "Course not found."}), 404
+        with metrics.stage("serialise"):
+            body = app.json.dumps({"results": results}).encode("utf-8")
+        return _json_response(response_cache.put(cache_key, body, version=version))
+
+    @app.route("/courses/<school>/<subject>/<number>/equivalents", methods=["GET"])
+    def course_equivalents(school: str, subject: str, number: str) -> Response:
+        """Precomputed best matches at each other school (see course_equivalents.py)."""
+
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        target = (request.args.get("school") or "").strip().upper()
+        target_school = None if target in {"", "ALL", "*"} else target
+        response_cache: ResponseCache = app.config["RESPONSE_CACHE"]
+
+        try:
+            version = app.config["DATA_VERSION"].get(_load_data_version)
+            cache_key = (
+                version,
+                "equivalents",
+                school.upper(),
+                subject.upper(),
+                number.upper(),
+                target_school,
+                limit,
+            )
+            cached = response_cache.get(cache_key)
+            metrics.cache_lookup("response", cached is not None)
+            if cached is not None:
+                return _json_response(cached)
+
+            with _get_db_cursor() as cursor:
+                results = get_course_equivalents(
+                    cursor,
+                    school=school,
+                    subject=subject,
+                    number=number,
+                    target_school=target_school,
+                    limit=limit,
+                )
+        except Exception as exc:
+            return _search_error_response(exc, "course-equivalents")
 
-        return jsonify({"results": results})
+        if results is None:
+            return jsonify({"error": "Course not found."}), 404
+        with metrics.stage("serialise"):
+            body = app.json.dumps({"results": results}).encode("utf-8")
+        return _json_response(response_cache.put(cache_key, body, version=version))
 
 
-def _initialise_connection_pool(app: Flask) -> None:
-    minconn = int(os.getenv("DATABASE_MIN_CONNECTIONS", "1"))
-    maxconn = int(os.getenv("DATABASE_MAX_CONNECTIONS", "5"))
-    if maxconn < minconn:
-        raise ValueError(
-            "DATABASE_MAX_CONNECTIONS must be greater than or equal to DATABASE_MIN_CONNECTIONS"
+def _parse_batch_item(item: object) -> BatchQuery | str:
+    """Validate one ``/search/batch`` item, returning an error message on failure."""
+
+    if not isinstance(item, Mapping):
+        return "Each item must be an object."
+    query = str(item.get("query") or "").strip()
+    if not query:
+        return "'query' is required."
+    try:
+        limit = int(item.get("limit") or 10)
+    except (TypeError, ValueError):
+        return "'limit' must be an integer."
+    school = str(item.get("school") or "").strip().upper()
+    return BatchQuery(
+        query=query,
+        school=None if school in {"", "ALL", "*"} else school,
+        limit=max(1, min(limit, 50)),
+    )
+
+
+def _search_error_response(exc: Exception, request_kind: str) -> tuple[Response, int]:
+    if isinstance(exc, (PoolExhausted, ExecutorSaturated)):
+        current_app.logger.warning("Shedding %s request: %s", request_kind, exc)
+        response = jsonify({"error": "Server busy, retry shortly."})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    if isinstance(exc, httpx.HTTPError):
+        # EMBEDDING_SERVER_URL is down or slow; /readyz reports it as well.
+        current_app.logger.warning(
+            "Embedding server failed during %s request: %s", request_kind, exc
+        )
+        response = jsonify({"error": "Embedding service unavailable, retry shortly."})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    if isinstance(exc, errors.UndefinedTable):
+        current_app.logger.exception(
+            "Database tables missing during %s request", request_kind
+        )
+        return (
+            jsonify(
+                {
+                    "error": "Course data not initialised. Run the data loading scripts (make_dbs.py) and retry.",
+                }
+            ),
+            503,
+        )
+    if isinstance(exc, psycopg2.Error):
+        current_app.logger.exception(
+            "Unexpected database error during %s request", request_kind
+        )
+        error_payload = {"error": "Search failed due to a database error."}
+        if exc.pgerror:
+            error_payload["detail"] = exc.pgerror.strip()
+        return jsonify(error_payload), 500
+    current_app.logger.exception("Unhandled error during %s request", request_kind)
+    return jsonify({"error": "Search failed due to an unexpected error."}), 500
+
+
+def _hybrid_search(
+    query: str,
+    *,
+    school: str | None,
+    limit: int,
+    ef_search: int | None,
+    probes: int | None,
+) -> list[dict]:
+    vector_search = None
+    if current_app.config["SEARCH_BACKEND"] == "numpy":
+
+        def vector_search(candidates: int) -> list[dict]:
+            return get_most_similar_courses_in_memory(
+                _get_vector_index(), query=query, school=school, limit=candidates
+            )
+
+    with _get_db_cursor() as cursor:
+        return get_hybrid_courses(
+            cursor,
+            query=query,
+            school=school,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            vector_search=vector_search,
         )
 
+
+def _json_response(entry: CachedResponse) -> Response:
+    """Serve cached JSON bytes with validators so clients and proxies can reuse them."""
+
+    response = Response(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["RESPONSE_CACHE_MAX_AGE"]
+    return response.make_conditional(request)
+
+
+def _load_data_version() -> int:
+    with _get_db_cursor() as cursor:
+        return read_data_version(cursor)
+
+
+def _model_status(*, probe_remote: bool = False) -> str:
+    """Report whether this worker can embed queries without a cold model load.
+
+    With a remote embedding server, ``probe_remote`` asks it over HTTP;
+    otherwise the answer stays in-process and reports ``remote``.
+    """
+
+    if embedding_client is not None:
+        if not probe_remote:
+            return "remote"
+        return "remote" if embedding_client.healthy() else "unavailable"
+    return "ready" if model_ready() else "cold"
+
+
+def _initialise_connection_pool(app: Flask) -> None:
     connection_kwargs = resolve_connection_kwargs()
 
-    app.config["DB_POOL"] = SimpleConnectionPool(
-        minconn=minconn, maxconn=maxconn, **connection_kwargs
-    )
+    # Shared by every request thread; see db_pool for the timeout semantics.
+    app.config["DB_POOL"] = ThreadSafeConnectionPool.from_env(**connection_kwargs)
 
     @app.teardown_appcontext
     def _close_db_connection(_: Exception | None) -> None:
@@ -114,19 +609,81 @@ def _initialise_connection_pool(app: Flask) -> None:
         if not connection:
             return
 
-        # Always rollback to leave the connection in a clean state for the pool.
-        connection.rollback()
-        pool: SimpleConnectionPool = current_app.config["DB_POOL"]
+        pool: ThreadSafeConnectionPool = current_app.config["DB_POOL"]
+        try:
+            # Always rollback to leave the connection in a clean state for the pool.
+            connection.rollback()
+        except psycopg2.Error:
+            pool.putconn(connection, close=True)
+            return
         pool.putconn(connection)
 
 
 def _get_db_connection():
     if "db_conn" not in g:
-        pool: SimpleConnectionPool = current_app.config["DB_POOL"]
-        g.db_conn = pool.getconn()
+        pool: ThreadSafeConnectionPool = current_app.config["DB_POOL"]
+        with metrics.stage("pool_wait"):
+            g.db_conn = pool.getconn()
     return g.db_conn
 
 
+def _get_vector_index() -> InMemoryIndex:
+    """The in-memory embedding index, loaded on first use and after each reload.
+
+    The index is kept until the catalog data version moves, then loaded again
+    so searches never answer from a replaced catalog. When ``VECTOR_SNAPSHOT``
+    is set the index is memory-mapped from disk; a snapshot whose source
+    fingerprint no longer matches the database is ignored in favour of a
+    fresh load.
+    """
+
+    config = current_app.config
+    version = config["DATA_VERSION"].get(_load_data_version)
+    index = config["VECTOR_INDEX"]
+    if index is not None and config["VECTOR_INDEX_VERSION"] == version:
+        return index
+
+    with config["VECTOR_INDEX_LOCK"]:
+        index = config["VECTOR_INDEX"]
+        if index is None or config["VECTOR_INDEX_VERSION"] != version:
+            if index is not None:
+                current_app.logger.info(
+                    "Catalog data version moved to %s; reloading the vector index",
+                    version,
+                )
+            index = _load_vector_index(config["VECTOR_SNAPSHOT"])
+            config["VECTOR_INDEX"] = index
+            config["VECTOR_INDEX_VERSION"] = version
+    return index
+
+
+def _load_vector_index(snapshot_path: str | None) -> InMemoryIndex:
+    with _get_db_cursor() as cursor:
+        if snapshot_path:
+            try:
+                index = InMemoryIndex.from_snapshot(snapshot_path)
+            except (OSError, ValueError, KeyError) as exc:
+                problem = f"cannot be read ({exc})"
+            else:
+                if index.source_fingerprint == source_fingerprint(cursor):
+                    current_app.logger.info(
+                        "Mapped %d course embeddings from snapshot %s",
+                        len(index),
+                        (index.content_hash or "")[:16],
+                    )
+                    return index
+                problem = "is stale"
+            current_app.logger.warning(
+                "Snapshot %s %s; re-run export_snapshot.py. Loading from the database.",
+                snapshot_path,
+                problem,
+            )
+        index = InMemoryIndex.load(cursor)
+
+    current_app.logger.info("Loaded %d course embeddings into memory", len(index))
+    return index
+
+
 @contextmanager
 def _get_db_cursor() -> Iterator[PsycopgCursor]:
     connection = _get_db_connection()
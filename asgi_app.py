@@ -0,0 +1,338 @@
+"""Async variant of the search API for ``uvicorn asgi_app:app``.
+
+Serves ``/search`` (vector mode), ``/healthz``, ``/readyz`` and the built
+front-end like ``app.create_app``, but with asyncpg, so one process can hold
+many in-flight requests while they wait on PostgreSQL. Query embedding runs
+off the event loop; misses reach the model through the same bounded inference
+executor as the Flask app. Needs the ``async`` extra.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+import asyncpg
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+from bounded_executor import ExecutorSaturated
+from bulk_load import vector_literal
+from data_version import DATA_VERSION_SQL
+from database import resolve_connection_kwargs
+from db_pool import (
+    DEFAULT_ACQUIRE_TIMEOUT,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MIN_CONNECTIONS,
+)
+from embedding_cache import normalise_query
+from embeddings_gen import embed_query, embedding_client, model_ready, warm_up
+from querying import MAX_CHUNKS_SQL, CourseResult, map_row_to_result
+from response_cache import (
+    DEFAULT_MAX_AGE,
+    DEFAULT_VERSION_TTL,
+    CachedResponse,
+    DataVersionTracker,
+    ResponseCache,
+)
+from vector_index import (
+    EXTENSION_VERSION_SQL,
+    default_search_knobs,
+    has_iterative_scan,
+    nearest_hits_sql,
+    search_knob,
+    search_settings,
+    shortlist_size,
+)
+
+# Threads that run embed_query (cache lookups, then a wait on the inference
+# executor) so the event loop never blocks on the model.
+DEFAULT_EMBED_THREADS = 32
+
+# Whether the server's pgvector scans iteratively; looked up on the first
+# school-filtered search.
+_iterative_scan: Optional[bool] = None
+# Candidate rows per result, as in querying.candidate_factor.
+_max_chunks = DataVersionTracker(
+    ttl=float(os.getenv("DATA_VERSION_TTL", str(DEFAULT_VERSION_TTL)))
+)
+
+_HITS_SQL = nearest_hits_sql(
+    "$1::vector", where="WHERE $2::text IS NULL OR c.school = $2", limit="$3"
+)
+SEARCH_SQL = f"""
+    WITH hits AS ({_HITS_SQL})
+    SELECT
+        c.school,
+        c.subject,
+        c.number,
+        c.name,
+        c.description,
+        c.credit_hours,
+        min(h.cosine_distance) AS cosine_distance
+    FROM hits AS h
+    JOIN courses AS c ON c.id = h.course_id
+    GROUP BY c.id
+    ORDER BY cosine_distance
+    LIMIT $4
+"""
+
+
+class _AsyncDataVersion:
+    """``DataVersionTracker`` for the event loop: one lookup per ``ttl`` seconds."""
+
+    def __init__(self, *, ttl: float) -> None:
+        self.tracker = DataVersionTracker(ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    async def get(self, pool: asyncpg.Pool, *, timeout: float) -> int:
+        async with self._lock:
+            version = self.tracker.current()
+            if version is not None:
+                return version
+            async with pool.acquire(timeout=timeout) as connection:
+                try:
+                    version = await connection.fetchval(DATA_VERSION_SQL)
+                except asyncpg.UndefinedTableError:
+                    version = 0
+            return self.tracker.remember(version or 0)
+
+
+def create_asgi_app() -> Starlette:
+    """Create the ASGI application; the database pool opens on startup."""
+
+    ef_search, probes = default_search_knobs()
+    config: Dict[str, Any] = {
+        "VECTOR_EF_SEARCH": ef_search,
+        "VECTOR_PROBES": probes,
+        "DATABASE_POOL_TIMEOUT": float(
+            os.getenv("DATABASE_POOL_TIMEOUT", str(DEFAULT_ACQUIRE_TIMEOUT))
+        ),
+        "RESPONSE_CACHE_MAX_AGE": int(
+            os.getenv("RESPONSE_CACHE_MAX_AGE", str(DEFAULT_MAX_AGE))
+        ),
+    }
+    response_cache = ResponseCache.from_env()
+    data_version = _AsyncDataVersion(
+        ttl=float(os.getenv("DATA_VERSION_TTL", str(DEFAULT_VERSION_TTL)))
+    )
+
+    embed_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("ASGI_EMBED_THREADS", str(DEFAULT_EMBED_THREADS))),
+        thread_name_prefix="asgi-embed",
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        app.state.db_pool = await asyncpg.create_pool(
+            min_size=int(
+                os.getenv("DATABASE_MIN_CONNECTIONS", str(DEFAULT_MIN_CONNECTIONS))
+            ),
+            max_size=int(
+                os.getenv("DATABASE_MAX_CONNECTIONS", str(DEFAULT_MAX_CONNECTIONS))
+            ),
+            **_asyncpg_kwargs(resolve_connection_kwargs()),
+        )
+        if os.getenv("EMBEDDING_WARMUP", "1") == "1":
+            await asyncio.get_running_loop().run_in_executor(embed_executor, warm_up)
+        try:
+            yield
+        finally:
+            await app.state.db_pool.close()
+            embed_executor.shutdown(wait=False)
+
+    async def healthcheck(request: Request) -> Response:
+        return JSONResponse({"status": "ok", "model": await _model_status()})
+
+    async def readiness(request: Request) -> Response:
+        status = await _model_status(probe_remote=True)
+        if status not in {"ready", "remote"}:
+            return JSONResponse({"status": "starting", "model": status}, 503)
+        return JSONResponse({"status": "ready", "model": status})
+
+    async def search(request: Request) -> Response:
+        payload: Mapping[str, Any]
+        if request.method == "POST":
+            try:
+                payload = await request.json()
+            except ValueError:
+                payload = {}
+            if not isinstance(payload, Mapping):
+                payload = {}
+        else:
+            payload = request.query_params
+
+        query = str(payload.get("query") or "").strip()
+        school = str(payload.get("school") or "").strip().upper()
+        if not query:
+            return JSONResponse({"error": "'query' is required."}, 400)
+        try:
+            limit = max(1, min(int(payload.get("limit") or 10), 50))
+        except (TypeError, ValueError):
+            return JSONResponse({"error": "'limit' must be an integer."}, 400)
+        try:
+            ef_search = search_knob(payload, "ef_search", config["VECTOR_EF_SEARCH"])
+            probes = search_knob(payload, "probes", config["VECTOR_PROBES"])
+        except (TypeError, ValueError):
+            return JSONResponse(
+                {"error": "'ef_search' and 'probes' must be integers."}, 400
+            )
+        mode = str(payload.get("mode") or "vector").lower()
+        if mode != "vector":
+            return JSONResponse(
+                {"error": "The async service only supports mode 'vector'."}, 400
+            )
+
+        resolved_school = None if school in {"", "ALL", "*"} else school
+        pool: asyncpg.Pool = request.app.state.db_pool
+        timeout = config["DATABASE_POOL_TIMEOUT"]
+        try:
+            version = await data_version.get(pool, timeout=timeout)
+            cache_key = (
+                version,
+                normalise_query(query),
+                resolved_school,
+                limit,
+                mode,
+                ef_search,
+                probes,
+            )
+            cached = response_cache.get(cache_key)
+            if cached is None:
+                # Embed before taking a connection so none sits idle on the model.
+                embedding = await asyncio.get_running_loop().run_in_executor(
+                    embed_executor, embed_query, query
+                )
+                async with pool.acquire(timeout=timeout) as conn:
+                    results = await _nearest_courses(
+                        conn,
+                        vector_literal(embedding),
+                        school=resolved_school,
+                        limit=limit,
+                        ef_search=ef_search,
+                        probes=probes,
+                    )
+                body = json.dumps({"results": results}).encode("utf-8")
+                cached = response_cache.put(cache_key, body, version=version)
+        except (asyncio.TimeoutError, ExecutorSaturated):
+            return JSONResponse(
+                {"error": "Server busy, retry shortly."},
+                503,
+                headers={"Retry-After": "1"},
+            )
+        except httpx.HTTPError:
+            return JSONResponse(
+                {"error": "Embedding service unavailable, retry shortly."},
+                503,
+                headers={"Retry-After": "1"},
+            )
+        except asyncpg.UndefinedTableError:
+            return JSONResponse(
+                {
+                    "error": "Course data not initialised. Run the data loading scripts (make_dbs.py) and retry.",
+                },
+                503,
+            )
+        except asyncpg.PostgresError as exc:
+            error_payload = {"error": "Search failed due to a database error."}
+            if str(exc):
+                error_payload["detail"] = str(exc).strip()
+            return JSONResponse(error_payload, 500)
+
+        return _json_response(cached, request)
+
+    def _json_response(entry: CachedResponse, request: Request) -> Response:
+        headers = {
+            "ETag": f'"{entry.etag}"',
+            "Cache-Control": f"public, max-age={config['RESPONSE_CACHE_MAX_AGE']}",
+        }
+        candidates = request.headers.get("if-none-match", "").split(",")
+        if headers["ETag"] in {candidate.strip() for candidate in candidates}:
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    return Starlette(
+        routes=[
+            Route("/healthz", healthcheck, methods=["GET"]),
+            Route("/readyz", readiness, methods=["GET"]),
+            Route("/search", search, methods=["GET", "POST"]),
+            Mount(
+                "/",
+                StaticFiles(directory="client/dist", html=True, check_dir=False),
+                name="static",
+            ),
+        ],
+        lifespan=lifespan,
+    )
+
+
+async def _nearest_courses(
+    conn: asyncpg.Connection,
+    embedding: str,
+    *,
+    school: Optional[str],
+    limit: int,
+    ef_search: Optional[int],
+    probes: Optional[int],
+) -> List[CourseResult]:
+    """``querying._nearest_courses`` over asyncpg, with the same search knobs."""
+
+    global _iterative_scan
+    factor = _max_chunks.current()
+    if factor is None:
+        factor = _max_chunks.remember(await conn.fetchval(MAX_CHUNKS_SQL))
+    candidates = limit * factor
+    filtered = school is not None
+    if filtered and _iterative_scan is None:
+        _iterative_scan = has_iterative_scan(await conn.fetchval(EXTENSION_VERSION_SQL))
+    settings = search_settings(
+        limit=shortlist_size(candidates),
+        ef_search=ef_search,
+        probes=probes,
+        filtered=filtered,
+        iterative_scan=bool(_iterative_scan),
+    )
+    async with conn.transaction():
+        await conn.execute(
+            "SELECT "
+            + ", ".join(
+                f"set_config(${index}, ${index + 1}, true)"
+                for index in range(1, 2 * len(settings), 2)
+            ),
+            *[item for setting in settings.items() for item in setting],
+        )
+        rows = await conn.fetch(SEARCH_SQL, embedding, school, candidates, limit)
+    return [map_row_to_result(row) for row in rows]
+
+
+async def _model_status(*, probe_remote: bool = False) -> str:
+    """``app._model_status`` without blocking the event loop on the probe."""
+
+    if embedding_client is not None:
+        if not probe_remote:
+            return "remote"
+        healthy = await asyncio.to_thread(embedding_client.healthy)
+        return "remote" if healthy else "unavailable"
+    return "ready" if model_ready() else "cold"
+
+
+def _asyncpg_kwargs(connection_kwargs: Mapping[str, str]) -> Dict[str, Any]:
+    """Translate ``resolve_connection_kwargs`` output to asyncpg's argument names."""
+
+    kwargs = dict(connection_kwargs)
+    if "dbname" in kwargs:
+        kwargs["database"] = kwargs.pop("dbname")
+    if "port" in kwargs:
+        kwargs["port"] = int(kwargs["port"])
+    return kwargs
+
+
+app = create_asgi_app()
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import psycopg2
+
+from benchmarks.report import find_regressions, flatten
+from benchmarks.suites import (
+    DEFAULT_BATCH_SIZES,
+    DEFAULT_CONCURRENCY,
+    bench_embedding,
+    bench_http,
+    bench_loader,
+    bench_sql,
+)
+from benchmarks.workload import (
+    DEFAULT_QUERY_COUNT,
+    DEFAULT_SCHOOLS,
+    generate_queries,
+    load_queries,
+)
+from database import resolve_connection_kwargs
+from embeddings_gen import MODEL_KEY
+from vector_index import STORAGE
+
+SUITES = ("embedding", "sql", "http", "loader")
+DEFAULT_SUITES = ("embedding", "sql", "http")
+DEFAULT_TOLERANCE = 0.2
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _connection_kwargs(database_url: str | None) -> dict[str, str]:
+    if database_url:
+        return {"dsn": database_url}
+    return resolve_connection_kwargs()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark embedding, vector search, /search and the loaders.",
+    )
+    parser.add_argument(
+        "--suites",
+        nargs="+",
+        choices=SUITES,
+        default=list(DEFAULT_SUITES),
+        help="Suites to run (default: embedding sql http; loader rewrites data).",
+    )
+    parser.add_argument(
+        "--queries", help="File with one query per line instead of a generated set."
+    )
+    parser.add_argument(
+        "--schools",
+        nargs="+",
+        default=list(DEFAULT_SCHOOLS),
+        help="Catalogs the generated queries are drawn from.",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=DEFAULT_QUERY_COUNT,
+        help=f"Generated queries (default: {DEFAULT_QUERY_COUNT}).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--batch-sizes",
+        nargs="+",
+        type=int,
+        default=list(DEFAULT_BATCH_SIZES),
+        help="Batch sizes for the embedding suite.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        nargs="+",
+        type=int,
+        default=list(DEFAULT_CONCURRENCY),
+        help="Client threads per level for the http suite.",
+    )
+    parser.add_argument(
+        "--filter-school",
+        default="UNC",
+        help="School used for the filtered case of the sql suite (default: UNC).",
+    )
+    parser.add_argument(
+        "--loader-schools",
+        nargs="+",
+        default=["UNC"],
+        help="Schools the loader suite reloads (their rows are replaced).",
+    )
+    parser.add_argument(
+        "--loader-limit",
+        type=int,
+        help="Embed only the first N courses per school in the loader suite.",
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Optional PostgreSQL DSN to override config/env discovery.",
+    )
+    parser.add_argument("--output", help="Write the results JSON here.")
+    parser.add_argument(
+        "--baseline", help="Earlier results JSON; exit 1 if any metric regressed."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed relative slowdown against --baseline (default: {DEFAULT_TOLERANCE}).",
+    )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Confirm the loader suite may replace rows for --loader-schools.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if "loader" in args.suites and not args.yes:
+        print(
+            "The loader suite replaces course data for "
+            f"{', '.join(school.upper() for school in args.loader_schools)}; pass --yes."
+        )
+        sys.exit(2)
+
+    queries = (
+        load_queries(args.queries)
+        if args.queries
+        else generate_queries(args.schools, args.count, seed=args.seed)
+    )
+    results: Dict[str, Any] = {}
+    started = time.perf_counter()
+
+    if "embedding" in args.suites:
+        print(f"embedding: {len(queries)} queries…", flush=True)
+        results["embedding"] = bench_embedding(queries, batch_sizes=args.batch_sizes)
+
+    if {"sql", "loader"} & set(args.suites):
+        conn = psycopg2.connect(**_connection_kwargs(args.database_url))
+        cur = conn.cursor()
+        try:
+            if "sql" in args.suites:
+                print(f"sql: {len(queries)} queries × 2 cases…", flush=True)
+                results["sql"] = bench_sql(cur, queries, school=args.filter_school)
+            if "loader" in args.suites:
+                print("loader…", flush=True)
+                results["loader"] = bench_loader(
+                    conn, cur, args.loader_schools, embedding_limit=args.loader_limit
+                )
+        finally:
+            cur.close()
+            conn.close()
+
+    if "http" in args.suites:
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        print(f"http: concurrency {args.concurrency}…", flush=True)
+        results["http"] = bench_http(queries, concurrency_levels=args.concurrency)
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": MODEL_KEY,
+            "storage": STORAGE,
+            "searchBackend": os.getenv("SEARCH_BACKEND", "pgvector"),
+            "queries": len(queries),
+            "seed": args.seed,
+            "suites": args.suites,
+            "seconds": time.perf_counter() - started,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}.")
+    else:
+        print(json.dumps(report, indent=2))
+
+    failures = flatten(results)
+    failed_requests = sum(
+        value for name, value in failures.items() if name.endswith(".failures")
+    )
+    if failed_requests:
+        print(f"FAIL: {failed_requests:.0f} /search requests did not return 200.")
+        sys.exit(1)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = find_regressions(
+            results, baseline.get("results", {}), tolerance=args.tolerance
+        )
+        if regressions:
+            print(
+                f"FAIL: {len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}:"
+            )
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
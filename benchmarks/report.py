@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import statistics
+from typing import Dict, List, Mapping, Sequence
+
+# Metric names end in their unit; the suffix says which direction is worse.
+LOWER_IS_BETTER = ("_ms",)
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    """Mean and tail percentiles of per-operation latencies in milliseconds."""
+
+    if not latencies_ms:
+        return {"count": 0}
+    ordered = sorted(latencies_ms)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def flatten(results: Mapping[str, object], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested suite results into ``{"suite.case.metric": value}``."""
+
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, Mapping):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def find_regressions(
+    current: Mapping[str, object],
+    baseline: Mapping[str, object],
+    *,
+    tolerance: float,
+) -> List[str]:
+    """Describe every metric that got worse than ``baseline`` by more than ``tolerance``.
+
+    Only metrics present in both runs with a ``_ms`` or ``_per_s`` suffix are
+    compared; ``tolerance`` is a fraction (0.2 allows 20% drift).
+    """
+
+    now, before = flatten(current), flatten(baseline)
+    regressions: List[str] = []
+    for name in sorted(now.keys() & before.keys()):
+        old, new = before[name], now[name]
+        if old <= 0:
+            continue
+        if name.endswith(LOWER_IS_BETTER) and new > old * (1 + tolerance):
+            change = new / old - 1
+        elif name.endswith(HIGHER_IS_BETTER) and new < old * (1 - tolerance):
+            change = 1 - new / old
+        else:
+            continue
+        regressions.append(f"{name}: {old:.3f} -> {new:.3f} ({change:+.0%} worse)")
+    return regressions
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Sequence
+
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+
+from benchmarks.report import latency_summary
+from bulk_load import vector_literal
+from embeddings_gen import _embed_text, generate_embeddings, query_cache, warm_up
+from make_dbs import add_schools
+from querying import _nearest_courses
+
+DEFAULT_BATCH_SIZES = (1, 8, 32)
+DEFAULT_CONCURRENCY = (1, 4, 16)
+
+
+def bench_embedding(
+    queries: Sequence[str], *, batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES
+) -> Dict[str, Any]:
+    """Time the model alone: one forward pass per query, then padded batches.
+
+    Caches are bypassed. The model is loaded (and run once) before timing.
+    """
+
+    warm_up()
+    single: List[float] = []
+    for query in queries:
+        started = time.perf_counter()
+        _embed_text(query)
+        single.append((time.perf_counter() - started) * 1000)
+
+    results: Dict[str, Any] = {"single": latency_summary(single)}
+    for batch_size in batch_sizes:
+        per_batch: List[float] = []
+        for start in range(0, len(queries), batch_size):
+            batch = list(queries[start : start + batch_size])
+            started = time.perf_counter()
+            generate_embeddings(batch, batch_size=batch_size)
+            per_batch.append((time.perf_counter() - started) * 1000)
+        total_seconds = sum(per_batch) / 1000
+        results[f"batch_{batch_size}"] = {
+            **latency_summary(per_batch),
+            "queries_per_s": len(queries) / total_seconds if total_seconds else 0.0,
+        }
+    return results
+
+
+def bench_sql(
+    cur: Cursor,
+    queries: Sequence[str],
+    *,
+    school: str,
+    limit: int = 10,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> Dict[str, Any]:
+    """Time the pgvector query alone, unfiltered and filtered to ``school``.
+
+    Query vectors are computed up front, so only ``_nearest_courses`` (the
+    search-parameter round trip plus the scan) is measured. Each query runs in
+    its own transaction, as it does under the app.
+    """
+
+    literals = [vector_literal(row) for row in generate_embeddings(list(queries))]
+    results: Dict[str, Any] = {}
+    for case, case_school in (("all_schools", None), ("one_school", school)):
+        latencies: List[float] = []
+        for literal in literals:
+            started = time.perf_counter()
+            _nearest_courses(
+                cur,
+                literal,
+                school=case_school,
+                limit=limit,
+                ef_search=ef_search,
+                probes=probes,
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            cur.connection.rollback()
+        results[case] = latency_summary(latencies)
+    return results
+
+
+def bench_http(
+    queries: Sequence[str],
+    *,
+    concurrency_levels: Sequence[int] = DEFAULT_CONCURRENCY,
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """Time ``/search`` end to end through the Flask test client.
+
+    Each level sends every query once, split across that many threads, each
+    with its own client. The response cache is disabled and the query
+    embedding cache is cleared before every level, so each request embeds its
+    query, checks out a connection, scans and serialises.
+    """
+
+    # Imported late: app.py builds an app (and its pool) on import, and the
+    # response cache size is read when an app is created.
+    os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+    from app import create_app
+
+    warm_up()
+    app = create_app()
+    results: Dict[str, Any] = {}
+    for workers in concurrency_levels:
+        query_cache.clear()
+        latencies: List[float] = []
+        failures = 0
+        lock = threading.Lock()
+
+        def run(share: Sequence[str]) -> None:
+            nonlocal failures
+            client = app.test_client()
+            for query in share:
+                started = time.perf_counter()
+                response = client.get(
+                    "/search", query_string={"query": query, "limit": limit}
+                )
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    failures += response.status_code != 200
+
+        threads = [
+            threading.Thread(target=run, args=(queries[index::workers],))
+            for index in range(workers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        results[f"concurrency_{workers}"] = {
+            **latency_summary(latencies),
+            "requests_per_s": len(latencies) / wall if wall else 0.0,
+            "failures": failures,
+        }
+    return results
+
+
+def bench_loader(
+    conn: Connection,
+    cur: Cursor,
+    schools: Sequence[str],
+    *,
+    embedding_limit: int | None = None,
+    bulk: bool = True,
+) -> Dict[str, Any]:
+    """Time ``make_dbs.add_schools``, which replaces the schools' rows."""
+
+    started = time.perf_counter()
+    courses, embeddings = add_schools(
+        conn, cur, schools, embedding_limit=embedding_limit, bulk=bulk
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "courses": courses,
+        "embeddings": embeddings,
+        "total_ms": elapsed * 1000,
+        "embeddings_per_s": embeddings / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import List, Sequence
+
+from create_courses_table import _default_csv_for_school, _iter_course_rows
+from embedding_parity import SAMPLE_QUERIES
+
+DEFAULT_SCHOOLS = ("asu", "ncsu", "uiuc", "unc")
+DEFAULT_QUERY_COUNT = 200
+
+
+def generate_queries(
+    schools: Sequence[str] = DEFAULT_SCHOOLS,
+    count: int = DEFAULT_QUERY_COUNT,
+    *,
+    seed: int = 0,
+) -> List[str]:
+    """Build a deterministic query mix from the catalogs in ``coursedata/``.
+
+    Roughly a quarter each: course titles, title fragments, the opening words
+    of descriptions and hand-written topic queries, mimicking what users type.
+    The same schools, count and seed always give the same list.
+    """
+
+    rng = random.Random(seed)
+    courses = [
+        (name, description)
+        for school in schools
+        if _default_csv_for_school(school).exists()
+        for _, _, name, description, _ in _iter_course_rows(
+            _default_csv_for_school(school)
+        )
+    ]
+    if not courses:
+        raise FileNotFoundError(f"No catalog CSVs found for: {', '.join(schools)}")
+
+    queries: List[str] = []
+    while len(queries) < count:
+        kind = len(queries) % 4
+        name, description = rng.choice(courses)
+        if kind == 0:
+            queries.append(name)
+        elif kind == 1:
+            words = name.split()
+            queries.append(" ".join(words[: max(1, len(words) // 2)]).lower())
+        elif kind == 2 and description:
+            queries.append(" ".join(description.split()[: rng.randint(4, 12)]))
+        else:
+            queries.append(rng.choice(SAMPLE_QUERIES))
+    return queries
+
+
+def load_queries(path: str | Path) -> List[str]:
+    """Read one query per line, skipping blanks."""
+
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip()]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE_SIZE = 16
+
+
+class ExecutorSaturated(RuntimeError):
+    """Every worker is busy and the queue is full; the caller should shed load."""
+
+
+class BoundedExecutor:
+    """A thread pool that refuses work instead of queueing it without limit.
+
+    At most ``workers`` tasks run at once and at most ``queue_size`` more wait
+    for a worker. ``submit`` raises ``ExecutorSaturated`` immediately beyond
+    that, so request threads get a fast 503 rather than piling up behind the
+    model. Threads start on first use, so creating one before a fork is safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        name: str = "bounded",
+    ) -> None:
+        if workers < 1 or queue_size < 0:
+            raise ValueError("workers must be >= 1 and queue_size >= 0")
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, *, name: str) -> Optional[BoundedExecutor]:
+        """Build from ``<prefix>_WORKERS``/``<prefix>_QUEUE_SIZE``; ``0`` workers disables."""
+
+        workers = int(os.getenv(f"{prefix}_WORKERS", str(DEFAULT_WORKERS)))
+        if workers <= 0:
+            return None
+        return cls(
+            workers=workers,
+            queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE))),
+            name=name,
+        )
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(
+                f"{self.workers} workers busy and {self.queue_size} tasks queued"
+            )
+        with self._lock:
+            self.pending += 1
+        try:
+            # Run in a copy of the caller's context so per-request state such
+            # as the Server-Timing collector follows the task.
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, fn, *args, **kwargs)
+        except BaseException:
+            self._finish(None)
+            raise
+        future.add_done_callback(self._finish)
+        return future
+
+    def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``fn`` on a worker thread and wait for its result."""
+
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queueSize": self.queue_size,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def _finish(self, future: Future | None) -> None:
+        with self._lock:
+            self.pending -= 1
+            if future is not None:
+                self.completed += 1
+        self._slots.release()
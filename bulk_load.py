@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import csv
+import io
+import struct
+from typing import Any, Iterable, Iterator, Sequence
+
+import numpy as np
+from psycopg2 import sql
+from psycopg2.extensions import cursor as Cursor
+
+# Header and trailer of PostgreSQL's binary COPY format.
+_PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_PGCOPY_TRAILER = struct.pack("!h", -1)
+_NULL_FIELD = struct.pack("!i", -1)
+
+
+def vector_literal(values: Iterable[float]) -> str:
+    """Format a vector in pgvector's text form using float32 round-trip precision."""
+
+    return "[" + ",".join(f"{value:.9g}" for value in values) + "]"
+
+
+def copy_csv(
+    cur: Cursor,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+) -> None:
+    """Stream rows into ``table`` with a single ``COPY ... FROM STDIN (FORMAT csv)``."""
+
+    buffer = io.StringIO()
+    # Quote every field so empty strings stay empty instead of becoming NULL.
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerows(rows)
+    buffer.seek(0)
+
+    statement = _copy_statement(table, columns, "csv")
+    cur.copy_expert(statement, buffer)
+
+
+def copy_binary(
+    cur: Cursor,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+) -> None:
+    """Stream rows into ``table`` with one binary COPY, encoding fields lazily.
+
+    Supported field types are ``int`` (int4), ``float`` (float8), ``str``
+    (text), ``None`` and 1-D numpy arrays (pgvector ``vector``). Rows are pulled from ``rows`` as
+    PostgreSQL consumes the stream, so generators are never materialised.
+    """
+
+    statement = _copy_statement(table, columns, "binary")
+    chunks = _iter_binary_copy(rows, len(columns))
+    stream = io.BufferedReader(_IteratorReader(chunks))
+    cur.copy_expert(statement, stream)
+
+
+def _copy_statement(table: str, columns: Sequence[str], fmt: str) -> sql.Composed:
+    return sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT {fmt})").format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        fmt=sql.SQL(fmt),
+    )
+
+
+def _iter_binary_copy(rows: Iterable[Sequence[Any]], width: int) -> Iterator[bytes]:
+    yield _PGCOPY_HEADER
+    field_count = struct.pack("!h", width)
+    for row in rows:
+        yield field_count + b"".join(_encode_binary_field(value) for value in row)
+    yield _PGCOPY_TRAILER
+
+
+def _encode_binary_field(value: Any) -> bytes:
+    if value is None:
+        return _NULL_FIELD
+    if isinstance(value, np.ndarray):
+        # pgvector's binary input: int16 dimensions, int16 unused, float4 values.
+        header = struct.pack("!hh", value.shape[0], 0)
+        payload = header + value.astype(">f4").tobytes()
+    elif isinstance(value, bool):
+        raise TypeError("Boolean fields are not supported in binary COPY")
+    elif isinstance(value, int):
+        payload = struct.pack("!i", value)
+    elif isinstance(value, float):
+        payload = struct.pack("!d", value)
+    elif isinstance(value, str):
+        payload = value.encode("utf-8")
+    else:
+        raise TypeError(f"Unsupported binary COPY field type: {type(value).__name__}")
+    return struct.pack("!i", len(payload)) + payload
+
+
+class _IteratorReader(io.RawIOBase):
+    """Expose an iterator of byte chunks as a readable file for ``copy_expert``."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from selectolax.parser import HTMLParser
+
+CSV_HEADER = ("subject", "number", "name", "description", "credits")
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30.0
+USER_AGENT = "semanticsearch-catalog-scraper/0.1"
+# Retried after a backoff; other 4xx responses fail the page immediately.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class CourseRow:
+    subject: str
+    number: str
+    name: str
+    description: str
+    credits: str
+
+
+@dataclass(frozen=True)
+class CatalogSite:
+    """What a school's scraper plugs into ``scrape``.
+
+    ``parse_subjects`` maps subject names to page links on the index page, and
+    ``parse_courses`` yields the rows on one subject page.
+    """
+
+    name: str
+    index_url: str
+    parse_subjects: Callable[[HTMLParser], Dict[str, str]]
+    parse_courses: Callable[[HTMLParser], Iterable[CourseRow]]
+
+
+@dataclass(frozen=True)
+class Page:
+    url: str
+    text: str
+    from_cache: bool
+
+
+class PageCache:
+    """Response bodies and validators on disk, laid out by host and URL path.
+
+    ``https://catalog.unc.edu/courses/aero/`` is stored as
+    ``catalog.unc.edu/courses/aero/index.html`` next to an ``.headers.json``
+    holding its ``ETag`` and ``Last-Modified``. The same directory serves as
+    offline fixtures through ``transport``.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def path_for(self, url: str) -> Path:
+        parts = urlsplit(url)
+        path = parts.path.lstrip("/")
+        if not path or path.endswith("/"):
+            path += "index.html"
+        if parts.query:
+            path += "__" + hashlib.sha1(parts.query.encode("utf-8")).hexdigest()[:12]
+        return self.directory / parts.netloc / path
+
+    def get(self, url: str) -> tuple[str, Dict[str, str]] | None:
+        path = self.path_for(url)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        meta_path = _meta_path(path)
+        headers = (
+            json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta_path.exists()
+            else {}
+        )
+        return text, headers
+
+    def put(self, url: str, text: str, headers: Dict[str, str]) -> None:
+        path = self.path_for(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        _meta_path(path).write_text(json.dumps(headers), encoding="utf-8")
+
+    def transport(self) -> httpx.MockTransport:
+        """Serve cached pages only, answering ``404`` for anything missing."""
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            cached = self.get(str(request.url))
+            if cached is None:
+                return httpx.Response(404, request=request)
+            return httpx.Response(
+                200, text=cached[0], headers=cached[1], request=request
+            )
+
+        return httpx.MockTransport(handle)
+
+
+class PageFetcher:
+    """GET pages through one pooled client, with retries and conditional requests.
+
+    With a cache, a page is requested with ``If-None-Match``/``If-Modified-Since``
+    from its last fetch, and a ``304`` is answered from disk. Connection
+    errors and ``RETRY_STATUSES`` are retried ``retries`` times, backing off
+    exponentially from ``backoff`` seconds (or as long as ``Retry-After`` asks).
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        *,
+        cache: PageCache | None = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self._sleep = sleep
+
+    def fetch(self, url: str) -> Page:
+        cached = self.cache.get(url) if self.cache is not None else None
+        headers = {}
+        if cached is not None:
+            validators = cached[1]
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last-modified" in validators:
+                headers["If-Modified-Since"] = validators["last-modified"]
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.get(url, headers=headers)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+                self._sleep(self.backoff * 2**attempt)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._sleep(_retry_delay(response, self.backoff * 2**attempt))
+                continue
+            break
+
+        if response.status_code == 304 and cached is not None:
+            return Page(url, cached[0], from_cache=True)
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.put(
+                url,
+                response.text,
+                {
+                    key: response.headers[key]
+                    for key in ("etag", "last-modified")
+                    if key in response.headers
+                },
+            )
+        return Page(url, response.text, from_cache=False)
+
+
+class ResumableCsvWriter:
+    """Append rows to ``<output>.partial``, recording each finished subject.
+
+    After a subject's rows are flushed its name and the file's length go to
+    ``<output>.progress``. Reopening truncates the partial file to the last
+    recorded length, so a crash never leaves half a subject behind, and
+    ``done`` lists the subjects to skip. ``commit`` renames the partial file
+    over ``output``.
+    """
+
+    def __init__(self, output: str | Path, *, fresh: bool = False) -> None:
+        self.output = Path(output)
+        self.partial = self.output.with_name(self.output.name + ".partial")
+        self.progress = self.output.with_name(self.output.name + ".progress")
+        self.done: List[str] = []
+
+        offset = 0
+        if not fresh and self.partial.exists() and self.progress.exists():
+            for line in self.progress.read_text(encoding="utf-8").splitlines():
+                subject, _, length = line.rpartition("\t")
+                self.done.append(subject)
+                offset = int(length)
+        if offset:
+            self._file = self.partial.open("r+", newline="", encoding="utf-8")
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        else:
+            self.done = []
+            self.partial.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.partial.open("w", newline="", encoding="utf-8")
+            csv.writer(self._file).writerow(CSV_HEADER)
+            self._file.flush()
+            self.progress.write_text("", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def write_subject(self, subject: str, rows: Iterable[CourseRow]) -> int:
+        written = 0
+        for row in rows:
+            self._writer.writerow(
+                [row.subject, row.number, row.name, row.description, row.credits]
+            )
+            written += 1
+        self._file.flush()
+        with self.progress.open("a", encoding="utf-8") as progress:
+            progress.write(f"{subject}\t{self._file.tell()}\n")
+        self.done.append(subject)
+        return written
+
+    def commit(self) -> Path:
+        self._file.close()
+        self.partial.replace(self.output)
+        self.progress.unlink(missing_ok=True)
+        return self.output
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+@dataclass(frozen=True)
+class ScrapeResult:
+    subjects: int
+    rows: int
+    cached_pages: int
+    failed: Dict[str, str]
+
+
+def scrape(
+    site: CatalogSite,
+    fetcher: PageFetcher,
+    writer: ResumableCsvWriter,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    log: Callable[[str], None] = print,
+) -> ScrapeResult:
+    """Fetch every subject page concurrently and stream rows to ``writer`` in order.
+
+    Up to ``concurrency`` pages are in flight. Rows are written in index order
+    as soon as each page's predecessors are written, so memory holds at most
+    the in-flight pages. After a page fails for good, later pages are still
+    fetched (and cached) but not written, so a rerun resumes at the failed
+    subject with the CSV still in index order.
+    """
+
+    subjects = site.parse_subjects(HTMLParser(fetcher.fetch(site.index_url).text))
+    done = set(writer.done)
+    pending = [
+        (subject, urljoin(site.index_url, href))
+        for subject, href in subjects.items()
+        if subject not in done
+    ]
+    if writer.done:
+        log(f"Resuming after {len(writer.done)} finished subjects")
+
+    rows = cached = 0
+    failed: Dict[str, str] = {}
+
+    def fetch_rows(url: str) -> tuple[Page, List[CourseRow]]:
+        page = fetcher.fetch(url)
+        return page, list(site.parse_courses(HTMLParser(page.text)))
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix=f"scrape-{site.name}"
+    ) as executor:
+        for number, (subject, future) in enumerate(
+            _bounded_map(executor, fetch_rows, pending, window=concurrency * 2),
+            start=len(writer.done) + 1,
+        ):
+            try:
+                page, subject_rows = future.result()
+            except (httpx.HTTPError, AttributeError, IndexError) as exc:
+                failed[subject] = f"{type(exc).__name__}: {exc}"
+                log(f"failed {subject} ({number}/{len(subjects)}): {failed[subject]}")
+                continue
+            cached += page.from_cache
+            source = "unchanged" if page.from_cache else "fetched"
+            if failed:
+                log(f"cached {subject} for the next run ({number}/{len(subjects)})")
+                continue
+            rows += writer.write_subject(subject, subject_rows)
+            log(f"finished with {subject} ({number}/{len(subjects)}, {source})")
+
+    return ScrapeResult(
+        subjects=len(subjects), rows=rows, cached_pages=cached, failed=failed
+    )
+
+
+def _bounded_map(
+    executor: ThreadPoolExecutor,
+    fn: Callable[[str], tuple[Page, List[CourseRow]]],
+    items: Sequence[tuple[str, str]],
+    *,
+    window: int,
+) -> Iterator[tuple[str, Future]]:
+    """Yield ``(subject, future)`` in input order with at most ``window`` submitted."""
+
+    queue: deque[tuple[str, Future]] = deque()
+    remaining = iter(items)
+    for subject, url in remaining:
+        queue.append((subject, executor.submit(fn, url)))
+        if len(queue) >= window:
+            break
+    while queue:
+        yield queue.popleft()
+        for subject, url in remaining:
+            queue.append((subject, executor.submit(fn, url)))
+            break
+
+
+def _retry_delay(response: httpx.Response, default: float) -> float:
+    try:
+        return max(default, float(response.headers.get("retry-after", "")))
+    except ValueError:
+        return default
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_name(path.name + ".headers.json")
+
+
+def parse_args(site: CatalogSite, default_output: Path) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=f"Scrape the {site.name.upper()} course catalog into a CSV."
+    )
+    parser.add_argument(
+        "--output",
+        default=str(default_output),
+        help=f"CSV to write (default: {default_output}).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(Path(".cache") / "catalog-pages"),
+        help="Page cache for conditional re-scrapes (default: .cache/catalog-pages).",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Fetch every page without the cache."
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve pages from --cache-dir only (saved fixtures); no network.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Pages fetched at once (default: {DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Retries per page after a failure (default: {DEFAULT_RETRIES}).",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard an interrupted run's partial CSV instead of resuming it.",
+    )
+    return parser.parse_args()
+
+
+def run(site: CatalogSite, default_output: Path) -> None:
+    """Command-line entry point shared by the per-school scrapers."""
+
+    args = parse_args(site, default_output)
+    if args.offline and args.no_cache:
+        raise SystemExit("--offline reads pages from the cache; drop --no-cache.")
+
+    cache = None if args.no_cache else PageCache(args.cache_dir)
+    client = httpx.Client(
+        transport=cache.transport() if args.offline else None,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(
+            max_connections=args.concurrency,
+            max_keepalive_connections=args.concurrency,
+        ),
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True,
+    )
+    writer = ResumableCsvWriter(args.output, fresh=args.fresh)
+    try:
+        with client:
+            result = scrape(
+                site,
+                PageFetcher(
+                    client,
+                    # Offline pages come from the cache already; do not rewrite it.
+                    cache=None if args.offline else cache,
+                    retries=args.retries,
+                ),
+                writer,
+                concurrency=args.concurrency,
+            )
+    finally:
+        writer.close()
+
+    if result.failed:
+        raise SystemExit(
+            f"{len(result.failed)} subject page(s) failed: "
+            f"{', '.join(result.failed)}. Rerun to resume; "
+            f"{writer.partial} holds the subjects before them."
+        )
+    output = writer.commit()
+    print(
+        f"Wrote {result.rows} new rows for {len(writer.done)} subjects to {output} "
+        f"({result.cached_pages} pages unchanged)."
+    )
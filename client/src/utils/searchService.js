@@ -4,6 +4,48 @@ function resolveEndpoint(path) {
     return `${API_BASE_URL}${path}` || path;
 }
 
+async function readErrorMessage(response, fallback) {
+    let payload;
+    try {
+        payload = await response.json();
+    } catch (error) {
+        payload = null;
+    }
+
+    const message = payload?.error || fallback;
+    const detail = payload?.detail ? `: ${payload.detail}` : "";
+    return `${message}${detail}`;
+}
+
+export async function fetchSimilarCourses(course, targetSchool = "ALL", limit = 5) {
+    // Served from the stored course embedding, so no model work on the server.
+    const path = [course.school, course.subject, course.number]
+        .map((part) => encodeURIComponent(part))
+        .join("/");
+    const params = new URLSearchParams({ school: targetSchool, limit: String(limit) });
+    const response = await fetch(
+        `${resolveEndpoint(`/courses/${path}/similar`)}?${params}`,
+        {
+            method: "GET",
+            headers: {
+                Accept: "application/json",
+            },
+        }
+    );
+
+    if (!response.ok) {
+        throw new Error(
+            await readErrorMessage(
+                response,
+                `Similar courses request failed with status ${response.status}`
+            )
+        );
+    }
+
+    const payload = await response.json();
+    return Array.isArray(payload?.results) ? payload.results : [];
+}
+
 export async function sendSearchRequest(query, selectedCollege) {
     const trimmedQuery = query.trim();
 
@@ -11,33 +53,29 @@ export async function sendSearchRequest(query, selectedCollege) {
         return [];
     }
 
-    const response = await fetch(resolveEndpoint("/search"), {
-        method: "POST",
+    // GET keeps responses cacheable by the browser and any reverse proxy; the
+    // API answers with ETag/Cache-Control headers.
+    const params = new URLSearchParams({
+        query: trimmedQuery,
+        school: selectedCollege,
+    });
+    const response = await fetch(`${resolveEndpoint("/search")}?${params}`, {
+        method: "GET",
         headers: {
-            "Content-Type": "application/json",
             Accept: "application/json",
         },
-        body: JSON.stringify({
-            query: trimmedQuery,
-            school: selectedCollege,
-        }),
     });
 
-    let payload;
     if (!response.ok) {
-        try {
-            payload = await response.json();
-        } catch (error) {
-            payload = null;
-        }
-
-        const message =
-            payload?.error || `Search request failed with status ${response.status}`;
-        const detail = payload?.detail ? `: ${payload.detail}` : "";
-        throw new Error(`${message}${detail}`);
+        throw new Error(
+            await readErrorMessage(
+                response,
+                `Search request failed with status ${response.status}`
+            )
+        );
     }
 
-    payload = await response.json();
+    const payload = await response.json();
 
     if (Array.isArray(payload)) {
         return payload;
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import argparse
+import resource
+import time
+import tracemalloc
+from typing import Dict, Iterator, Sequence
+
+import numpy as np
+import psycopg2
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+
+from bulk_load import copy_binary
+from data_version import bump_data_version
+from database import resolve_connection_kwargs
+from vector_search import InMemoryIndex
+
+DEFAULT_TOP_K = 10
+DEFAULT_BLOCK_SIZE = 1024
+
+EquivalentRow = tuple[int, int, str, int, float]
+
+
+def compute_equivalents(
+    index: InMemoryIndex,
+    sources: Sequence[str],
+    *,
+    k: int = DEFAULT_TOP_K,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[EquivalentRow]:
+    """Yield each source course's top-``k`` matches at every other school.
+
+    Rows are ``(source_course_id, target_course_id, target_school, rank,
+    similarity)``. Source courses are scored in blocks of ``block_size`` rows,
+    so the score matrix never exceeds ``block_size`` x the largest target
+    school, and ``argpartition`` picks the top ``k`` without a full sort.
+    """
+
+    if k < 1 or block_size < 1:
+        raise ValueError("k and block_size must be at least 1")
+
+    matrices = {school: _course_matrix(index, school) for school in index.school_ranges}
+    for source in sources:
+        source_ids, source_matrix = matrices[source.upper()]
+        for target, (target_ids, target_matrix) in matrices.items():
+            if target == source.upper() or not len(target_ids):
+                continue
+            top = min(k, len(target_ids))
+            for start in range(0, len(source_ids), block_size):
+                scores = source_matrix[start : start + block_size] @ target_matrix.T
+                if top < scores.shape[1]:
+                    best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+                else:
+                    best = np.broadcast_to(np.arange(top), (scores.shape[0], top))
+                best_scores = np.take_along_axis(scores, best, axis=1)
+                order = np.argsort(-best_scores, axis=1, kind="stable")
+                best = np.take_along_axis(best, order, axis=1)
+                best_scores = np.take_along_axis(best_scores, order, axis=1)
+                for offset in range(scores.shape[0]):
+                    source_id = int(source_ids[start + offset])
+                    for rank in range(top):
+                        yield (
+                            source_id,
+                            int(target_ids[best[offset, rank]]),
+                            target,
+                            rank + 1,
+                            float(best_scores[offset, rank]),
+                        )
+
+
+def _course_matrix(index: InMemoryIndex, school: str) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(course_ids, unit vectors)`` for a school, one row per course.
+
+    Multi-vector catalogs store several windows per course; those are averaged
+    and re-normalised so every course is compared once.
+    """
+
+    start, stop = index.school_ranges[school]
+    course_ids = index.course_ids[start:stop]
+    matrix = np.asarray(index.matrix[start:stop], dtype=np.float32)
+    if not index.multi_vector:
+        return course_ids, matrix
+
+    unique_ids, inverse = np.unique(course_ids, return_inverse=True)
+    pooled = np.zeros((len(unique_ids), matrix.shape[1]), dtype=np.float32)
+    np.add.at(pooled, inverse, matrix)
+    pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return unique_ids, pooled
+
+
+def build_course_equivalents(
+    conn: Connection,
+    cur: Cursor,
+    sources: Sequence[str] | None = None,
+    *,
+    k: int = DEFAULT_TOP_K,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Dict[str, float]:
+    """Recompute ``course_equivalents`` for ``sources`` (default: every school).
+
+    Returns a report with the row count, runtime and peak memory.
+    """
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    try:
+        index = InMemoryIndex.load(cur)
+        schools = [school.upper() for school in sources or index.school_ranges]
+        missing = [school for school in schools if school not in index.school_ranges]
+        if missing:
+            raise ValueError(f"No embeddings for: {', '.join(missing)}")
+
+        _ensure_equivalents_table(cur)
+        cur.execute(
+            """
+            DELETE FROM course_equivalents AS e
+            USING courses AS c
+            WHERE e.source_course_id = c.id AND c.school = ANY(%s)
+            """,
+            (schools,),
+        )
+        written = 0
+
+        def counted(rows: Iterator[EquivalentRow]) -> Iterator[EquivalentRow]:
+            nonlocal written
+            for row in rows:
+                written += 1
+                yield row
+
+        copy_binary(
+            cur,
+            "course_equivalents",
+            (
+                "source_course_id",
+                "target_course_id",
+                "target_school",
+                "rank",
+                "similarity",
+            ),
+            counted(compute_equivalents(index, schools, k=k, block_size=block_size)),
+        )
+        bump_data_version(cur)
+        conn.commit()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "schools": len(schools),
+        "courses": len(index),
+        "rows": written,
+        "seconds": time.perf_counter() - started,
+        "peakTracedMiB": traced_peak / 2**20,
+        # ru_maxrss is reported in KiB on Linux.
+        "peakRssMiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _ensure_equivalents_table(cur: Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS course_equivalents (
+            source_course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            target_course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            target_school TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            similarity DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (source_course_id, target_school, rank)
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_course_equivalents_target ON course_equivalents (target_course_id)"
+    )
+
+
+def _connection_kwargs(database_url: str | None) -> dict[str, str]:
+    if database_url:
+        return {"dsn": database_url}
+    return resolve_connection_kwargs()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Precompute each course's most similar courses at every other school."
+    )
+    parser.add_argument(
+        "schools",
+        nargs="*",
+        help="Source schools to recompute (default: every school with embeddings).",
+    )
+    parser.add_argument(
+        "--k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help=f"Matches kept per course and target school (default: {DEFAULT_TOP_K}).",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=DEFAULT_BLOCK_SIZE,
+        help="Source courses scored per matrix product; bounds peak memory "
+        f"(default: {DEFAULT_BLOCK_SIZE}).",
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Optional PostgreSQL DSN to override config/env discovery.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    kwargs = _connection_kwargs(args.database_url)
+    conn = psycopg2.connect(**kwargs)
+    cur = conn.cursor()
+
+    try:
+        report = build_course_equivalents(
+            conn, cur, args.schools, k=args.k, block_size=args.block_size
+        )
+        print(
+            f"Wrote {report['rows']} equivalents for {report['schools']} school(s) "
+            f"from {report['courses']} embeddings in {report['seconds']:.1f}s "
+            f"(peak traced {report['peakTracedMiB']:.0f} MiB, "
+            f"peak RSS {report['peakRssMiB']:.0f} MiB)."
+        )
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,17 @@
-# import re
-import csv
-from dataclasses import dataclass
+"""Scrape catalog.ncsu.edu into NCSU_courses.csv.
 
-import httpx
-from selectolax.parser import HTMLParser
+Run from the repository root: ``uv run python -m coursedata.ncsu.scraper``.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator
 
+from selectolax.parser import HTMLParser
 
-@dataclass
-class Course:
-    subject: str
-    number: str
-    name: str
-    description: str
-    credit_hours: str
+from catalog_scraper import CatalogSite, CourseRow, run
 
 
-def make_subjects_dict() -> dict[str, str]:
-    url = "https://catalog.ncsu.edu/course-descriptions/"
-    response = httpx.get(url)
-    html = HTMLParser(response.text)
+def parse_subjects(html: HTMLParser) -> Dict[str, str]:
     subjects = {}
     links = html.css("#textcontainer > div > ul > li > a")
     for link in links:
@@ -28,57 +21,36 @@ def make_subjects_dict() -> dict[str, str]:
     return subjects
 
 
-def get_courses(subjects: dict):
-    results = []
-    n = 0
-    for subject, href in subjects.items():
-        response = httpx.get("https://catalog.ncsu.edu" + href)
-        html = HTMLParser(response.text)
-        courses = html.css("#textcontainer > div > div")
-
-        for course in courses:
-            # print(course.text() + "\n\n")
-            subjectandnumber = course.css_first(
-                "span.text.detail-coursecode.text--semibold"
-            ).text()
-            subjectandnumber = subjectandnumber.split("/")[0]
-            subject = subjectandnumber.split()[0]
-            number = subjectandnumber.split()[1]
-            name = course.css_first(
-                "span.text.detail-title.margin--tiny.text--semibold"
-            ).text()
-            hours = course.css_first("span.text.detail-hours_html").text()
-            hours = hours.strip("()").split(" ")[0]
-            try:
-                description = course.css_first("div > p").text()
-            except AttributeError:
-                description = ""
-            course = Course(subject, number, name, description, hours)
-            results.append(course)
-        n += 1
-        print(f"finished with {subject} ({n}/{len(subjects)})")
-    return results
+def parse_courses(html: HTMLParser) -> Iterator[CourseRow]:
+    for course in html.css("#textcontainer > div > div"):
+        subjectandnumber = course.css_first(
+            "span.text.detail-coursecode.text--semibold"
+        ).text()
+        subjectandnumber = subjectandnumber.split("/")[0]
+        subject = subjectandnumber.split()[0]
+        number = subjectandnumber.split()[1]
+        name = course.css_first(
+            "span.text.detail-title.margin--tiny.text--semibold"
+        ).text()
+        hours = course.css_first("span.text.detail-hours_html").text()
+        hours = hours.strip("()").split(" ")[0]
+        try:
+            description = course.css_first("div > p").text()
+        except AttributeError:
+            description = ""
+        yield CourseRow(subject, number, name, description, hours)
+
+
+SITE = CatalogSite(
+    name="ncsu",
+    index_url="https://catalog.ncsu.edu/course-descriptions/",
+    parse_subjects=parse_subjects,
+    parse_courses=parse_courses,
+)
 
 
 def main():
-    subjects = make_subjects_dict()
-    results = get_courses(subjects)
-    with open("NCSU_courses.csv", "w", newline="") as csvfile:
-        # clear file
-        csvfile.truncate()
-
-        writer = csv.writer(csvfile)
-        writer.writerow(["subject", "number", "name", "description", "credits"])
-        for course in results:
-            writer.writerow(
-                [
-                    course.subject,
-                    course.number,
-                    course.name,
-                    course.description,
-                    course.credit_hours,
-                ]
-            )
+    run(SITE, Path(__file__).with_name("NCSU_courses.csv"))
 
 
 if __name__ == "__main__":
@@ -1,24 +1,17 @@
-# import re
-import csv
-from dataclasses import dataclass
+"""Scrape catalog.unc.edu into UNC_courses.csv.
 
-import httpx
-from selectolax.parser import HTMLParser
+Run from the repository root: ``uv run python -m coursedata.unc.scraper``.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator
 
+from selectolax.parser import HTMLParser
 
-@dataclass
-class Course:
-    subject: str
-    number: str
-    name: str
-    description: str
-    credit_hours: str
+from catalog_scraper import CatalogSite, CourseRow, run
 
 
-def make_subjects_dict() -> dict[str, str]:
-    url = "https://catalog.unc.edu/courses/"
-    response = httpx.get(url)
-    html = HTMLParser(response.text)
+def parse_subjects(html: HTMLParser) -> Dict[str, str]:
     subjects = {}
     links = html.css("#atozindex > ul > li > a")
     for link in links:
@@ -28,63 +21,42 @@ def make_subjects_dict() -> dict[str, str]:
     return subjects
 
 
-def get_courses(subjects: dict):
-    results = []
-    n = 0
-    for subject, href in subjects.items():
-        response = httpx.get("https://catalog.unc.edu" + href)
-        html = HTMLParser(response.text)
-        courses = html.css("#textcontainer > div > div")
-
-        for course in courses:
-            # print(course.text() + "\n\n")
-            subjectandnumber = course.css_first(
-                "span.text.detail-code.margin--tiny.text--semibold.text--big"
-            ).text()
-            subjectandnumber = subjectandnumber.split("/")[0]
-            subject = subjectandnumber.split()[0]
-            number = subjectandnumber.split()[1].split(".")[0]
-            name = (
-                course.css_first(
-                    "span.text.detail-title.margin--tiny.text--semibold.text--big"
-                )
-                .text()
-                .split(".")[0]
+def parse_courses(html: HTMLParser) -> Iterator[CourseRow]:
+    for course in html.css("#textcontainer > div > div"):
+        subjectandnumber = course.css_first(
+            "span.text.detail-code.margin--tiny.text--semibold.text--big"
+        ).text()
+        subjectandnumber = subjectandnumber.split("/")[0]
+        subject = subjectandnumber.split()[0]
+        number = subjectandnumber.split()[1].split(".")[0]
+        name = (
+            course.css_first(
+                "span.text.detail-title.margin--tiny.text--semibold.text--big"
             )
-            hours = course.css_first(
-                "span.text.detail-hours.margin--tiny.text--semibold.text--big"
-            ).text()
-            hours = hours.strip("()").split(" ")[0]
-            try:
-                description = course.css_first("div > p").text()
-            except AttributeError:
-                description = ""
-            course = Course(subject, number, name, description, hours)
-            results.append(course)
-        n += 1
-        print(f"finished with {subject} ({n}/{len(subjects)})")
-    return results
+            .text()
+            .split(".")[0]
+        )
+        hours = course.css_first(
+            "span.text.detail-hours.margin--tiny.text--semibold.text--big"
+        ).text()
+        hours = hours.strip("()").split(" ")[0]
+        try:
+            description = course.css_first("div > p").text()
+        except AttributeError:
+            description = ""
+        yield CourseRow(subject, number, name, description, hours)
+
+
+SITE = CatalogSite(
+    name="unc",
+    index_url="https://catalog.unc.edu/courses/",
+    parse_subjects=parse_subjects,
+    parse_courses=parse_courses,
+)
 
 
 def main():
-    subjects = make_subjects_dict()
-    results = get_courses(subjects)
-    with open("UNC_courses.csv", "w", newline="") as csvfile:
-        # clear file
-        csvfile.truncate()
-
-        writer = csv.writer(csvfile)
-        writer.writerow(["subject", "number", "name", "description", "credits"])
-        for course in results:
-            writer.writerow(
-                [
-                    course.subject,
-                    course.number,
-                    course.name,
-                    course.description,
-                    course.credit_hours,
-                ]
-            )
+    run(SITE, Path(__file__).with_name("UNC_courses.csv"))
 
 
 if __name__ == "__main__":
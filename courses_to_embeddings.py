@@ -1,15 +1,51 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import os
+import time
+from typing import Iterator
 
+import numpy as np
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extensions import connection as Connection
 from psycopg2.extensions import cursor as Cursor
 from tqdm import tqdm
 
+from bulk_load import copy_binary, vector_literal
+from data_version import bump_data_version
 from database import resolve_connection_kwargs
-from embeddings_gen import generate_embedding
+from embeddings_gen import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_OVERLAP,
+    MODEL_KEY,
+    generate_chunked_embeddings,
+    generate_embeddings,
+    pool_chunk_embeddings,
+)
+from vector_index import (
+    add_index_arguments,
+    ensure_compact_column,
+    ensure_index_from_args,
+)
+
+CourseRow = tuple[int, str, str, str, str]
+EmbeddedRow = tuple[int, np.ndarray, str, int]
+EMBEDDING_COLUMNS = ("course_id", "embedding", "prompt_hash", "chunk")
+
+# Number of forward-pass batches embedded per loader chunk. Larger chunks give
+# length bucketing more prompts to sort while keeping memory bounded.
+CHUNK_BATCHES = 8
+
+# How prompts longer than the model's context window are embedded: "truncate"
+# drops the tail, "pool" averages overlapping windows into one vector and
+# "multi" stores one vector per window (searches collapse them per course).
+CHUNKING_MODES = ("truncate", "pool", "multi")
+CHUNKING = os.getenv("EMBEDDING_CHUNKING", "truncate").lower()
+CHUNK_OVERLAP = int(os.getenv("EMBEDDING_CHUNK_OVERLAP", str(DEFAULT_CHUNK_OVERLAP)))
+if CHUNKING not in CHUNKING_MODES:
+    raise ValueError(f"EMBEDDING_CHUNKING must be one of: {', '.join(CHUNKING_MODES)}")
 
 
 def make_embeddings_table(
@@ -19,8 +55,14 @@ def make_embeddings_table(
     *,
     drop_existing: bool = True,
     limit: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bulk: bool = False,
 ) -> int:
-    """Generate embeddings for a school's catalog and persist them in pgvector."""
+    """Generate embeddings for a school's catalog and persist them in pgvector.
+
+    With ``bulk`` the embeddings are streamed to PostgreSQL through one binary
+    ``COPY`` as they are generated, instead of one ``INSERT`` per course.
+    """
 
     school_key = school.upper()
     _ensure_embeddings_table(cur)
@@ -28,6 +70,7 @@ def make_embeddings_table(
     course_ids = _select_course_rows(cur, school_key, limit=limit)
     if not course_ids:
         return 0
+    bump_data_version(cur)
 
     if drop_existing:
         cur.execute(
@@ -35,28 +78,155 @@ def make_embeddings_table(
             ([course_id for course_id, *_ in course_ids],),
         )
 
+    progress = tqdm(
+        total=len(course_ids),
+        desc=f"Embedding {school_key} courses",
+        unit="course",
+        disable=False,
+    )
+    rows = _iter_embedded_rows(course_ids, batch_size=batch_size, progress=progress)
+    _write_embeddings(cur, rows, bulk=bulk)
+    progress.close()
+
+    return len(course_ids)
+
+
+def sync_embeddings_table(
+    conn: Connection,
+    cur: Cursor,
+    school: str,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bulk: bool = False,
+) -> tuple[int, int]:
+    """Embed only the school's courses whose prompt changed since they were stored.
+
+    Each embedding row records a hash of the prompt it was generated from (and
+    of the model backend), so courses that kept their ``id`` through
+    ``sync_courses_table`` and still produce the same prompt are skipped.
+    Returns ``(embedded, unchanged)``.
+    """
+
+    school_key = school.upper()
+    _ensure_embeddings_table(cur)
+
+    stale, unchanged = _select_stale_rows(cur, school_key)
+    if not stale:
+        return 0, unchanged
+    bump_data_version(cur)
+
+    cur.execute(
+        "DELETE FROM course_embeddings WHERE course_id = ANY(%s)",
+        ([course_id for course_id, *_ in stale],),
+    )
+    progress = tqdm(
+        total=len(stale), desc=f"Embedding changed {school_key} courses", unit="course"
+    )
+    rows = _iter_embedded_rows(stale, batch_size=batch_size, progress=progress)
+    _write_embeddings(cur, rows, bulk=bulk)
+    progress.close()
+
+    return len(stale), unchanged
+
+
+def _select_stale_rows(
+    cur: Cursor, school: str, *, id_range: tuple[int, int] | None = None
+) -> tuple[list[CourseRow], int]:
+    """Return the courses whose stored prompt hash is missing or out of date.
+
+    ``id_range`` restricts the scan to an inclusive range of course ids. The
+    second value is the number of up-to-date courses that were skipped.
+    """
+
+    statement = sql.SQL(
+        """
+        SELECT DISTINCT ON (c.id)
+            c.id, c.subject, c.number, c.name, c.description, ce.prompt_hash
+        FROM courses AS c
+        LEFT JOIN course_embeddings AS ce ON ce.course_id = c.id
+        WHERE c.school = %s
+        """
+    )
+    params: tuple = (school,)
+    if id_range is not None:
+        statement += sql.SQL(" AND c.id BETWEEN %s AND %s")
+        params += id_range
+    cur.execute(statement + sql.SQL(" ORDER BY c.id"), params)
+
+    records = cur.fetchall()
+    stale = [
+        (course_id, *fields)
+        for course_id, *fields, stored_hash in records
+        if stored_hash != _prompt_hash(_build_prompt(*fields))
+    ]
+    return stale, len(records) - len(stale)
+
+
+def _write_embeddings(cur: Cursor, rows: Iterator[EmbeddedRow], *, bulk: bool) -> None:
+    if bulk:
+        copy_binary(cur, "course_embeddings", EMBEDDING_COLUMNS, rows)
+        return
+
     insert_statement = sql.SQL(
         """
-        INSERT INTO course_embeddings (description, embedding, course_id)
-        VALUES (%s, %s, %s)
+        INSERT INTO course_embeddings (course_id, embedding, prompt_hash, chunk)
+        VALUES (%s, %s, %s, %s)
         """
     )
+    for course_id, embedding, prompt_hash, chunk in rows:
+        cur.execute(
+            insert_statement,
+            (course_id, vector_literal(embedding), prompt_hash, chunk),
+        )
 
-    progress = tqdm(
-        course_ids, desc=f"Embedding {school_key} courses", unit="course", disable=False
-    )
-    for course_id, subject, number, name, description in progress:
-        parts = [
-            subject,
-            str(number) if number is not None else "",
-            name,
-            description,
-        ]
-        prompt = " ".join(part for part in parts if part)
-        embedding_str = generate_embedding(prompt)
-        cur.execute(insert_statement, (description, embedding_str, course_id))
 
-    return len(course_ids)
+def _iter_embedded_rows(
+    course_rows: list[CourseRow], *, batch_size: int, progress: tqdm
+) -> Iterator[EmbeddedRow]:
+    chunk_size = batch_size * CHUNK_BATCHES
+    for start in range(0, len(course_rows), chunk_size):
+        chunk = course_rows[start : start + chunk_size]
+        prompts = [_build_prompt(*row[1:]) for row in chunk]
+        for (course_id, *_), prompt, vectors in zip(
+            chunk, prompts, _embed_prompts(prompts, batch_size=batch_size)
+        ):
+            prompt_hash = _prompt_hash(prompt)
+            for window, embedding in enumerate(vectors):
+                yield course_id, embedding, prompt_hash, window
+        progress.update(len(chunk))
+
+
+def _embed_prompts(prompts: list[str], *, batch_size: int) -> list[np.ndarray]:
+    """Return each prompt's vectors according to ``CHUNKING`` (one row unless "multi")."""
+
+    if CHUNKING == "truncate":
+        return list(generate_embeddings(prompts, batch_size=batch_size)[:, None, :])
+    windows = generate_chunked_embeddings(
+        prompts, overlap=CHUNK_OVERLAP, batch_size=batch_size
+    )
+    if CHUNKING == "multi":
+        return [vectors for vectors, _ in windows]
+    return [pool_chunk_embeddings(*pair)[None, :] for pair in windows]
+
+
+def _build_prompt(subject: str, number: str, name: str, description: str) -> str:
+    parts = [
+        subject,
+        str(number) if number is not None else "",
+        name,
+        description,
+    ]
+    return " ".join(part for part in parts if part)
+
+
+def _prompt_hash(prompt: str) -> str:
+    # Includes the model key and chunking mode so switching EMBEDDING_BACKEND
+    # or EMBEDDING_CHUNKING re-embeds everything.
+    key = MODEL_KEY
+    if CHUNKING != "truncate":
+        key = f"{key}|{CHUNKING}:{CHUNK_OVERLAP}"
+    digest = hashlib.sha256(f"{key}\n{prompt}".encode("utf-8"))
+    return digest.hexdigest()
 
 
 def _ensure_embeddings_table(cur: Cursor) -> None:
@@ -64,27 +234,49 @@ def _ensure_embeddings_table(cur: Cursor) -> None:
         """
         CREATE TABLE IF NOT EXISTS course_embeddings (
             id SERIAL PRIMARY KEY,
-            description TEXT NOT NULL,
             embedding VECTOR(768) NOT NULL,
             course_id INTEGER REFERENCES courses(id) ON DELETE CASCADE
         )
         """
     )
+    # Descriptions live in courses; older tables carried a copy per row.
+    cur.execute("ALTER TABLE course_embeddings DROP COLUMN IF EXISTS description")
+    cur.execute(
+        "ALTER TABLE course_embeddings ADD COLUMN IF NOT EXISTS prompt_hash TEXT"
+    )
+    cur.execute(
+        "ALTER TABLE course_embeddings ADD COLUMN IF NOT EXISTS chunk INTEGER NOT NULL DEFAULT 0"
+    )
     cur.execute(
         "CREATE INDEX IF NOT EXISTS idx_course_embeddings_course_id ON course_embeddings (course_id)"
     )
+    # One row per course and window; "truncate" and "pool" only write window 0.
+    cur.execute("DROP INDEX IF EXISTS uq_course_embeddings_course_id")
     cur.execute(
-        "CREATE UNIQUE INDEX IF NOT EXISTS uq_course_embeddings_course_id ON course_embeddings (course_id)"
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_course_embeddings_course_chunk ON course_embeddings (course_id, chunk)"
     )
+    # Lets searches read max(chunk) without a scan (querying.candidate_factor).
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_course_embeddings_chunk ON course_embeddings (chunk)"
+    )
+    ensure_compact_column(cur)
 
 
 def _select_course_rows(
-    cur: Cursor, school: str, *, limit: int | None = None
-) -> list[tuple[int, str, str, str, str]]:
+    cur: Cursor,
+    school: str,
+    *,
+    limit: int | None = None,
+    id_range: tuple[int, int] | None = None,
+) -> list[CourseRow]:
     statement = sql.SQL(
-        "SELECT id, subject, number, name, description FROM courses WHERE school = %s ORDER BY id"
+        "SELECT id, subject, number, name, description FROM courses WHERE school = %s"
     )
     params: tuple = (school,)
+    if id_range is not None:
+        statement += sql.SQL(" AND id BETWEEN %s AND %s")
+        params += id_range
+    statement += sql.SQL(" ORDER BY id")
     if limit is not None and limit > 0:
         statement += sql.SQL(" LIMIT %s")
         params += (limit,)
@@ -93,6 +285,10 @@ def _select_course_rows(
     return cur.fetchall()
 
 
+def _throughput(count: int, elapsed: float) -> float:
+    return count / elapsed if elapsed > 0 else 0.0
+
+
 def _connection_kwargs(database_url: str | None) -> dict[str, str]:
     if database_url:
         return {"dsn": database_url}
@@ -120,6 +316,18 @@ def parse_args() -> argparse.Namespace:
         type=int,
         help="Process only the first N courses (useful for smoke tests).",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Prompts per forward pass (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Stream embeddings with a binary COPY instead of per-row INSERTs.",
+    )
+    add_index_arguments(parser)
     parser.add_argument(
         "--yes",
         action="store_true",
@@ -143,15 +351,25 @@ def main() -> None:
     cur = conn.cursor()
 
     try:
+        started = time.perf_counter()
         processed = make_embeddings_table(
             conn,
             cur,
             args.school,
             drop_existing=not args.keep_existing,
             limit=args.limit,
+            batch_size=args.batch_size,
+            bulk=args.bulk,
         )
         conn.commit()
-        print(f"Generated embeddings for {processed} courses at {args.school.upper()}.")
+        elapsed = time.perf_counter() - started
+        print(
+            f"Generated embeddings for {processed} courses at {args.school.upper()} "
+            f"in {elapsed:.1f}s ({_throughput(processed, elapsed):.1f} courses/s)."
+        )
+        if ensure_index_from_args(cur, args):
+            conn.commit()
+            print(f"Refreshed {args.index} index on course_embeddings.")
     finally:
         cur.close()
         conn.close()
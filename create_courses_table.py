@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import csv
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
@@ -9,12 +10,26 @@ import psycopg2
 from psycopg2.extensions import connection as Connection
 from psycopg2.extensions import cursor as Cursor
 
+from bulk_load import copy_csv
+from data_version import bump_data_version
 from database import resolve_connection_kwargs
 
 COURSE_COLUMNS = ("subject", "number", "name", "description", "credit_hours")
 DATA_ROOT = Path("coursedata")
 
 
+@dataclass(frozen=True)
+class CourseSyncResult:
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+
 def make_courses_table(
     conn: Connection,
     cur: Cursor,
@@ -22,8 +37,13 @@ def make_courses_table(
     csv_path: str | Path | None = None,
     *,
     drop_existing: bool = True,
+    bulk: bool = False,
 ) -> int:
-    """Create or replace a school's course catalog entries in the shared table."""
+    """Create or replace a school's course catalog entries in the shared table.
+
+    With ``bulk`` the rows are streamed through a single ``COPY`` instead of one
+    ``INSERT`` per CSV row.
+    """
 
     school_key = school.upper()
     target_csv = Path(csv_path) if csv_path else _default_csv_for_school(school)
@@ -38,9 +58,19 @@ def make_courses_table(
         cur.execute("DELETE FROM courses WHERE school = %s", (school_key,))
 
     rows = list(_iter_course_rows(target_csv))
+    bump_data_version(cur)
     if not rows:
         return 0
 
+    if bulk:
+        copy_csv(
+            cur,
+            "courses",
+            ("school", *COURSE_COLUMNS),
+            ((school_key, *row) for row in rows),
+        )
+        return len(rows)
+
     insert_statement = """
         INSERT INTO courses (school, subject, number, name, description, credit_hours)
         VALUES (%s, %s, %s, %s, %s, %s)
@@ -52,6 +82,109 @@ def make_courses_table(
     return len(rows)
 
 
+def sync_courses_table(
+    cur: Cursor, school: str, csv_path: str | Path | None = None
+) -> CourseSyncResult:
+    """Upsert a school's catalog by its natural key instead of replacing it.
+
+    Courses are matched on ``(school, subject, number)``, so unchanged rows keep
+    their ``id`` (and therefore their embedding). Rows missing from the CSV are
+    deleted, which cascades to their embeddings. Precomputed equivalents that
+    involve a changed course are dropped rather than served stale until
+    ``course_equivalents.py`` runs again. The data version is only bumped when
+    something actually changed.
+    """
+
+    school_key = school.upper()
+    target_csv = Path(csv_path) if csv_path else _default_csv_for_school(school)
+    if not target_csv.exists():
+        raise FileNotFoundError(
+            f"Could not locate course CSV for {school_key}: {target_csv}"
+        )
+
+    _ensure_courses_table(cur)
+    _ensure_natural_key(cur)
+
+    cur.execute(
+        """
+        CREATE TEMP TABLE staged_courses (
+            ordinal BIGINT GENERATED ALWAYS AS IDENTITY,
+            subject TEXT NOT NULL,
+            number TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            credit_hours TEXT NOT NULL
+        )
+        """
+    )
+    rows = list(_iter_course_rows(target_csv))
+    copy_csv(cur, "staged_courses", COURSE_COLUMNS, rows)
+
+    # xmax is 0 for freshly inserted tuples and non-zero for updated ones. When
+    # the CSV repeats a course, its last row wins; COPY fills ``ordinal`` in
+    # file order, so the pick (and the prompt hash) is stable across runs.
+    cur.execute(
+        """
+        INSERT INTO courses (school, subject, number, name, description, credit_hours)
+        SELECT DISTINCT ON (subject, number) %s, subject, number, name, description, credit_hours
+        FROM staged_courses
+        ORDER BY subject, number, ordinal DESC
+        ON CONFLICT (school, subject, number) DO UPDATE
+        SET name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            credit_hours = EXCLUDED.credit_hours
+        WHERE (courses.name, courses.description, courses.credit_hours)
+            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.description, EXCLUDED.credit_hours)
+        RETURNING id, xmax = 0
+        """,
+        (school_key,),
+    )
+    upserted = cur.fetchall()
+    inserted = sum(was_inserted for _, was_inserted in upserted)
+    _drop_stale_equivalents(
+        cur, [course_id for course_id, was_inserted in upserted if not was_inserted]
+    )
+
+    cur.execute(
+        """
+        DELETE FROM courses AS c
+        WHERE c.school = %s
+          AND NOT EXISTS (
+              SELECT 1 FROM staged_courses AS s
+              WHERE s.subject = c.subject AND s.number = c.number
+          )
+        """,
+        (school_key,),
+    )
+    deleted = cur.rowcount
+    cur.execute("DROP TABLE staged_courses")
+
+    result = CourseSyncResult(
+        inserted=inserted,
+        updated=len(upserted) - inserted,
+        deleted=deleted,
+        unchanged=len({(row[0], row[1]) for row in rows}) - len(upserted),
+    )
+    if result.changed:
+        bump_data_version(cur)
+    return result
+
+
+def _drop_stale_equivalents(cur: Cursor, course_ids: list[int]) -> None:
+    if not course_ids:
+        return
+    cur.execute("SELECT to_regclass('course_equivalents')")
+    if cur.fetchone()[0] is None:
+        return
+    cur.execute(
+        """
+        DELETE FROM course_equivalents
+        WHERE source_course_id = ANY(%s) OR target_course_id = ANY(%s)
+        """,
+        (course_ids, course_ids),
+    )
+
+
 def _iter_course_rows(csv_path: Path) -> Iterable[tuple[str, str, str, str, str]]:
     with csv_path.open(newline="", encoding="utf-8") as csvfile:
         reader = csv.DictReader(csvfile)
@@ -93,6 +226,32 @@ def _ensure_courses_table(cur: Cursor) -> None:
         """
     )
     cur.execute("CREATE INDEX IF NOT EXISTS idx_courses_school ON courses (school)")
+    # Lexical side of hybrid search: weighted code, name and description terms.
+    cur.execute(
+        """
+        ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', subject || ' ' || number), 'A')
+            || setweight(to_tsvector('english', name), 'B')
+            || setweight(to_tsvector('english', description), 'C')
+        ) STORED
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_courses_search_vector ON courses USING GIN (search_vector)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_courses_code ON courses (upper(subject), upper(number))"
+    )
+
+
+def _ensure_natural_key(cur: Cursor) -> None:
+    # Created by the incremental sync only, so full reloads keep working on
+    # databases that already hold duplicate (school, subject, number) rows.
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_courses_school_subject_number "
+        "ON courses (school, subject, number)"
+    )
 
 
 def _resolve_credit_value(columns: dict[str, str]) -> str:
@@ -140,6 +299,11 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Retain existing rows before inserting.",
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Load rows with a single COPY instead of per-row INSERTs.",
+    )
     parser.add_argument(
         "--yes",
         action="store_true",
@@ -170,6 +334,7 @@ def main() -> None:
             args.school,
             csv_path=args.csv_path,
             drop_existing=not args.keep_existing,
+            bulk=args.bulk,
         )
         conn.commit()
         print(f"Loaded {inserted} courses for {args.school.upper()} into PostgreSQL.")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from psycopg2 import errors
+from psycopg2.extensions import cursor as Cursor
+
+DATA_VERSION_SQL = "SELECT version FROM data_version"
+
+
+def bump_data_version(cur: Cursor) -> int:
+    """Advance the catalog data version; call in the same transaction as a reload."""
+
+    _ensure_data_version_table(cur)
+    cur.execute(
+        "UPDATE data_version SET version = version + 1, updated_at = now() RETURNING version"
+    )
+    (version,) = cur.fetchone()
+    return version
+
+
+def read_data_version(cur: Cursor) -> int:
+    """Return the current catalog data version, or 0 before any loader has run."""
+
+    cur.execute("SAVEPOINT read_data_version")
+    try:
+        cur.execute(DATA_VERSION_SQL)
+    except errors.UndefinedTable:
+        cur.execute("ROLLBACK TO SAVEPOINT read_data_version")
+        return 0
+    row = cur.fetchone()
+    cur.execute("RELEASE SAVEPOINT read_data_version")
+    return row[0] if row else 0
+
+
+def _ensure_data_version_table(cur: Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    cur.execute(
+        "INSERT INTO data_version (version) VALUES (0) ON CONFLICT (singleton) DO NOTHING"
+    )
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extensions import connection as Connection
+from psycopg2.pool import PoolError
+
+DEFAULT_MIN_CONNECTIONS = 1
+DEFAULT_MAX_CONNECTIONS = 5
+DEFAULT_ACQUIRE_TIMEOUT = 2.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+
+
+class PoolExhausted(PoolError):
+    """No connection became free within the pool's acquire timeout."""
+
+
+class ThreadSafeConnectionPool:
+    """A bounded psycopg2 pool that request threads can share.
+
+    ``getconn`` blocks for at most ``acquire_timeout`` seconds when every
+    connection is checked out, then raises ``PoolExhausted`` so callers can
+    shed load instead of queueing. Connections that come back closed or
+    mid-transaction are discarded, and a connection idle for longer than
+    ``health_check_interval`` seconds is pinged before it is handed out.
+    """
+
+    def __init__(
+        self,
+        *,
+        minconn: int = DEFAULT_MIN_CONNECTIONS,
+        maxconn: int = DEFAULT_MAX_CONNECTIONS,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        connect: Callable[[], Connection] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        **connection_kwargs: Any,
+    ) -> None:
+        if minconn < 0 or maxconn < 1:
+            raise ValueError("minconn must be >= 0 and maxconn >= 1")
+        if maxconn < minconn:
+            raise ValueError(
+                "DATABASE_MAX_CONNECTIONS must be greater than or equal to DATABASE_MIN_CONNECTIONS"
+            )
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect or (lambda: psycopg2.connect(**connection_kwargs))
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._idle: Deque[tuple[Connection, float]] = deque()
+        self._size = 0
+        self.closed = False
+        self.timeouts = 0
+        self.discarded = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), self._clock()))
+            self._size += 1
+
+    @classmethod
+    def from_env(cls, **connection_kwargs: Any) -> ThreadSafeConnectionPool:
+        return cls(
+            minconn=int(
+                os.getenv("DATABASE_MIN_CONNECTIONS", str(DEFAULT_MIN_CONNECTIONS))
+            ),
+            maxconn=int(
+                os.getenv("DATABASE_MAX_CONNECTIONS", str(DEFAULT_MAX_CONNECTIONS))
+            ),
+            acquire_timeout=float(
+                os.getenv("DATABASE_POOL_TIMEOUT", str(DEFAULT_ACQUIRE_TIMEOUT))
+            ),
+            health_check_interval=float(
+                os.getenv(
+                    "DATABASE_HEALTH_CHECK_INTERVAL", str(DEFAULT_HEALTH_CHECK_INTERVAL)
+                )
+            ),
+            **connection_kwargs,
+        )
+
+    def getconn(self) -> Connection:
+        deadline = self._clock() + self.acquire_timeout
+        while True:
+            with self._condition:
+                if self.closed:
+                    raise PoolError("connection pool is closed")
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        if self._idle or self._size < self.maxconn:
+                            break
+                        self.timeouts += 1
+                        raise PoolExhausted(
+                            f"no database connection free within {self.acquire_timeout:g}s"
+                        )
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                else:
+                    # Reserve the slot now and connect outside the lock.
+                    self._size += 1
+                    connection, last_used = None, 0.0
+
+            if connection is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    self._release_slot()
+                    raise
+            if self._healthy(connection, last_used):
+                return connection
+            self.discarded += 1
+            self._close_quietly(connection)
+            self._release_slot()
+
+    def putconn(self, connection: Connection, *, close: bool = False) -> None:
+        usable = (
+            not close
+            and not self.closed
+            and not connection.closed
+            and connection.get_transaction_status() == TRANSACTION_STATUS_IDLE
+        )
+        if not usable:
+            self._close_quietly(connection)
+            self._release_slot()
+            return
+        with self._condition:
+            self._idle.append((connection, self._clock()))
+            self._condition.notify()
+
+    def closeall(self) -> None:
+        with self._condition:
+            self.closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": self._size - len(self._idle),
+                "maxSize": self.maxconn,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+    def _healthy(self, connection: Connection, last_used: float) -> bool:
+        if connection.closed:
+            return False
+        if self._clock() - last_used < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _release_slot(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def _close_quietly(connection: Connection) -> None:
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
@@ -12,6 +12,7 @@ class ModelHandler(BaseHandler):
         self.tokenizer = AutoTokenizer.from_pretrained("thenlper/gte-base")
         self.model = AutoModel.from_pretrained("thenlper/gte-base")
 
+    @staticmethod
     def average_pool(last_hidden_states: Tensor, attention_mask: Tensor) -> Tensor:
         last_hidden = last_hidden_states.masked_fill(
             ~attention_mask[..., None].bool(), 0.0
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from torch import Tensor
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_BACKEND = "torch"
+DEFAULT_ONNX_PATH = Path("models") / "gte-base.onnx"
+
+
+class EmbeddingBackend(Protocol):
+    """Runs gte-base on tokenized input and returns pooled, L2-normalised rows."""
+
+    name: str
+
+    def embed(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Return an ``(batch, dim)`` float32 matrix for padded token arrays."""
+
+
+def average_pool(last_hidden_states: Tensor, attention_mask: Tensor) -> Tensor:
+    last_hidden = last_hidden_states.masked_fill(~attention_mask[..., None].bool(), 0.0)
+    return last_hidden.sum(dim=1) / attention_mask.sum(dim=1)[..., None]
+
+
+def average_pool_numpy(
+    last_hidden_states: np.ndarray, attention_mask: np.ndarray
+) -> np.ndarray:
+    """NumPy twin of ``average_pool`` followed by L2 normalisation."""
+
+    mask = attention_mask[..., None].astype(last_hidden_states.dtype)
+    pooled = (last_hidden_states * mask).sum(axis=1) / mask.sum(axis=1)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.maximum(norms, 1e-12)).astype(np.float32, copy=False)
+
+
+class TorchBackend:
+    """The reference PyTorch model, optionally with dynamic int8 ``Linear`` layers."""
+
+    def __init__(
+        self, model_name: str, *, quantize: bool = False, threads: int | None = None
+    ) -> None:
+        import torch
+        from transformers import AutoModel
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self.model = model
+        self.name = "torch-int8" if quantize else "torch"
+
+    def embed(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        import torch
+        import torch.nn.functional as F
+
+        ids = torch.from_numpy(np.asarray(input_ids, dtype=np.int64))
+        mask = torch.from_numpy(np.asarray(attention_mask, dtype=np.int64))
+        with torch.inference_mode():
+            outputs = self.model(input_ids=ids, attention_mask=mask)
+            embeddings = average_pool(outputs.last_hidden_state, mask)
+            embeddings = F.normalize(embeddings, p=2, dim=1)
+        return embeddings.numpy().astype(np.float32, copy=False)
+
+
+class OnnxBackend:
+    """gte-base exported by ``export_onnx.py`` and run with ONNX Runtime on CPU."""
+
+    def __init__(
+        self, path: str | Path, *, intra_op_threads: int | None = None
+    ) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.path = Path(path)
+        self.session = ort.InferenceSession(
+            str(self.path), options, providers=["CPUExecutionProvider"]
+        )
+        self.name = f"onnx:{self.path.stem}"
+
+    def embed(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        mask = np.asarray(attention_mask, dtype=np.int64)
+        (last_hidden_state,) = self.session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": np.asarray(input_ids, dtype=np.int64),
+                "attention_mask": mask,
+            },
+        )
+        return average_pool_numpy(last_hidden_state, mask)
+
+
+def load_backend(
+    name: str,
+    model_name: str,
+    *,
+    onnx_path: str | Path | None = None,
+    threads: int | None = None,
+) -> Any:
+    """Load a backend; ``threads`` caps its intra-op thread pool when set."""
+
+    if name == "torch":
+        return TorchBackend(model_name, threads=threads)
+    if name == "torch-int8":
+        return TorchBackend(model_name, quantize=True, threads=threads)
+    if name == "onnx":
+        path = Path(onnx_path or DEFAULT_ONNX_PATH)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {path}. Run export_onnx.py first."
+            )
+        return OnnxBackend(path, intra_op_threads=threads)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def configured_backend() -> tuple[str, str | None]:
+    """Return ``(backend name, onnx path)`` from ``EMBEDDING_BACKEND``/``EMBEDDING_ONNX_PATH``."""
+
+    name = os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of: {', '.join(BACKENDS)}")
+    return name, os.getenv("EMBEDDING_ONNX_PATH") or None
+
+
+def configured_threads() -> int | None:
+    """Return ``EMBEDDING_THREADS``, the intra-op thread cap, or ``None`` for the default."""
+
+    value = os.getenv("EMBEDDING_THREADS")
+    return int(value) if value else None
+
+
+def backend_key(name: str, onnx_path: str | None) -> str:
+    """Stable identifier for cache keys; embeddings from different backends differ."""
+
+    if name == "onnx":
+        return f"onnx:{Path(onnx_path or DEFAULT_ONNX_PATH).stem}"
+    return name
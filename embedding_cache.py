@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SHARED_MAX_ENTRIES = 200_000
+# Hits refresh an entry's recency at most this often, so hot keys do not turn
+# every read into a write that contends for SQLite's single writer lock.
+RECENCY_GRANULARITY_SECONDS = 60.0
+# Trimming the shared cache scans it, so only do so after this many writes.
+SHARED_EVICTION_INTERVAL = 256
+
+
+def normalise_query(text: str) -> str:
+    """Collapse whitespace and case-fold so trivially different queries share a key.
+
+    gte-base uses an uncased tokenizer that splits on whitespace, so this does
+    not change the resulting embedding.
+    """
+
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of query embeddings bounded by entries, bytes and age.
+
+    Values are stored as read-only float32 arrays. ``max_entries`` or
+    ``max_bytes`` of 0 disables that bound; ``ttl`` of 0 keeps entries until
+    they are evicted.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[np.ndarray, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> EmbeddingCache:
+        return cls(
+            max_entries=int(
+                os.getenv("QUERY_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))
+            ),
+            max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "0")),
+        )
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl and self._clock() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: np.ndarray) -> np.ndarray:
+        stored = np.array(value, dtype=np.float32)
+        stored.flags.writeable = False
+        size = _entry_size(key, stored)
+        if self.max_bytes and size > self.max_bytes:
+            return stored
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (stored, self._clock())
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries and len(self._entries) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return stored
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[str], np.ndarray]
+    ) -> np.ndarray:
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, compute(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= _entry_size(key, value)
+
+
+def _entry_size(key: str, value: np.ndarray) -> int:
+    return value.nbytes + len(key.encode("utf-8"))
+
+
+class SharedEmbeddingCache:
+    """Host-wide query embedding cache in a SQLite file shared by all workers.
+
+    Entries are keyed by model name and normalised query, survive restarts and
+    are evicted least-recently-used once ``max_entries`` is exceeded. Each
+    process opens its own connection lazily, so the cache is safe to create
+    before gunicorn forks.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        model_name: str,
+        max_entries: int = DEFAULT_SHARED_MAX_ENTRIES,
+        timeout: float = 1.0,
+    ) -> None:
+        self.path = Path(path)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, *, model_name: str) -> Optional[SharedEmbeddingCache]:
+        path = os.getenv("QUERY_CACHE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            model_name=model_name,
+            max_entries=int(
+                os.getenv(
+                    "QUERY_CACHE_SHARED_MAX_ENTRIES", str(DEFAULT_SHARED_MAX_ENTRIES)
+                )
+            ),
+        )
+
+    def get(self, key: str) -> np.ndarray | None:
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT embedding, last_used FROM query_embeddings "
+                    "WHERE model = ? AND query = ?",
+                    (self.model_name, key),
+                ).fetchone()
+                if row is not None and now - row[1] > RECENCY_GRANULARITY_SECONDS:
+                    connection.execute(
+                        "UPDATE query_embeddings SET last_used = ? "
+                        "WHERE model = ? AND query = ?",
+                        (now, self.model_name, key),
+                    )
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key: str, value: np.ndarray) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[tuple[str, np.ndarray]]) -> None:
+        now = time.time()
+        rows = [
+            (self.model_name, key, np.asarray(value, dtype=np.float32).tobytes(), now)
+            for key, value in items
+        ]
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO query_embeddings "
+                        "(model, query, embedding, last_used) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                except sqlite3.Error:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+                self._writes_since_eviction += len(rows)
+                if self._writes_since_eviction >= SHARED_EVICTION_INTERVAL:
+                    self._evict(connection)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def evict(self) -> None:
+        """Trim the cache to ``max_entries``, dropping least-recently-used keys."""
+
+        with self._lock:
+            self._evict(self._connect())
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT 1 FROM query_embeddings WHERE model = ? AND query = ?",
+                    (self.model_name, key),
+                )
+                .fetchone()
+            )
+        return row is not None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        self._writes_since_eviction = 0
+        if not self.max_entries:
+            return
+        connection.execute(
+            """
+            DELETE FROM query_embeddings WHERE rowid IN (
+                SELECT rowid FROM query_embeddings
+                ORDER BY last_used DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork; reopen in each worker process.
+        if self._connection is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    model TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, query)
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used "
+                "ON query_embeddings (last_used)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
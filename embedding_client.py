@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional, Sequence
+
+import httpx
+import numpy as np
+
+DEFAULT_TIMEOUT = 10.0
+
+
+class EmbeddingClient:
+    """Client for ``embedding_server.py`` over localhost HTTP or a Unix socket.
+
+    ``url`` is either ``http://host:port`` or ``unix:///path/to/socket``. The
+    underlying connection pool is opened lazily in each process so the client
+    can be created before gunicorn forks.
+    """
+
+    def __init__(self, url: str, *, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> Optional[EmbeddingClient]:
+        url = os.getenv("EMBEDDING_SERVER_URL")
+        if not url:
+            return None
+        return cls(
+            url,
+            timeout=float(os.getenv("EMBEDDING_SERVER_TIMEOUT", str(DEFAULT_TIMEOUT))),
+        )
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an ``(len(texts), dim)`` float32 matrix computed by the server."""
+
+        response = self._http().post("/embed", json={"texts": list(texts)})
+        response.raise_for_status()
+        rows, dimensions = (
+            int(value) for value in response.headers["X-Embedding-Shape"].split(",")
+        )
+        return np.frombuffer(response.content, dtype="<f4").reshape(rows, dimensions)
+
+    def healthy(self) -> bool:
+        try:
+            return self._http().get("/healthz").status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def _http(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                if self.url.startswith("unix://"):
+                    transport = httpx.HTTPTransport(uds=self.url[len("unix://") :])
+                    base_url = "http://embedding-server"
+                else:
+                    transport = httpx.HTTPTransport()
+                    base_url = self.url
+                self._client = httpx.Client(
+                    base_url=base_url, transport=transport, timeout=self.timeout
+                )
+                self._pid = os.getpid()
+            return self._client
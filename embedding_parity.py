@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from courses_to_embeddings import _build_prompt
+from create_courses_table import _default_csv_for_school, _iter_course_rows
+from embedding_backends import BACKENDS, EmbeddingBackend, load_backend
+from embeddings_gen import DEFAULT_BATCH_SIZE, MODEL_NAME, generate_embeddings
+
+DEFAULT_SCHOOLS = ("asu", "uiuc")
+DEFAULT_SAMPLE_SIZE = 500
+TOP_K = 10
+SAMPLE_QUERIES = (
+    "introduction to machine learning",
+    "organic chemistry lab",
+    "financial accounting",
+    "shakespeare and renaissance drama",
+    "linear algebra for engineers",
+    "public speaking",
+    "microeconomics principles",
+    "data structures and algorithms",
+    "history of the civil rights movement",
+    "human anatomy and physiology",
+    "spanish conversation",
+    "music theory",
+    "statistics for social sciences",
+    "operating systems",
+    "environmental policy",
+    "creative writing poetry workshop",
+    "cell biology",
+    "thermodynamics",
+    "marketing strategy",
+    "ethics in technology",
+)
+
+
+def parity_report(
+    reference: EmbeddingBackend,
+    candidate: EmbeddingBackend,
+    courses: Sequence[str],
+    queries: Sequence[str],
+    *,
+    k: int = TOP_K,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Compare ``candidate`` against ``reference`` on course prompts and queries.
+
+    Reports per-vector cosine agreement over every course and query embedding,
+    plus the mean overlap of each query's top-``k`` courses within the sample.
+    Both backends emit unit vectors, so cosine similarity is a dot product.
+    """
+
+    texts = [*courses, *queries]
+    timings: Dict[str, float] = {}
+    matrices: List[np.ndarray] = []
+    for label, backend in (("reference", reference), ("candidate", candidate)):
+        started = time.perf_counter()
+        matrices.append(
+            generate_embeddings(texts, batch_size=batch_size, backend=backend)
+        )
+        timings[label] = time.perf_counter() - started
+    expected, actual = matrices
+
+    agreement = np.einsum("ij,ij->i", expected, actual)
+    report: Dict[str, Any] = {
+        "reference": reference.name,
+        "candidate": candidate.name,
+        "courses": len(courses),
+        "queries": len(queries),
+        "meanCosine": float(agreement.mean()),
+        "minCosine": float(agreement.min()),
+        "referenceSeconds": timings["reference"],
+        "candidateSeconds": timings["candidate"],
+        "speedup": timings["reference"] / timings["candidate"],
+    }
+
+    k = min(k, len(courses))
+    if queries and k:
+        overlaps = _top_k_overlap(expected, actual, len(courses), k)
+        report[f"meanTop{k}Overlap"] = float(overlaps.mean())
+        report[f"minTop{k}Overlap"] = float(overlaps.min())
+    return report
+
+
+def _top_k_overlap(
+    expected: np.ndarray, actual: np.ndarray, course_count: int, k: int
+) -> np.ndarray:
+    def top_k(matrix: np.ndarray) -> np.ndarray:
+        scores = matrix[course_count:] @ matrix[:course_count].T
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    return np.array(
+        [
+            len(set(expected_row) & set(actual_row)) / k
+            for expected_row, actual_row in zip(top_k(expected), top_k(actual))
+        ]
+    )
+
+
+def sample_course_prompts(
+    schools: Sequence[str], sample_size: int, *, seed: int = 0
+) -> List[str]:
+    prompts = [
+        _build_prompt(subject, number, name, description)
+        for school in schools
+        for subject, number, name, description, _ in _iter_course_rows(
+            _default_csv_for_school(school)
+        )
+    ]
+    if len(prompts) <= sample_size:
+        return prompts
+    return random.Random(seed).sample(prompts, sample_size)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check an embedding backend against the fp32 PyTorch reference."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=[name for name in BACKENDS if name != "torch"],
+        default="onnx",
+        help="Backend to compare with fp32 torch (default: onnx).",
+    )
+    parser.add_argument(
+        "--onnx-path", help="ONNX model for --backend onnx (e.g. the int8 export)."
+    )
+    parser.add_argument(
+        "--schools",
+        nargs="+",
+        default=list(DEFAULT_SCHOOLS),
+        help="Schools whose CSVs supply course prompts.",
+    )
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        help=f"Courses to embed (default: {DEFAULT_SAMPLE_SIZE}).",
+    )
+    parser.add_argument(
+        "--queries", help="File with one query per line instead of the built-in set."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Prompts per forward pass (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    courses = sample_course_prompts(args.schools, args.sample_size, seed=args.seed)
+    if args.queries:
+        lines = Path(args.queries).read_text(encoding="utf-8").splitlines()
+        queries = [line.strip() for line in lines if line.strip()]
+    else:
+        queries = list(SAMPLE_QUERIES)
+
+    report = parity_report(
+        load_backend("torch", MODEL_NAME),
+        load_backend(args.backend, MODEL_NAME, onnx_path=args.onnx_path),
+        courses,
+        queries,
+        batch_size=args.batch_size,
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(
+            f"{key:>20}: {value:.4f}"
+            if isinstance(value, float)
+            else f"{key:>20}: {value}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from embeddings_gen import DEFAULT_BATCH_SIZE, EMBEDDING_DIM, generate_embeddings
+
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_TEXTS_PER_REQUEST = 256
+
+logger = logging.getLogger("embedding_server")
+
+
+class MicroBatcher:
+    """Coalesce concurrent embedding requests into batched forward passes.
+
+    A single worker thread owns the model. It takes the first queued text,
+    keeps collecting until ``max_batch_size`` texts are queued or
+    ``max_wait`` seconds have passed, then embeds them together and resolves
+    each caller's future.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], np.ndarray],
+        *,
+        max_batch_size: int = DEFAULT_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT_MS / 1000,
+    ) -> None:
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue[tuple[str, Future] | None] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(
+        self, texts: Sequence[str], *, timeout: float | None = None
+    ) -> np.ndarray:
+        futures = [self.submit(text) for text in texts]
+        return np.vstack([future.result(timeout=timeout) for future in futures])
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch: List[tuple[str, Future]]) -> None:
+        pending = [
+            (text, future)
+            for text, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not pending:
+            return
+        try:
+            embeddings = self._embed_batch([text for text, _ in pending])
+        except Exception as exc:  # surface model failures to every waiting caller
+            for _, future in pending:
+                future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.items += len(pending)
+        for (_, future), embedding in zip(pending, embeddings):
+            future.set_result(embedding)
+
+
+def make_handler(
+    batcher: MicroBatcher, *, timeout: float
+) -> type[BaseHTTPRequestHandler]:
+    class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path != "/healthz":
+                self._send_json(404, {"error": "Not found."})
+                return
+            self._send_json(
+                200,
+                {
+                    "status": "ok",
+                    "batches": batcher.batches,
+                    "items": batcher.items,
+                    "maxBatchSize": batcher.max_batch_size,
+                },
+            )
+
+        def do_POST(self) -> None:
+            if self.path != "/embed":
+                self._send_json(404, {"error": "Not found."})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError
+                texts = payload["texts"]
+                if not isinstance(texts, list) or not all(
+                    isinstance(text, str) for text in texts
+                ):
+                    raise ValueError
+            except (KeyError, ValueError):
+                self._send_json(400, {"error": "'texts' must be a list of strings."})
+                return
+            if len(texts) > MAX_TEXTS_PER_REQUEST:
+                self._send_json(
+                    413,
+                    {"error": f"At most {MAX_TEXTS_PER_REQUEST} texts per request."},
+                )
+                return
+
+            try:
+                matrix = (
+                    batcher.embed(texts, timeout=timeout)
+                    if texts
+                    else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+                )
+            except Exception:
+                logger.exception("Embedding request failed")
+                self._send_json(500, {"error": "Embedding failed."})
+                return
+
+            body = np.ascontiguousarray(matrix, dtype="<f4").tobytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header(
+                "X-Embedding-Shape", f"{matrix.shape[0]},{matrix.shape[1]}"
+            )
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            # Unix socket peers have no address, so skip BaseHTTPRequestHandler's.
+            logger.debug(format, *args)
+
+    return EmbeddingRequestHandler
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve gte-base embeddings to local app workers with dynamic batching."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="TCP bind address.")
+    parser.add_argument("--port", type=int, default=8100, help="TCP port.")
+    parser.add_argument(
+        "--socket", help="Listen on this Unix socket path instead of TCP."
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Largest micro-batch per forward pass (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=DEFAULT_MAX_WAIT_MS,
+        help="How long the first request in a batch waits for company "
+        f"(default: {DEFAULT_MAX_WAIT_MS}).",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds a request may wait for its embeddings.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    batcher = MicroBatcher(
+        lambda texts: generate_embeddings(texts, batch_size=args.max_batch_size),
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+    )
+    batcher.start()
+    handler = make_handler(batcher, timeout=args.request_timeout)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server: socketserver.BaseServer = ThreadingUnixHTTPServer(args.socket, handler)
+        os.chmod(args.socket, 0o660)
+        logger.info("Serving embeddings on unix:%s", args.socket)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), handler)
+        logger.info("Serving embeddings on http://%s:%d", args.host, args.port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+
+
+if __name__ == "__main__":
+    main()
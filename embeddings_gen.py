@@ -1,33 +1,327 @@
+from __future__ import annotations
+
 import json
-from functools import cache
+import threading
+from typing import Any, Iterator, Sequence
+
+import numpy as np
+
+from bounded_executor import BoundedExecutor
+from embedding_backends import (
+    EmbeddingBackend,
+    average_pool,  # noqa: F401 - re-exported for existing callers
+    backend_key,
+    configured_backend,
+    configured_threads,
+    load_backend,
+)
+from embedding_cache import EmbeddingCache, SharedEmbeddingCache, normalise_query
+from embedding_client import EmbeddingClient
+from metrics import metrics
+from request_profiler import follow
+
+MODEL_NAME = "thenlper/gte-base"
+BACKEND_NAME, ONNX_PATH = configured_backend()
+# Identifies both the model and the inference backend in shared cache keys.
+MODEL_KEY = (
+    MODEL_NAME
+    if BACKEND_NAME == "torch"
+    else f"{MODEL_NAME}@{backend_key(BACKEND_NAME, ONNX_PATH)}"
+)
+
+EMBEDDING_DIM = 768
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_CHUNK_OVERLAP = 64
+
+_model_lock = threading.Lock()
+_tokenizer: Any = None
+_model: EmbeddingBackend | None = None
+
+
+def get_model() -> tuple[Any, EmbeddingBackend]:
+    """Return ``(tokenizer, backend)``, importing and loading them on first use.
+
+    The backend is chosen by ``EMBEDDING_BACKEND`` (``torch``, ``torch-int8`` or
+    ``onnx``); all of them share gte-base's mean pooling and L2 normalisation.
+    """
+
+    global _model
+    tokenizer = get_tokenizer()
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_backend(
+                    BACKEND_NAME,
+                    MODEL_NAME,
+                    onnx_path=ONNX_PATH,
+                    threads=configured_threads(),
+                )
+    return tokenizer, _model
+
+
+def get_tokenizer() -> Any:
+    global _tokenizer
+    if _tokenizer is None:
+        with _model_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+
+def model_ready() -> bool:
+    return _model is not None
+
+
+def warm_up(*, run_forward: bool = True) -> None:
+    """Load the model ahead of traffic, optionally running one throwaway query.
+
+    A no-op when queries are embedded by the embedding server. Pass
+    ``run_forward=False`` in a process that will fork afterwards (gunicorn's
+    ``preload_app``) so torch's thread pools are only started in the workers.
+    """
+
+    if embedding_client is not None:
+        return
+    get_model()
+    if run_forward:
+        _embed_text("warm up")
+
+
+query_cache = EmbeddingCache.from_env()
+shared_query_cache = SharedEmbeddingCache.from_env(model_name=MODEL_KEY)
+embedding_client = EmbeddingClient.from_env()
+# Local inference runs on these threads so threaded workers share one bounded
+# queue in front of the model (fast tokenizers are not safe to share between
+# concurrently running threads).
+inference_executor = BoundedExecutor.from_env("EMBEDDING_EXECUTOR", name="embedding")
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Return a read-only float32 embedding for a search query.
+
+    Lookups go to the per-process LRU first, then the optional host-wide
+    on-disk cache, and only then to the model (or the embedding server when
+    ``EMBEDDING_SERVER_URL`` is set).
+    """
+
+    key = normalise_query(text)
+    with metrics.stage("embed"):
+        cached = query_cache.get(key)
+        metrics.cache_lookup("query_embedding", cached is not None)
+        if cached is not None:
+            return cached
+        return query_cache.put(key, _embed_uncached_query(key))
+
+
+def embed_queries(texts: Sequence[str]) -> list[np.ndarray]:
+    """Batched ``embed_query``: one embedding per text, in input order.
+
+    Cached queries are served from the same caches, and the remaining distinct
+    queries are embedded together in a single padded forward pass (or a
+    single embedding-server request).
+    """
+
+    keys = [normalise_query(text) for text in texts]
+    embeddings: dict[str, np.ndarray] = {}
+    missing: list[str] = []
+    with metrics.stage("embed"):
+        for key in dict.fromkeys(keys):
+            cached = query_cache.get(key)
+            metrics.cache_lookup("query_embedding", cached is not None)
+            if cached is None and shared_query_cache is not None:
+                shared = shared_query_cache.get(key)
+                metrics.cache_lookup("shared_query_embedding", shared is not None)
+                if shared is not None:
+                    cached = query_cache.put(key, shared)
+            if cached is None:
+                missing.append(key)
+            else:
+                embeddings[key] = cached
 
-import torch
-import torch.nn.functional as F
-from torch import Tensor
-from transformers import AutoModel, AutoTokenizer
+        if missing:
+            if embedding_client is not None:
+                computed = embedding_client.embed(missing)
+            elif inference_executor is not None:
+                computed = inference_executor.run(
+                    follow(generate_embeddings), missing, batch_size=len(missing)
+                )
+            else:
+                computed = generate_embeddings(missing, batch_size=len(missing))
+            if shared_query_cache is not None:
+                shared_query_cache.put_many(zip(missing, computed))
+            for key, embedding in zip(missing, computed):
+                embeddings[key] = query_cache.put(key, embedding)
 
+    return [embeddings[key] for key in keys]
 
-def average_pool(last_hidden_states: Tensor, attention_mask: Tensor) -> Tensor:
-    last_hidden = last_hidden_states.masked_fill(~attention_mask[..., None].bool(), 0.0)
-    return last_hidden.sum(dim=1) / attention_mask.sum(dim=1)[..., None]
 
+def _embed_uncached_query(key: str) -> np.ndarray:
+    if shared_query_cache is None:
+        return _compute_query_embedding(key)
 
-tokenizer = AutoTokenizer.from_pretrained("thenlper/gte-base")
-model = AutoModel.from_pretrained("thenlper/gte-base")
+    embedding = shared_query_cache.get(key)
+    metrics.cache_lookup("shared_query_embedding", embedding is not None)
+    if embedding is None:
+        embedding = _compute_query_embedding(key)
+        shared_query_cache.put(key, embedding)
+    return embedding
+
+
+def _compute_query_embedding(text: str) -> np.ndarray:
+    if embedding_client is not None:
+        with metrics.stage("embed_remote"):
+            return embedding_client.embed([text])[0]
+    if inference_executor is not None:
+        return inference_executor.run(follow(_embed_text), text)
+    return _embed_text(text)
 
 
-@cache
 def generate_embedding(text: str) -> str:
-    torch.device(
-        "cuda"
-        if torch.cuda.is_available()
-        else "mps"
-        if torch.backends.mps.is_available()
-        else "cpu"
+    return json.dumps(embed_query(text).tolist())
+
+
+def _embed_text(text: str) -> np.ndarray:
+    tokenizer, backend = get_model()
+    with metrics.stage("tokenize"):
+        inputs = tokenizer(
+            text,
+            truncation=True,
+            max_length=tokenizer.model_max_length,
+            return_tensors="np",
+        )
+    with metrics.stage("forward"):
+        return backend.embed(inputs["input_ids"], inputs["attention_mask"])[0]
+
+
+def generate_embeddings(
+    prompts: Sequence[str],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: EmbeddingBackend | None = None,
+) -> np.ndarray:
+    """Embed many prompts at once, returning an (n, 768) float32 matrix in input order."""
+
+    matrix = np.empty((len(prompts), EMBEDDING_DIM), dtype=np.float32)
+    for indices, batch in iter_embedding_batches(
+        prompts, batch_size=batch_size, backend=backend
+    ):
+        matrix[indices] = batch
+    return matrix
+
+
+def iter_embedding_batches(
+    prompts: Sequence[str],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: EmbeddingBackend | None = None,
+) -> Iterator[tuple[list[int], np.ndarray]]:
+    """Yield ``(indices, embeddings)`` for length-bucketed, padded batches of prompts.
+
+    Prompts are tokenized once, sorted by token count and padded per batch, so
+    each forward pass only pays for the longest sequence in its own bucket.
+    Inputs longer than the model's context window are truncated. ``backend``
+    overrides the configured one (the parity check compares two side by side).
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if not prompts:
+        return
+
+    tokenizer = get_tokenizer()
+    encoded = tokenizer(
+        list(prompts),
+        truncation=True,
+        max_length=tokenizer.model_max_length,
     )
-    inputs = tokenizer(text, return_tensors="pt")
-    outputs = model(**inputs)
-    embedding = average_pool(outputs.last_hidden_state, inputs["attention_mask"])
-    embedding = F.normalize(embedding, p=2, dim=1)
-    embedding_str = json.dumps(embedding.tolist()[0])
-    return embedding_str
+    yield from _iter_token_batches(
+        encoded["input_ids"], batch_size=batch_size, backend=backend
+    )
+
+
+def generate_chunked_embeddings(
+    prompts: Sequence[str],
+    *,
+    overlap: int = DEFAULT_CHUNK_OVERLAP,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: EmbeddingBackend | None = None,
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Embed prompts as overlapping windows of at most the model's context length.
+
+    Returns one ``(vectors, token_counts)`` pair per prompt: a ``(windows, 768)``
+    matrix and the number of prompt tokens each window covers. Short prompts
+    have a single window. The windows of every prompt share the same
+    length-bucketed batches, so per-prompt cost is bounded by its length.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if not prompts:
+        return []
+
+    tokenizer = get_tokenizer()
+    window = tokenizer.model_max_length - tokenizer.num_special_tokens_to_add()
+    if not 0 <= overlap < window:
+        raise ValueError(f"overlap must be between 0 and {window - 1}")
+
+    encoded = tokenizer(list(prompts), add_special_tokens=False)
+    windows: list[list[int]] = []
+    owners: list[int] = []
+    for owner, token_ids in enumerate(encoded["input_ids"]):
+        for start in _window_starts(len(token_ids), window, overlap):
+            windows.append(token_ids[start : start + window])
+            owners.append(owner)
+
+    matrix = np.empty((len(windows), EMBEDDING_DIM), dtype=np.float32)
+    for indices, batch in _iter_token_batches(
+        [tokenizer.build_inputs_with_special_tokens(ids) for ids in windows],
+        batch_size=batch_size,
+        backend=backend,
+    ):
+        matrix[indices] = batch
+
+    counts = np.array([len(ids) for ids in windows], dtype=np.float32)
+    owner_index = np.array(owners)
+    return [
+        (matrix[owner_index == owner], counts[owner_index == owner])
+        for owner in range(len(prompts))
+    ]
+
+
+def pool_chunk_embeddings(vectors: np.ndarray, token_counts: np.ndarray) -> np.ndarray:
+    """Token-weighted mean of window embeddings, L2-normalised like a single vector."""
+
+    pooled = np.average(vectors, axis=0, weights=np.maximum(token_counts, 1))
+    return (pooled / (np.linalg.norm(pooled) or 1.0)).astype(np.float32, copy=False)
+
+
+def _window_starts(length: int, window: int, overlap: int) -> range:
+    if length <= window:
+        return range(0, 1)
+    step = window - overlap
+    # Stop at the first window that reaches the end; it may be shorter.
+    return range(0, length - overlap, step)
+
+
+def _iter_token_batches(
+    input_ids: Sequence[list[int]],
+    *,
+    batch_size: int,
+    backend: EmbeddingBackend | None,
+) -> Iterator[tuple[list[int], np.ndarray]]:
+    tokenizer = get_tokenizer()
+    if backend is None:
+        _, backend = get_model()
+    order = sorted(range(len(input_ids)), key=lambda index: len(input_ids[index]))
+
+    for start in range(0, len(order), batch_size):
+        indices = order[start : start + batch_size]
+        inputs = tokenizer.pad(
+            {"input_ids": [input_ids[index] for index in indices]},
+            padding=True,
+            return_attention_mask=True,
+            return_tensors="np",
+        )
+        yield indices, backend.embed(inputs["input_ids"], inputs["attention_mask"])
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from embedding_backends import DEFAULT_ONNX_PATH
+from embeddings_gen import MODEL_NAME
+
+OPSET_VERSION = 17
+
+
+def export_onnx(output_path: str | Path, *, model_name: str = MODEL_NAME) -> Path:
+    """Export gte-base's encoder to ONNX with dynamic batch and sequence axes.
+
+    Only ``last_hidden_state`` is exported; pooling and normalisation stay in
+    ``embedding_backends`` so every backend shares them.
+    """
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    sample = tokenizer(
+        ["export sample", "a slightly longer export sample"],
+        padding=True,
+        return_tensors="pt",
+    )
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(output),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=OPSET_VERSION,
+        )
+    return output
+
+
+def quantize_onnx(input_path: str | Path, output_path: str | Path) -> Path:
+    """Write a dynamically int8-quantised copy of an exported model."""
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output = Path(output_path)
+    quantize_dynamic(str(input_path), str(output), weight_type=QuantType.QInt8)
+    return output
+
+
+def _quantized_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}-int8{path.suffix}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export gte-base to ONNX for the onnx embedding backend."
+    )
+    parser.add_argument(
+        "--output",
+        default=str(DEFAULT_ONNX_PATH),
+        help=f"Where to write the fp32 model (default: {DEFAULT_ONNX_PATH}).",
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Also write a dynamic int8 copy next to it as <name>-int8.onnx.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    output = export_onnx(args.output)
+    print(f"Wrote {output}.")
+    if args.quantize:
+        quantized = quantize_onnx(output, _quantized_path(output))
+        print(f"Wrote {quantized}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import psycopg2
+from psycopg2.extensions import cursor as Cursor
+
+from database import resolve_connection_kwargs
+from vector_search import (
+    SNAPSHOT_FORMAT,
+    SNAPSHOT_IDS,
+    SNAPSHOT_MANIFEST,
+    SNAPSHOT_MATRIX,
+    SNAPSHOT_POINTER,
+    SNAPSHOT_ROW_OFFSETS,
+    SNAPSHOT_ROWS,
+    InMemoryIndex,
+    SnapshotRows,
+    source_fingerprint,
+)
+
+DEFAULT_SNAPSHOT_DIR = Path("snapshots")
+
+
+def export_snapshot(cur: Cursor, output_dir: str | Path) -> Path:
+    """Write course embeddings and metadata to a versioned on-disk snapshot.
+
+    Metadata goes to ``rows.npy``/``row_offsets.npy`` (see ``SnapshotRows``)
+    rather than the manifest, so workers can memory-map it.
+
+    Each export lands in ``<output_dir>/<content hash>/``, written to a
+    temporary directory and renamed into place, and the ``CURRENT`` pointer is
+    swapped atomically once the files are complete, so running workers never
+    observe a half-written snapshot. Arrays already exported with the same
+    content hash are left alone, since workers may have them memory-mapped;
+    only their manifest is refreshed.
+    """
+
+    output_root = Path(output_dir)
+    fingerprint = source_fingerprint(cur)
+    index = InMemoryIndex.load(cur)
+    rows = SnapshotRows.encode(index.rows)
+    content_hash = _content_hash(index, rows)
+
+    version_dir = output_root / content_hash[:16]
+    if _exported_hash(version_dir) != content_hash:
+        staging_dir = output_root / f".{version_dir.name}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+        np.save(staging_dir / SNAPSHOT_MATRIX, index.matrix)
+        np.save(staging_dir / SNAPSHOT_IDS, index.course_ids)
+        np.save(staging_dir / SNAPSHOT_ROWS, rows.blob)
+        np.save(staging_dir / SNAPSHOT_ROW_OFFSETS, rows.offsets)
+        # Left by an interrupted export; CURRENT never points at it.
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.replace(staging_dir, version_dir)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "content_hash": content_hash,
+        "source_fingerprint": fingerprint,
+        "created_at": int(time.time()),
+        "count": len(index),
+        "dimensions": int(index.matrix.shape[1]) if len(index) else 0,
+        "schools": index.school_ranges,
+    }
+    _write_atomic(version_dir / SNAPSHOT_MANIFEST, json.dumps(manifest))
+    _write_atomic(output_root / SNAPSHOT_POINTER, version_dir.name)
+    return version_dir
+
+
+def _exported_hash(version_dir: Path) -> str | None:
+    try:
+        manifest = json.loads((version_dir / SNAPSHOT_MANIFEST).read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return manifest.get("content_hash")
+
+
+def _content_hash(index: InMemoryIndex, rows: SnapshotRows) -> str:
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(index.matrix).tobytes())
+    digest.update(np.ascontiguousarray(index.course_ids).tobytes())
+    digest.update(rows.blob.tobytes())
+    digest.update(rows.offsets.tobytes())
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(content, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def _connection_kwargs(database_url: str | None) -> dict[str, str]:
+    if database_url:
+        return {"dsn": database_url}
+    return resolve_connection_kwargs()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export course embeddings to a memory-mappable snapshot."
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=str(DEFAULT_SNAPSHOT_DIR),
+        help=f"Snapshot root directory (default: {DEFAULT_SNAPSHOT_DIR}).",
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Optional PostgreSQL DSN to override config/env discovery.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    kwargs = _connection_kwargs(args.database_url)
+    conn = psycopg2.connect(**kwargs)
+    # Read the fingerprint and the rows from one consistent view of the data.
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cur = conn.cursor()
+
+    try:
+        version_dir = export_snapshot(cur, args.output_dir)
+        conn.rollback()
+        print(f"Wrote snapshot {version_dir} and updated {SNAPSHOT_POINTER}.")
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Gunicorn settings picked up automatically from the working directory.
+
+Workers load gte-base before accepting traffic so the first search does not
+pay for the model load. Set ``GUNICORN_PRELOAD=1`` to load the weights once in
+the master and share them with workers copy-on-write instead.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Each worker keeps its own metrics; without a shared file a /metrics scrape
+# reaches one worker at random and its counters look like resets. Pool them in
+# a file for this server (removed on shutdown) unless METRICS_PATH is set. This
+# must happen before the app modules create the metrics registry.
+_default_metrics_path = Path(tempfile.gettempdir()) / (
+    f"semanticsearch-metrics-{os.getpid()}.sqlite"
+)
+os.environ.setdefault("METRICS_PATH", str(_default_metrics_path))
+
+from embeddings_gen import warm_up  # noqa: E402
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+_warm_up_enabled = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+
+def when_ready(server):
+    if preload_app and _warm_up_enabled:
+        # Weights only: starting torch thread pools before fork is unsafe.
+        warm_up(run_forward=False)
+
+
+def post_fork(server, worker):
+    if _warm_up_enabled:
+        warm_up()
+
+
+def on_exit(server):
+    if os.environ["METRICS_PATH"] == str(_default_metrics_path):
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{_default_metrics_path}{suffix}").unlink(missing_ok=True)
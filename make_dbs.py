@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import argparse
-from typing import Iterable, Sequence
+import time
+from typing import Any, Dict, Iterable, Sequence
 
 import psycopg2
 from psycopg2.extensions import connection as Connection
 from psycopg2.extensions import cursor as Cursor
 
-from courses_to_embeddings import make_embeddings_table
-from create_courses_table import make_courses_table
+from courses_to_embeddings import make_embeddings_table, sync_embeddings_table
+from create_courses_table import make_courses_table, sync_courses_table
 from database import resolve_connection_kwargs
+from embeddings_gen import DEFAULT_BATCH_SIZE
+from parallel_embeddings import DEFAULT_SHARD_SIZE, embed_schools_parallel
+from vector_index import add_index_arguments, ensure_index_from_args
 
 
 def add_schools(
@@ -20,7 +24,17 @@ def add_schools(
     drop_courses: bool = True,
     drop_embeddings: bool = True,
     embedding_limit: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bulk: bool = False,
+    incremental: bool = False,
 ) -> tuple[int, int]:
+    """Load each school's catalog and embeddings, committing per school.
+
+    With ``incremental`` courses are upserted by ``(school, subject, number)``
+    and only new or changed courses are re-embedded; the drop and limit
+    options are ignored. Returns the course and embedding rows written.
+    """
+
     total_courses = 0
     total_embeddings = 0
 
@@ -28,30 +42,124 @@ def add_schools(
         school_display = school.upper()
         print(f"Preparing data for {school_display}…")
 
+        if incremental:
+            written = _sync_school(conn, cur, school, batch_size=batch_size, bulk=bulk)
+            total_courses += written[0]
+            total_embeddings += written[1]
+            continue
+
         inserted_courses = make_courses_table(
             conn,
             cur,
             school,
             drop_existing=drop_courses,
+            bulk=bulk,
         )
         conn.commit()
         total_courses += inserted_courses
         print(f"  - Loaded {inserted_courses} course rows")
 
+        started = time.perf_counter()
         generated = make_embeddings_table(
             conn,
             cur,
             school,
             drop_existing=drop_embeddings,
             limit=embedding_limit,
+            batch_size=batch_size,
+            bulk=bulk,
         )
         conn.commit()
+        elapsed = time.perf_counter() - started
         total_embeddings += generated
-        print(f"  - Generated {generated} embeddings")
+        rate = generated / elapsed if elapsed > 0 else 0.0
+        print(
+            f"  - Generated {generated} embeddings in {elapsed:.1f}s ({rate:.1f} courses/s)"
+        )
 
     return total_courses, total_embeddings
 
 
+def add_schools_parallel(
+    conn: Connection,
+    cur: Cursor,
+    connection_kwargs: Dict[str, Any],
+    schools: Sequence[str],
+    *,
+    workers: int,
+    threads_per_worker: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    drop_courses: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bulk: bool = False,
+    incremental: bool = False,
+    resume: bool = False,
+) -> tuple[int, int]:
+    """Load the schools' catalogs, then embed all of them in one sharded process pool.
+
+    ``resume`` skips the course load so the course ids, and with them the
+    shard checkpoints of an interrupted build, stay valid.
+    """
+
+    total_courses = 0
+    if not resume:
+        for school in schools:
+            if incremental:
+                courses = sync_courses_table(cur, school)
+                written = courses.inserted + courses.updated
+            else:
+                written = make_courses_table(
+                    conn, cur, school, drop_existing=drop_courses, bulk=bulk
+                )
+            conn.commit()
+            total_courses += written
+            print(f"  - {school.upper()}: wrote {written} course rows")
+
+    started = time.perf_counter()
+    embedded, skipped = embed_schools_parallel(
+        conn,
+        cur,
+        connection_kwargs,
+        schools,
+        workers=workers,
+        threads_per_worker=threads_per_worker,
+        shard_size=shard_size,
+        batch_size=batch_size,
+        bulk=bulk,
+        only_stale=incremental,
+    )
+    elapsed = time.perf_counter() - started
+    rate = embedded / elapsed if elapsed > 0 else 0.0
+    print(
+        f"  - Generated {embedded} embeddings with {workers} workers in {elapsed:.1f}s "
+        f"({rate:.1f} courses/s, {skipped} checkpointed shards skipped)"
+    )
+    return total_courses, embedded
+
+
+def _sync_school(
+    conn: Connection, cur: Cursor, school: str, *, batch_size: int, bulk: bool
+) -> tuple[int, int]:
+    courses = sync_courses_table(cur, school)
+    conn.commit()
+    print(
+        f"  - Courses: {courses.inserted} new, {courses.updated} changed, "
+        f"{courses.deleted} removed, {courses.unchanged} unchanged"
+    )
+
+    started = time.perf_counter()
+    embedded, unchanged = sync_embeddings_table(
+        conn, cur, school, batch_size=batch_size, bulk=bulk
+    )
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    print(
+        f"  - Re-embedded {embedded} courses in {elapsed:.1f}s, "
+        f"kept {unchanged} unchanged embeddings"
+    )
+    return courses.inserted + courses.updated, embedded
+
+
 def _connection_kwargs(database_url: str | None) -> dict[str, str]:
     if database_url:
         return {"dsn": database_url}
@@ -86,12 +194,68 @@ def parse_args() -> argparse.Namespace:
         type=int,
         help="Generate embeddings for only the first N courses (useful for smoke tests).",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Prompts per embedding forward pass (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Load courses and embeddings with COPY instead of per-row INSERTs.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert courses by (school, subject, number), delete removed ones and "
+        "re-embed only new or changed courses.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Embed in this many processes, sharding every school's courses "
+        "(default: 1, sequential).",
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        help="Intra-op threads per worker (default: CPU cores / workers).",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help=f"Courses per checkpointed shard with --workers (default: {DEFAULT_SHARD_SIZE}).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --workers, skip the course load and finish an interrupted build.",
+    )
+    add_index_arguments(parser)
     parser.add_argument(
         "--yes",
         action="store_true",
         help="Skip the interactive confirmation prompt (use in automation).",
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.workers > 1 or args.resume:
+        unsupported = [
+            flag
+            for flag, value in (
+                ("--limit", args.limit is not None),
+                ("--keep-embeddings", args.keep_embeddings),
+            )
+            if value
+        ]
+        if unsupported:
+            parser.error(
+                f"{' and '.join(unsupported)} cannot be combined with --workers "
+                "or --resume; they only work in sequential builds."
+            )
+    return args
 
 
 def main() -> None:
@@ -103,8 +267,9 @@ def main() -> None:
         raise ValueError("At least one school code must be provided.")
 
     if not args.yes:
+        action = "sync" if args.incremental else "rebuild"
         confirmation = input(
-            "This will rebuild course and embedding tables for "
+            f"This will {action} course and embedding tables for "
             f"{', '.join(code.upper() for code in schools)}. Type 'I'm sure' to continue: "
         )
         if confirmation.strip() != "I'm sure":
@@ -116,14 +281,36 @@ def main() -> None:
     cur = conn.cursor()
 
     try:
-        course_count, embedding_count = add_schools(
-            conn,
-            cur,
-            schools,
-            drop_courses=not args.keep_courses,
-            drop_embeddings=not args.keep_embeddings,
-            embedding_limit=args.limit,
-        )
+        if args.workers > 1 or args.resume:
+            course_count, embedding_count = add_schools_parallel(
+                conn,
+                cur,
+                kwargs,
+                schools,
+                workers=args.workers,
+                threads_per_worker=args.threads_per_worker,
+                shard_size=args.shard_size,
+                drop_courses=not args.keep_courses,
+                batch_size=args.batch_size,
+                bulk=args.bulk,
+                incremental=args.incremental,
+                resume=args.resume,
+            )
+        else:
+            course_count, embedding_count = add_schools(
+                conn,
+                cur,
+                schools,
+                drop_courses=not args.keep_courses,
+                drop_embeddings=not args.keep_embeddings,
+                embedding_limit=args.limit,
+                batch_size=args.batch_size,
+                bulk=args.bulk,
+                incremental=args.incremental,
+            )
+        if ensure_index_from_args(cur, args):
+            conn.commit()
+            print(f"Refreshed {args.index} index on course_embeddings.")
         print(
             "Finished bootstrapping data: "
             f"{course_count} courses, {embedding_count} embeddings for {len(schools)} school(s)."
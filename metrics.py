@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+# Upper bounds in seconds: 0.5 ms (a cache hit) up to 10 s (a cold model load).
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    10.0,
+)
+DEFAULT_FLUSH_INTERVAL = 1.0
+NAMESPACE = "semanticsearch"
+
+HISTOGRAMS = {
+    "request_seconds": "Request latency by endpoint.",
+    "stage_seconds": "Time spent in each stage of handling a request.",
+}
+COUNTERS = {
+    "requests_total": "Requests by endpoint and status code.",
+    "cache_lookups_total": "Cache lookups by cache and result.",
+}
+
+# (sample name, rendered labels, bucket bound or "") -> accumulated value.
+SampleKey = Tuple[str, str, str]
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Metrics:
+    """Latency histograms and counters, optionally pooled across processes.
+
+    Samples accumulate in memory. With ``path`` set, a background thread in
+    each process adds its totals to a SQLite file every ``flush_interval``
+    seconds and ``render`` reads the sums back, so any gunicorn worker answers
+    a scrape for all of them; otherwise the figures cover this process only.
+    Like the shared query cache, the file is opened lazily in each process,
+    and data recorded before a fork is dropped in the child.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        timeout: float = 1.0,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.buckets = tuple(sorted(buckets))
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._pending: Dict[SampleKey, float] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._flusher: Optional[threading.Thread] = None
+        self.errors = 0
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> Metrics:
+        return cls(
+            os.getenv("METRICS_PATH") or None,
+            flush_interval=float(
+                os.getenv("METRICS_FLUSH_INTERVAL", str(DEFAULT_FLUSH_INTERVAL))
+            ),
+        )
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Add ``seconds`` to histogram ``name`` (a key of ``HISTOGRAMS``)."""
+
+        rendered = _render_labels(labels)
+        index = bisect_left(self.buckets, seconds)
+        bound = (
+            _format_value(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+        )
+        with self._lock:
+            self._add((f"{name}_bucket", rendered, bound), 1)
+            self._add((f"{name}_sum", rendered, ""), seconds)
+            self._add((f"{name}_count", rendered, ""), 1)
+        self._start_flusher()
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add ``amount`` to counter ``name`` (a key of ``COUNTERS``)."""
+
+        with self._lock:
+            self._add((name, _render_labels(labels), ""), amount)
+        self._start_flusher()
+
+    def cache_lookup(self, cache: str, hit: bool) -> None:
+        self.increment(
+            "cache_lookups_total", cache=cache, result="hit" if hit else "miss"
+        )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the block as stage ``name``, for the histogram and ``Server-Timing``."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("stage_seconds", elapsed, stage=name)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+    def flush(self) -> None:
+        """Add this process's samples since the last flush to the shared file."""
+
+        if self.path is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self._file_lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany(
+                        "INSERT INTO metric_samples (name, labels, bound, value) "
+                        "VALUES (?, ?, ?, ?) ON CONFLICT (name, labels, bound) "
+                        "DO UPDATE SET value = value + excluded.value",
+                        [(*key, value) for key, value in pending.items()],
+                    )
+                except sqlite3.Error:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+        except sqlite3.Error:
+            # Keep the samples for the next flush rather than lose them.
+            with self._lock:
+                self.errors += 1
+                for key, value in pending.items():
+                    self._add(key, value)
+
+    def samples(self) -> Dict[SampleKey, float]:
+        """Current totals: every process's when shared, else this one's."""
+
+        self.flush()
+        rows: list[tuple[str, str, str, float]] = []
+        if self.path is not None:
+            try:
+                with self._file_lock:
+                    rows = (
+                        self._connect()
+                        .execute(
+                            "SELECT name, labels, bound, value FROM metric_samples"
+                        )
+                        .fetchall()
+                    )
+            except sqlite3.Error:
+                self.errors += 1
+        with self._lock:
+            totals = dict(self._pending)
+        for name, labels, bound, value in rows:
+            key = (name, labels, bound)
+            totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> str:
+        """Prometheus text exposition of ``samples``."""
+
+        totals = self.samples()
+        lines = []
+        for name, help_text in HISTOGRAMS.items():
+            metric = f"{NAMESPACE}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            label_sets = sorted(
+                labels for sample, labels, _ in totals if sample == f"{name}_count"
+            )
+            for labels in label_sets:
+                prefix = f"{labels}," if labels else ""
+                cumulative = 0.0
+                for bound in map(_format_value, self.buckets):
+                    cumulative += totals.get((f"{name}_bucket", labels, bound), 0.0)
+                    lines.append(
+                        f'{metric}_bucket{{{prefix}le="{bound}"}} '
+                        f"{_format_value(cumulative)}"
+                    )
+                count = _format_value(totals[(f"{name}_count", labels, "")])
+                total = _format_value(totals.get((f"{name}_sum", labels, ""), 0.0))
+                lines += [
+                    f'{metric}_bucket{{{prefix}le="+Inf"}} {count}',
+                    f"{_sample(f'{metric}_sum', labels)} {total}",
+                    f"{_sample(f'{metric}_count', labels)} {count}",
+                ]
+        for name, help_text in COUNTERS.items():
+            metric = f"{NAMESPACE}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (sample, labels, _), value in sorted(totals.items()):
+                if sample == name:
+                    lines.append(f"{_sample(metric, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, key: SampleKey, amount: float) -> None:
+        self._pending[key] = self._pending.get(key, 0.0) + amount
+
+    def _start_flusher(self) -> None:
+        # Started on first use rather than in __init__, so each forked worker
+        # gets its own thread and requests never wait on the SQLite lock.
+        if self.path is None or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name="metrics-flush", daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metric_samples (
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    bound TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, labels, bound)
+                )
+                """
+            )
+            self._connection = connection
+        return self._connection
+
+    def _reset_after_fork(self) -> None:
+        # The parent's samples are its own, and its connection and lock must
+        # not cross the fork.
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._pending = {}
+        self._connection = None
+        self._flusher = None
+
+
+def begin_request() -> None:
+    """Start collecting ``Metrics.stage`` timings for the current request."""
+
+    _request_timings.set({})
+
+
+def request_timings() -> Dict[str, float]:
+    """Seconds spent per stage since ``begin_request`` in this context."""
+
+    return dict(_request_timings.get() or {})
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings as a ``Server-Timing`` header value (milliseconds)."""
+
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()
+    )
+
+
+def _render_labels(labels: Dict[str, str]) -> str:
+    return ",".join(
+        f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items())
+    )
+
+
+def _sample(name: str, labels: str) -> str:
+    return f"{name}{{{labels}}}" if labels else name
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+metrics = Metrics.from_env()
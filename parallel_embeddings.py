@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+from tqdm import tqdm
+
+from courses_to_embeddings import (
+    _build_prompt,
+    _ensure_embeddings_table,
+    _iter_embedded_rows,
+    _prompt_hash,
+    _select_course_rows,
+    _select_stale_rows,
+    _write_embeddings,
+)
+from data_version import bump_data_version
+from embeddings_gen import DEFAULT_BATCH_SIZE, MODEL_KEY
+
+DEFAULT_SHARD_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Shard:
+    """A contiguous range of one school's course ids, embedded as one unit.
+
+    ``key`` hashes the ids and prompts in the range, so a checkpoint only
+    matches while the shard's content is unchanged.
+    """
+
+    school: str
+    first_id: int
+    last_id: int
+    count: int
+    key: str
+
+
+def plan_shards(
+    cur: Cursor, schools: Sequence[str], *, shard_size: int = DEFAULT_SHARD_SIZE
+) -> List[Shard]:
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+
+    shards: List[Shard] = []
+    for school in schools:
+        school_key = school.upper()
+        rows = _select_course_rows(cur, school_key)
+        for start in range(0, len(rows), shard_size):
+            chunk = rows[start : start + shard_size]
+            digest = hashlib.sha256(f"{MODEL_KEY}\n{school_key}".encode("utf-8"))
+            for course_id, *fields in chunk:
+                digest.update(f"\n{course_id}:".encode("utf-8"))
+                digest.update(_prompt_hash(_build_prompt(*fields)).encode("ascii"))
+            shards.append(
+                Shard(
+                    school=school_key,
+                    first_id=chunk[0][0],
+                    last_id=chunk[-1][0],
+                    count=len(chunk),
+                    key=digest.hexdigest(),
+                )
+            )
+    return shards
+
+
+def embed_schools_parallel(
+    conn: Connection,
+    cur: Cursor,
+    connection_kwargs: Dict[str, Any],
+    schools: Sequence[str],
+    *,
+    workers: int,
+    threads_per_worker: Optional[int] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bulk: bool = False,
+    only_stale: bool = False,
+) -> tuple[int, int]:
+    """Embed the schools' courses in shards across a pool of worker processes.
+
+    Each worker loads its own model, caps its intra-op threads at
+    ``threads_per_worker`` (by default the cores divided among the workers)
+    and commits every shard over its own connection together with a
+    checkpoint row. Shards already checkpointed with the same content are
+    skipped, so re-running an interrupted build resumes it. Checkpoints are
+    cleared once every shard has finished.
+
+    Returns ``(embedded, skipped_shards)``.
+    """
+
+    school_keys = [school.upper() for school in schools]
+    _ensure_embeddings_table(cur)
+    _ensure_checkpoint_table(cur)
+    shards = plan_shards(cur, school_keys, shard_size=shard_size)
+    cur.execute(
+        """
+        DELETE FROM embedding_build_checkpoints
+        WHERE school = ANY(%s) AND NOT shard_key = ANY(%s)
+        """,
+        (school_keys, [shard.key for shard in shards]),
+    )
+    cur.execute(
+        "SELECT shard_key FROM embedding_build_checkpoints WHERE school = ANY(%s)",
+        (school_keys,),
+    )
+    completed = {key for (key,) in cur.fetchall()}
+    conn.commit()
+
+    pending = [shard for shard in shards if shard.key not in completed]
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    embedded = 0
+    progress = tqdm(
+        total=sum(shard.count for shard in pending),
+        desc=f"Embedding {', '.join(school_keys)} in {len(pending)} shards",
+        unit="course",
+    )
+    # Spawn rather than fork: torch and open connections must not cross a fork.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(connection_kwargs, threads),
+    ) as pool:
+        futures = {
+            pool.submit(
+                _embed_shard,
+                shard,
+                batch_size=batch_size,
+                bulk=bulk,
+                only_stale=only_stale,
+            ): shard
+            for shard in pending
+        }
+        try:
+            for future in as_completed(futures):
+                embedded += future.result()
+                progress.update(futures[future].count)
+        except BaseException:
+            # Finished shards stay checkpointed; drop the queued ones and stop.
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            progress.close()
+
+    cur.execute(
+        "DELETE FROM embedding_build_checkpoints WHERE school = ANY(%s)",
+        (school_keys,),
+    )
+    conn.commit()
+    return embedded, len(shards) - len(pending)
+
+
+_worker_conn: Optional[Connection] = None
+
+
+def _init_worker(connection_kwargs: Dict[str, Any], threads: int) -> None:
+    global _worker_conn
+    # Read by get_model() when the backend loads; the OpenMP variables cover
+    # native libraries that size their pools on import.
+    os.environ["EMBEDDING_THREADS"] = str(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    _worker_conn = psycopg2.connect(**connection_kwargs)
+
+
+def _embed_shard(shard: Shard, *, batch_size: int, bulk: bool, only_stale: bool) -> int:
+    conn = _worker_conn
+    if conn is None:
+        raise RuntimeError(
+            "Shards must run in a pool started by embed_schools_parallel."
+        )
+    id_range = (shard.first_id, shard.last_id)
+    with conn.cursor() as cur:
+        try:
+            if only_stale:
+                rows, _ = _select_stale_rows(cur, shard.school, id_range=id_range)
+            else:
+                rows = _select_course_rows(cur, shard.school, id_range=id_range)
+            if rows:
+                cur.execute(
+                    "DELETE FROM course_embeddings WHERE course_id = ANY(%s)",
+                    ([course_id for course_id, *_ in rows],),
+                )
+                embedded = _iter_embedded_rows(
+                    rows, batch_size=batch_size, progress=tqdm(disable=True)
+                )
+                _write_embeddings(cur, embedded, bulk=bulk)
+                bump_data_version(cur)
+            cur.execute(
+                """
+                INSERT INTO embedding_build_checkpoints
+                    (shard_key, school, first_id, last_id, course_count)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (shard_key) DO NOTHING
+                """,
+                (shard.key, shard.school, shard.first_id, shard.last_id, len(rows)),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(rows)
+
+
+def _ensure_checkpoint_table(cur: Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS embedding_build_checkpoints (
+            shard_key TEXT PRIMARY KEY,
+            school TEXT NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            course_count INTEGER NOT NULL,
+            completed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
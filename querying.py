@@ -1,16 +1,53 @@
 from __future__ import annotations
 
+import os
+import re
+from dataclasses import dataclass
 from decimal import Decimal
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
 
+import numpy as np
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extensions import cursor
 
-from courses_to_embeddings import generate_embedding
+from bulk_load import vector_literal
+from embeddings_gen import embed_queries, embed_query
+from metrics import metrics
+from request_profiler import capture_query
+from response_cache import DEFAULT_VERSION_TTL, DataVersionTracker
+from vector_index import apply_search_params, nearest_hits_sql, shortlist_size
+from vector_search import InMemoryIndex
 
 CourseResult = Dict[str, Any]
 
+# Courses embedded with EMBEDDING_CHUNKING=multi have one row per window, so
+# the scan fetches as many candidate rows per result as the longest course has
+# windows; collapsing them then always leaves enough distinct courses. Other
+# modes write one row per course and fetch no extra rows. The count is re-read
+# as often as the data version, so a reload in another mode is picked up.
+MAX_CHUNKS_SQL = "SELECT coalesce(max(chunk), 0) + 1 FROM course_embeddings"
+_max_chunks = DataVersionTracker(
+    ttl=float(os.getenv("DATA_VERSION_TTL", str(DEFAULT_VERSION_TTL)))
+)
+
+SEARCH_MODES = ("vector", "hybrid")
+# Reciprocal rank fusion constant; 60 is the value from the original paper and
+# keeps a single top rank from drowning out agreement between the lists.
+RRF_K = 60
+HYBRID_MIN_CANDIDATES = 20
+# "CSC 316", "csc316", "COMP-110H": a subject code followed by a course number.
+_COURSE_CODE = re.compile(r"^\s*([A-Za-z]{1,5})\s*[-_ ]?\s*(\d{2,4}[A-Za-z]?)\s*$")
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    """One item of a batch search; ``school`` of ``None`` searches every school."""
+
+    query: str
+    school: Optional[str] = None
+    limit: int = 5
+
 
 def get_most_similar_courses(
     cur: cursor,
@@ -18,13 +55,298 @@ def get_most_similar_courses(
     query: str,
     school: Optional[str] = None,
     limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
 ) -> List[CourseResult]:
-    """Return the most similar courses for a free-text query."""
+    """Return the most similar courses for a free-text query.
+
+    The inner scan orders by the raw cosine distance operator so an HNSW or
+    IVFFlat index on ``course_embeddings.embedding`` can serve it;
+    ``ef_search``/``probes`` trade recall for latency on this query only.
+    Candidate rows are then collapsed to one result per course, scored by its
+    best-matching window.
+    """
+
+    return _nearest_courses(
+        cur,
+        vector_literal(embed_query(query)),
+        school=school,
+        limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+    )
+
+
+def get_similar_to_course(
+    cur: cursor,
+    *,
+    school: str,
+    subject: str,
+    number: str,
+    target_school: Optional[str] = None,
+    limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> Optional[List[CourseResult]]:
+    """Return courses nearest to a stored course's embedding, excluding itself.
+
+    The query vector is read back from ``course_embeddings`` (its first window
+    for multi-vector catalogs), so the model is never invoked. Returns ``None``
+    when the course has no stored embedding.
+    """
+
+    cur.execute(
+        """
+        SELECT c.id, ce.embedding::text
+        FROM courses AS c
+        JOIN course_embeddings AS ce ON ce.course_id = c.id
+        WHERE c.school = %s AND upper(c.subject) = %s AND upper(c.number) = %s
+        ORDER BY ce.chunk
+        LIMIT 1
+        """,
+        (school.upper(), subject.upper(), number.upper()),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    course_id, embedding = row
+
+    return _nearest_courses(
+        cur,
+        embedding,
+        school=target_school,
+        limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+        exclude_course_id=course_id,
+    )
+
+
+def get_most_similar_courses_batch(
+    cur: cursor,
+    queries: Sequence[BatchQuery],
+    *,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> List[List[CourseResult]]:
+    """Run ``get_most_similar_courses`` for many queries in one round trip.
+
+    Every query is embedded in a single batched forward pass, and one statement
+    runs the per-query scan through ``unnest`` and ``LATERAL``, so each inner
+    scan can still use the ANN index. Results are returned in input order.
+    """
+
+    if not queries:
+        return []
+    embeddings = [
+        vector_literal(vector) for vector in embed_queries([q.query for q in queries])
+    ]
+    schools = [q.school.upper() if q.school else None for q in queries]
+    limits = [q.limit for q in queries]
+    factor = candidate_factor(cur)
+    candidates = max(limits) * factor
+    hits = nearest_hits_sql(
+        "q.embedding::vector",
+        where="WHERE q.school IS NULL OR c.school = q.school",
+        limit=f"q.max_results * {factor}",
+    )
+
+    with metrics.stage("sql_execute"):
+        apply_search_params(
+            cur,
+            limit=shortlist_size(candidates),
+            ef_search=ef_search,
+            probes=probes,
+            filtered=any(schools),
+        )
+        cur.execute(
+            f"""
+            SELECT
+                q.ordinal,
+                r.school,
+                r.subject,
+                r.number,
+                r.name,
+                r.description,
+                r.credit_hours,
+                r.cosine_distance
+            FROM unnest(%s::text[], %s::text[], %s::int[])
+                WITH ORDINALITY AS q(embedding, school, max_results, ordinal)
+            CROSS JOIN LATERAL (
+                WITH hits AS ({hits})
+                SELECT
+                    c.school,
+                    c.subject,
+                    c.number,
+                    c.name,
+                    c.description,
+                    c.credit_hours,
+                    min(h.cosine_distance) AS cosine_distance
+                FROM hits AS h
+                JOIN courses AS c ON c.id = h.course_id
+                GROUP BY c.id
+                ORDER BY cosine_distance
+                LIMIT q.max_results
+            ) AS r
+            ORDER BY q.ordinal, r.cosine_distance
+            """,
+            (embeddings, schools, limits),
+        )
+    with metrics.stage("sql_fetch"):
+        rows = cur.fetchall()
+
+    results: List[List[CourseResult]] = [[] for _ in queries]
+    with metrics.stage("row_mapping"):
+        for ordinal, *row in rows:
+            results[ordinal - 1].append(map_row_to_result(row))
+    return results
+
+
+def candidate_factor(cur: cursor) -> int:
+    """Candidate rows to scan per result: the most rows any course has."""
+
+    def load() -> int:
+        cur.execute(MAX_CHUNKS_SQL)
+        return cur.fetchone()[0]
+
+    return _max_chunks.get(load)
 
-    query_embedding = generate_embedding(query)
-    school_filter = sql.SQL("WHERE c.school = %s") if school else sql.SQL("")
+
+def _nearest_courses(
+    cur: cursor,
+    embedding: str,
+    *,
+    school: Optional[str],
+    limit: int,
+    ef_search: Optional[int],
+    probes: Optional[int],
+    exclude_course_id: Optional[int] = None,
+) -> List[CourseResult]:
+    conditions = []
+    params: Dict[str, Any] = {"embedding": embedding, "limit": limit}
+    if school:
+        conditions.append(sql.SQL("c.school = %(school)s"))
+        params["school"] = school.upper()
+    if exclude_course_id is not None:
+        conditions.append(sql.SQL("ce.course_id <> %(exclude_course_id)s"))
+        params["exclude_course_id"] = exclude_course_id
+    where = (
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions)
+        if conditions
+        else sql.SQL("")
+    )
+    params["candidates"] = candidates = limit * candidate_factor(cur)
+    hits = nearest_hits_sql(
+        "%(embedding)s::vector", where="{where}", limit="%(candidates)s"
+    )
 
     statement = sql.SQL(
+        f"""
+        WITH hits AS ({hits})
+        SELECT
+            c.school,
+            c.subject,
+            c.number,
+            c.name,
+            c.description,
+            c.credit_hours,
+            min(h.cosine_distance) AS cosine_distance
+        FROM hits AS h
+        JOIN courses AS c ON c.id = h.course_id
+        GROUP BY c.id
+        ORDER BY cosine_distance
+        LIMIT %(limit)s
+        """
+    ).format(where=where)
+
+    with metrics.stage("sql_execute"):
+        apply_search_params(
+            cur,
+            limit=shortlist_size(candidates),
+            ef_search=ef_search,
+            probes=probes,
+            filtered=school is not None,
+        )
+        cur.execute(statement, params)
+    with metrics.stage("sql_fetch"):
+        rows = cur.fetchall()
+    capture_query(statement, params)
+
+    with metrics.stage("row_mapping"):
+        return [map_row_to_result(row) for row in rows]
+
+
+def get_most_similar_courses_in_memory(
+    index: InMemoryIndex,
+    *,
+    query: str,
+    school: Optional[str] = None,
+    limit: int = 5,
+) -> List[CourseResult]:
+    """Same contract as ``get_most_similar_courses``, answered from ``index``."""
+
+    rows = index.result_rows(embed_query(query), school=school, limit=limit)
+    return [map_row_to_result(row) for row in rows]
+
+
+def get_most_similar_courses_in_memory_batch(
+    index: InMemoryIndex, queries: Sequence[BatchQuery]
+) -> List[List[CourseResult]]:
+    """Same contract as ``get_most_similar_courses_batch``, answered from ``index``."""
+
+    if not queries:
+        return []
+    vectors = np.stack(embed_queries([q.query for q in queries]))
+    batches = index.result_rows_many(
+        vectors, [q.school for q in queries], [q.limit for q in queries]
+    )
+    return [[map_row_to_result(row) for row in rows] for rows in batches]
+
+
+def get_similar_to_course_in_memory(
+    index: InMemoryIndex,
+    *,
+    school: str,
+    subject: str,
+    number: str,
+    target_school: Optional[str] = None,
+    limit: int = 5,
+) -> Optional[List[CourseResult]]:
+    """Same contract as ``get_similar_to_course``, answered from ``index``."""
+
+    rows = index.similar_rows(
+        school, subject, number, target_school=target_school, limit=limit
+    )
+    return None if rows is None else [map_row_to_result(row) for row in rows]
+
+
+def get_course_equivalents(
+    cur: cursor,
+    *,
+    school: str,
+    subject: str,
+    number: str,
+    target_school: Optional[str] = None,
+    limit: int = 10,
+) -> Optional[List[CourseResult]]:
+    """Return a course's precomputed matches from ``course_equivalents``.
+
+    Results are grouped by target school, best match first, with up to
+    ``limit`` per school. Returns ``None`` when the course does not exist.
+    """
+
+    cur.execute(
+        """
+        SELECT id FROM courses
+        WHERE school = %s AND upper(subject) = %s AND upper(number) = %s
+        """,
+        (school.upper(), subject.upper(), number.upper()),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+
+    cur.execute(
         """
         SELECT
             c.school,
@@ -33,29 +355,148 @@ def get_most_similar_courses(
             c.name,
             c.description,
             c.credit_hours,
-            1 - (ce.embedding <=> %s) AS cosine_similarity
-        FROM course_embeddings AS ce
-        JOIN courses AS c ON ce.course_id = c.id
-        {school_filter}
-        ORDER BY cosine_similarity DESC
+            1 - e.similarity AS cosine_distance
+        FROM course_equivalents AS e
+        JOIN courses AS c ON c.id = e.target_course_id
+        WHERE e.source_course_id = %s
+          AND e.rank <= %s
+          AND (%s::text IS NULL OR e.target_school = %s)
+        ORDER BY e.target_school, e.rank
+        """,
+        (row[0], limit, target_school, target_school),
+    )
+    return [map_row_to_result(result) for result in cur.fetchall()]
+
+
+def get_hybrid_courses(
+    cur: cursor,
+    *,
+    query: str,
+    school: Optional[str] = None,
+    limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    vector_search: Optional[Callable[[int], List[CourseResult]]] = None,
+) -> List[CourseResult]:
+    """Fuse full-text and vector rankings, answering course codes without the model.
+
+    A query that is just a course code ("CSC 316") is looked up directly and,
+    when it matches, returned with similarity 1.0. Otherwise the lexical and
+    vector searches each return ``limit`` candidates (at least
+    ``HYBRID_MIN_CANDIDATES``) and are merged with reciprocal rank fusion.
+    ``vector_search`` replaces the pgvector scan, e.g. with the in-memory index.
+    """
+
+    code = parse_course_code(query)
+    if code is not None:
+        matches = find_courses_by_code(
+            cur, subject=code[0], number=code[1], school=school, limit=limit
+        )
+        if matches:
+            return matches
+
+    candidates = max(limit, HYBRID_MIN_CANDIDATES)
+    lexical = get_lexical_courses(cur, query=query, school=school, limit=candidates)
+    if vector_search is None:
+        vector = get_most_similar_courses(
+            cur,
+            query=query,
+            school=school,
+            limit=candidates,
+            ef_search=ef_search,
+            probes=probes,
+        )
+    else:
+        vector = vector_search(candidates)
+    return fuse_rankings([vector, lexical], limit=limit)
+
+
+def get_lexical_courses(
+    cur: cursor, *, query: str, school: Optional[str] = None, limit: int = 5
+) -> List[CourseResult]:
+    """Rank courses by full-text match on ``courses.search_vector`` (no similarity)."""
+
+    school_filter = sql.SQL("AND c.school = %s") if school else sql.SQL("")
+    statement = sql.SQL(
+        """
+        SELECT
+            c.school,
+            c.subject,
+            c.number,
+            c.name,
+            c.description,
+            c.credit_hours,
+            NULL AS cosine_distance
+        FROM courses AS c, websearch_to_tsquery('english', %s) AS q
+        WHERE c.search_vector @@ q {school_filter}
+        ORDER BY ts_rank_cd(c.search_vector, q) DESC, c.id
         LIMIT %s
         """
     ).format(school_filter=school_filter)
 
-    params: tuple[Any, ...]
+    params: tuple[Any, ...] = (query,)
     if school:
-        params = (query_embedding, school.upper(), limit)
-    else:
-        params = (query_embedding, limit)
+        params += (school.upper(),)
+    cur.execute(statement, params + (limit,))
+    return [map_row_to_result(row) for row in cur.fetchall()]
+
+
+def find_courses_by_code(
+    cur: cursor,
+    *,
+    subject: str,
+    number: str,
+    school: Optional[str] = None,
+    limit: int = 5,
+) -> List[CourseResult]:
+    school_filter = sql.SQL("AND school = %s") if school else sql.SQL("")
+    statement = sql.SQL(
+        """
+        SELECT school, subject, number, name, description, credit_hours, 0.0
+        FROM courses
+        WHERE upper(subject) = %s AND upper(number) = %s {school_filter}
+        ORDER BY school
+        LIMIT %s
+        """
+    ).format(school_filter=school_filter)
+
+    params: tuple[Any, ...] = (subject.upper(), number.upper())
+    if school:
+        params += (school.upper(),)
+    cur.execute(statement, params + (limit,))
+    return [map_row_to_result(row) for row in cur.fetchall()]
 
-    cur.execute(statement, params)
-    rows = cur.fetchall()
 
-    return [_map_row_to_result(row) for row in rows]
+def parse_course_code(query: str) -> tuple[str, str] | None:
+    match = _COURSE_CODE.match(query)
+    if match is None:
+        return None
+    return match.group(1).upper(), match.group(2).upper()
 
 
-def _map_row_to_result(row: Iterable[Any]) -> CourseResult:
-    school, subject, number, name, description, credit_hours, similarity = row
+def fuse_rankings(
+    rankings: Sequence[List[CourseResult]], *, limit: int, k: int = RRF_K
+) -> List[CourseResult]:
+    """Merge ranked result lists with reciprocal rank fusion, one entry per course.
+
+    A course keeps the first representation it appears with, so list vector
+    results first to carry their cosine similarity through.
+    """
+
+    scores: Dict[tuple[str, str, str], float] = {}
+    results: Dict[tuple[str, str, str], CourseResult] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            key = (result["school"], result["subject"], result["number"])
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            results.setdefault(key, result)
+
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [results[key] for key in ordered[:limit]]
+
+
+def map_row_to_result(row: Iterable[Any]) -> CourseResult:
+    school, subject, number, name, description, credit_hours, distance = row
     return {
         "school": school,
         "subject": subject,
@@ -63,7 +504,7 @@ def _map_row_to_result(row: Iterable[Any]) -> CourseResult:
         "name": name,
         "description": description,
         "creditHours": _normalise_credit_hours(credit_hours),
-        "similarity": _normalise_similarity(similarity),
+        "similarity": _distance_to_similarity(distance),
     }
 
 
@@ -78,6 +519,11 @@ def _normalise_credit_hours(value: Any) -> str:
     return text
 
 
+def _distance_to_similarity(value: Any) -> float | None:
+    distance = _normalise_similarity(value)
+    return None if distance is None else 1 - distance
+
+
 def _normalise_similarity(value: Any) -> float | None:
     if value is None:
         return None
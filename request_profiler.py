@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import cursor as Cursor
+
+T = TypeVar("T")
+
+PROFILE_HEADER = "X-Profile-Token"
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_MAX_PROFILES = 50
+DEFAULT_INTERVAL = 0.001
+# Stacks keep at most this many innermost frames; the outermost ones (server
+# loop, WSGI plumbing) are dropped first.
+MAX_STACK_DEPTH = 96
+
+_REPO_ROOT = Path(__file__).resolve().parent
+_session: ContextVar[Optional[ProfileSession]] = ContextVar(
+    "profile_session", default=None
+)
+
+
+class SamplingProfiler:
+    """Collect the stacks of selected threads every ``interval`` seconds.
+
+    A background thread reads ``sys._current_frames``, so the profiled code
+    runs unmodified and threads can join and leave while sampling (inference
+    runs on executor threads). Time spent in C extensions is charged to the
+    Python frame that called them.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[Tuple[str, ...]] = Counter()
+        self.samples = 0
+        self._threads: set[int] = set()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def add_thread(self, ident: int) -> None:
+        self._threads.add(ident)
+
+    def remove_thread(self, ident: int) -> None:
+        self._threads.discard(ident)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_stack(frame)] += 1
+                    self.samples += 1
+
+
+class ProfileSession:
+    """One profiled request: its sampler and the vector queries it ran."""
+
+    def __init__(self, *, trigger: str, interval: float) -> None:
+        self.trigger = trigger
+        self.profiler = SamplingProfiler(interval)
+        self.queries: List[Tuple[sql.Composable, Dict[str, Any]]] = []
+        self.started = time.perf_counter()
+        self.closed = False
+
+    def explain(self, cur: Cursor) -> List[Any]:
+        """``EXPLAIN (ANALYZE, BUFFERS)`` every captured query on ``cur``.
+
+        Run this in the request's transaction, so the search settings the
+        query ran with still apply. The query executes a second time.
+        """
+
+        plans: List[Any] = []
+        for statement, params in self.queries:
+            try:
+                cur.execute(
+                    sql.SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ") + statement,
+                    params,
+                )
+                plans.append(cur.fetchone()[0])
+            except psycopg2.Error as exc:
+                plans.append({"error": (exc.pgerror or str(exc)).strip()})
+                break
+        return plans
+
+
+class ProfileStore:
+    """Ring buffer of profiles in a directory, keeping the newest ``max_profiles``.
+
+    Each profile is a JSON report plus the sampled stacks in folded format
+    (``frame;frame;frame count``), which speedscope and flamegraph.pl read.
+    File names sort by time, so every worker can write and prune the same
+    directory.
+    """
+
+    def __init__(
+        self, directory: str | Path, *, max_profiles: int = DEFAULT_MAX_PROFILES
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def write(self, report: Dict[str, Any], stacks: Counter[Tuple[str, ...]]) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns()}-{os.getpid()}"
+        folded = "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common()
+        )
+        (self.directory / f"{name}.folded").write_text(folded, encoding="utf-8")
+        path = self.directory / f"{name}.json"
+        path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+        self._prune()
+        return path
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The newest reports first, without their query plans."""
+
+        reports = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True)[:limit]:
+            try:
+                report = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            report.pop("explain", None)
+            reports.append({"file": path.name, **report})
+        return reports
+
+    def _prune(self) -> None:
+        reports = sorted(self.directory.glob("*.json"))
+        for path in reports[: max(0, len(reports) - self.max_profiles)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+
+class RequestProfiler:
+    """Decides which requests to profile and records them in a ``ProfileStore``.
+
+    Requests are profiled with probability ``sample_rate``, or always when the
+    ``X-Profile-Token`` header carries ``token``. At most one request per
+    process is profiled at a time; others proceed normally.
+    """
+
+    def __init__(
+        self,
+        *,
+        token: str,
+        store: ProfileStore,
+        sample_rate: float = 0.0,
+        interval: float = DEFAULT_INTERVAL,
+        random_source: Callable[[], float] = random.random,
+    ) -> None:
+        if not token:
+            raise ValueError("token must not be empty")
+        self.token = token
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._random = random_source
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional[RequestProfiler]:
+        """Build from ``PROFILE_*`` settings; ``None`` unless ``PROFILE_TOKEN`` is set."""
+
+        token = os.getenv("PROFILE_TOKEN")
+        if not token:
+            return None
+        return cls(
+            token=token,
+            store=ProfileStore(
+                os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR),
+                max_profiles=int(
+                    os.getenv("PROFILE_MAX_FILES", str(DEFAULT_MAX_PROFILES))
+                ),
+            ),
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "1")) / 1000,
+        )
+
+    def authorised(self, presented: str | None) -> bool:
+        return bool(presented) and hmac.compare_digest(
+            presented.encode("utf-8"), self.token.encode("utf-8")
+        )
+
+    def start(self, header: str | None) -> Optional[ProfileSession]:
+        """Begin profiling the current request if it is selected and none is running."""
+
+        if self.authorised(header):
+            trigger = "header"
+        elif self.sample_rate > 0 and self._random() < self.sample_rate:
+            trigger = "sample"
+        else:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+
+        session = ProfileSession(trigger=trigger, interval=self.interval)
+        session.profiler.add_thread(threading.get_ident())
+        session.profiler.start()
+        _session.set(session)
+        return session
+
+    def finish(
+        self,
+        session: ProfileSession,
+        *,
+        cursor: Cursor | None,
+        details: Dict[str, Any],
+    ) -> Path:
+        """Stop sampling, explain the captured queries and write the profile."""
+
+        try:
+            elapsed = time.perf_counter() - session.started
+            session.profiler.stop()
+            _session.set(None)
+            stacks = session.profiler.stacks
+            report = {
+                **details,
+                "trigger": session.trigger,
+                "pid": os.getpid(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "durationMs": elapsed * 1000,
+                "samples": session.profiler.samples,
+                "intervalMs": self.interval * 1000,
+                "packages": _package_shares(stacks),
+                "explain": session.explain(cursor) if cursor is not None else [],
+            }
+            return self.store.write(report, stacks)
+        finally:
+            self.close(session)
+
+    def close(self, session: ProfileSession) -> None:
+        """Stop sampling and let the next request be profiled; safe to repeat.
+
+        ``finish`` calls this itself. Call it too wherever ``finish`` might not
+        be reached, so a failure cannot leave the sampler running.
+        """
+
+        session.profiler.stop()
+        _session.set(None)
+        if not session.closed:
+            session.closed = True
+            self._busy.release()
+
+
+def capture_query(statement: sql.Composable, params: Dict[str, Any]) -> None:
+    """Remember a vector query for ``EXPLAIN`` if this request is being profiled."""
+
+    session = _session.get()
+    if session is not None:
+        session.queries.append((statement, params))
+
+
+def follow(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wrap ``fn`` so the thread running it is sampled with the current request.
+
+    Returns ``fn`` unchanged when no profile is active, so it is free to call
+    on every request. Pair it with an executor that runs tasks in the caller's
+    context.
+    """
+
+    session = _session.get()
+    if session is None:
+        return fn
+
+    @wraps(fn)
+    def sampled(*args: Any, **kwargs: Any) -> T:
+        ident = threading.get_ident()
+        session.profiler.add_thread(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.profiler.remove_thread(ident)
+
+    return sampled
+
+
+def _stack(frame: Any) -> Tuple[str, ...]:
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{_short_path(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages/"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    path = Path(filename)
+    if path.is_relative_to(_REPO_ROOT):
+        return str(path.relative_to(_REPO_ROOT))
+    return filename
+
+
+def _package(frame_name: str) -> str:
+    path, function, _ = frame_name.rsplit(":", 2)
+    if path.endswith("/threading.py") and function == "wait":
+        # A request thread blocked on an executor thread that is sampled too.
+        return "waiting"
+    if "/" not in path and path.endswith(".py"):
+        return "app"
+    head = path.split("/", 1)[0]
+    return "stdlib" if path.startswith("/") or head.startswith("<") else head
+
+
+def _package_shares(stacks: Counter[Tuple[str, ...]]) -> Dict[str, Dict[str, float]]:
+    """Fraction of samples whose leaf frame is in each package, and that include it.
+
+    Repository modules are reported as ``app``, the standard library as
+    ``stdlib`` and threads blocked in ``threading`` waits as ``waiting``;
+    everything else by its top-level installed package.
+    """
+
+    total = sum(stacks.values())
+    if not total:
+        return {}
+    own: Counter[str] = Counter()
+    inclusive: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        packages = [_package(name) for name in stack]
+        own[packages[-1]] += count
+        for package in set(packages):
+            inclusive[package] += count
+    return {
+        package: {"self": own[package] / total, "inclusive": inclusive[package] / total}
+        for package, _ in inclusive.most_common()
+    }
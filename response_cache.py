@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_AGE = 60
+DEFAULT_VERSION_TTL = 5.0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialised JSON responses, bounded by entries and bytes.
+
+    Keys should embed the catalog data version so entries from before a
+    reload are never served; ``max_entries`` of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> ResponseCache:
+        return cls(
+            max_entries=int(
+                os.getenv("RESPONSE_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))
+            ),
+            max_bytes=int(
+                os.getenv("RESPONSE_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))
+            ),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, *, version: int) -> CachedResponse:
+        digest = hashlib.sha1(body, usedforsecurity=False).hexdigest()[:20]
+        entry = CachedResponse(body=body, etag=f"v{version}-{digest}")
+        if not self.enabled or (self.max_bytes and len(body) > self.max_bytes):
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class DataVersionTracker:
+    """Remember the catalog data version for ``ttl`` seconds between lookups.
+
+    Bounds how often each worker asks PostgreSQL whether a loader has run, at
+    the cost of serving pre-reload responses for up to ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = DEFAULT_VERSION_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._checked_at = 0.0
+
+    def get(self, load: Callable[[], int]) -> int:
+        with self._lock:
+            version = self.current()
+            return self.remember(load()) if version is None else version
+
+    def current(self) -> int | None:
+        """The remembered version, or ``None`` once it is older than ``ttl``.
+
+        With ``remember`` this lets callers that cannot block on ``get`` (the
+        ASGI app) load the version their own way and share the TTL logic.
+        """
+
+        if self._version is None or self._clock() - self._checked_at >= self.ttl:
+            return None
+        return self._version
+
+    def remember(self, version: int) -> int:
+        self._version = version
+        self._checked_at = self._clock()
+        return version
@@ -0,0 +1,200 @@
+"""Run both catalog scrapers over the saved pages in ``fixtures/catalog-pages``.
+
+Run from the repository root: ``uv run python -m unittest discover tests``.
+"""
+
+import csv
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from catalog_scraper import (
+    CSV_HEADER,
+    PageCache,
+    PageFetcher,
+    ResumableCsvWriter,
+    scrape,
+)
+from coursedata.ncsu.scraper import SITE as NCSU
+from coursedata.unc.scraper import SITE as UNC
+
+FIXTURES = PageCache(Path(__file__).with_name("fixtures") / "catalog-pages")
+
+UNC_ROWS = [
+    [
+        "AERO",
+        "101",
+        "Foundations of the United States Air Force",
+        "Introduces students to the United States Air Force and its officer corps.",
+        "1",
+    ],
+    [
+        "AERO",
+        "201",
+        "Evolution of USAF Air and Space Power",
+        "Examines general aspects of air and space power through a historical "
+        "perspective.",
+        "1",
+    ],
+    [
+        "ANTH",
+        "101",
+        "General Anthropology",
+        "Human origins, the evolution of culture, and the comparative study of "
+        "societies.",
+        "3",
+    ],
+    [
+        "ANTH",
+        "102",
+        "Introduction to Archaeology",
+        "How archaeologists reconstruct past human lifeways from material remains.",
+        "3",
+    ],
+    [
+        "BIOL",
+        "101",
+        "Principles of Biology",
+        "An introduction to the fundamental principles of biology, from cells to "
+        "ecosystems.",
+        "3",
+    ],
+]
+NCSU_ROWS = [
+    [
+        "ACC",
+        "200",
+        "Accounting Foundations",
+        "Introduction to financial and managerial accounting for non-majors.",
+        "3",
+    ],
+    [
+        "ACC",
+        "210",
+        "Concepts of Financial Accounting",
+        "Measurement and reporting of a business's financial position and results.",
+        "3",
+    ],
+    [
+        "AE",
+        "201",
+        "Introduction to Aerospace Engineering I",
+        "Flight vehicles, the standard atmosphere and basic aerodynamics.",
+        "3",
+    ],
+]
+
+
+def _read_csv(path: Path) -> list[list[str]]:
+    with path.open(newline="", encoding="utf-8") as file:
+        return list(csv.reader(file))
+
+
+class CatalogScraperTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tmp = Path(directory.name)
+        self.requests: list[httpx.Request] = []
+
+    def _client(self, transport: httpx.BaseTransport) -> httpx.Client:
+        def record(request: httpx.Request) -> None:
+            self.requests.append(request)
+
+        client = httpx.Client(transport=transport, event_hooks={"request": [record]})
+        self.addCleanup(client.close)
+        return client
+
+    def _scrape(self, site, fetcher: PageFetcher, output: Path):
+        writer = ResumableCsvWriter(output)
+        try:
+            result = scrape(site, fetcher, writer, concurrency=2, log=lambda _: None)
+        finally:
+            writer.close()
+        return writer, result
+
+    def test_scrapes_fixture_pages_into_csv(self) -> None:
+        for site, expected in ((UNC, UNC_ROWS), (NCSU, NCSU_ROWS)):
+            with self.subTest(site=site.name):
+                output = self.tmp / f"{site.name}.csv"
+                fetcher = PageFetcher(self._client(FIXTURES.transport()))
+
+                writer, result = self._scrape(site, fetcher, output)
+
+                self.assertEqual(result.failed, {})
+                self.assertEqual(result.rows, len(expected))
+                writer.commit()
+                self.assertEqual(_read_csv(output), [list(CSV_HEADER), *expected])
+
+    def test_resumes_after_a_failed_page(self) -> None:
+        fixtures = FIXTURES.transport()
+        failing = "https://catalog.unc.edu/courses/anth/"
+
+        def flaky(request: httpx.Request) -> httpx.Response:
+            if str(request.url) == failing:
+                return httpx.Response(404, request=request)
+            return fixtures.handle_request(request)
+
+        output = self.tmp / "unc.csv"
+        fetcher = PageFetcher(self._client(httpx.MockTransport(flaky)), retries=0)
+        writer, result = self._scrape(UNC, fetcher, output)
+
+        self.assertEqual(list(result.failed), ["Anthropology (ANTH)"])
+        self.assertEqual(writer.done, ["Aerospace Studies (AERO)"])
+        self.assertFalse(output.exists())
+        # Pages after the failure are fetched but not written out of order.
+        self.assertEqual(_read_csv(writer.partial), [list(CSV_HEADER), *UNC_ROWS[:2]])
+
+        self.requests.clear()
+        fetcher = PageFetcher(self._client(fixtures))
+        writer, result = self._scrape(UNC, fetcher, output)
+
+        self.assertEqual(result.failed, {})
+        self.assertEqual(result.rows, 3)
+        self.assertNotIn(
+            "https://catalog.unc.edu/courses/aero/",
+            [str(request.url) for request in self.requests],
+        )
+        writer.commit()
+        self.assertEqual(_read_csv(output), [list(CSV_HEADER), *UNC_ROWS])
+        self.assertFalse(writer.progress.exists())
+
+    def test_unchanged_pages_are_served_from_cache(self) -> None:
+        fixtures = FIXTURES.transport()
+
+        def conditional(request: httpx.Request) -> httpx.Response:
+            etag = f'"{request.url.path}"'
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304, request=request)
+            response = fixtures.handle_request(request)
+            response.headers["ETag"] = etag
+            return response
+
+        cache = PageCache(self.tmp / "cache")
+        fetcher = PageFetcher(
+            self._client(httpx.MockTransport(conditional)), cache=cache
+        )
+        _, first = self._scrape(NCSU, fetcher, self.tmp / "first.csv")
+        self.assertEqual(first.cached_pages, 0)
+        self.assertEqual(
+            cache.get("https://catalog.ncsu.edu/course-descriptions/acc/")[1],
+            {"etag": '"/course-descriptions/acc/"'},
+        )
+
+        self.requests.clear()
+        writer, second = self._scrape(NCSU, fetcher, self.tmp / "second.csv")
+
+        self.assertEqual(second.cached_pages, 2)
+        self.assertTrue(
+            all("if-none-match" in request.headers for request in self.requests)
+        )
+        writer.commit()
+        self.assertEqual(
+            _read_csv(self.tmp / "second.csv"), [list(CSV_HEADER), *NCSU_ROWS]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,634 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Any, Mapping, Sequence
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import cursor as Cursor
+
+from database import resolve_connection_kwargs
+
+INDEX_NAME = "idx_course_embeddings_embedding"
+INDEX_METHODS = ("hnsw", "ivfflat")
+
+DEFAULT_METHOD = "hnsw"
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_EF_SEARCH = 40
+# pgvector rejects larger hnsw.ef_search values.
+MAX_EF_SEARCH = 1000
+DEFAULT_PROBES = 10
+# A school filter is applied to the rows the index returns, so a filtered scan
+# must keep going until enough rows pass it. pgvector >= 0.8 does that with
+# iterative index scans; on older versions the scan is widened by this factor.
+FILTERED_SCAN_FACTOR = 10
+ITERATIVE_SCAN_VERSION = (0, 8)
+EXTENSION_VERSION_SQL = "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+_iterative_scan: bool | None = None
+
+# What the ANN index scans. "vector" orders by the float32 embedding itself;
+# "halfvec" and "bit" keep a generated half-precision or binary-quantized copy
+# of it, index that, and re-rank rerank_factor() times as many shortlisted rows
+# by the full-precision embedding. The float32 column is TOASTed out of line,
+# so compact scans touch far fewer pages.
+STORAGE_MODES = ("vector", "halfvec", "bit")
+DEFAULT_RERANK_FACTORS = {"vector": 1, "halfvec": 2, "bit": 10}
+STORAGE = os.getenv("EMBEDDING_STORAGE", "vector").lower()
+if STORAGE not in STORAGE_MODES:
+    raise ValueError(f"EMBEDDING_STORAGE must be one of: {', '.join(STORAGE_MODES)}")
+_RERANK_OVERRIDE = os.getenv("EMBEDDING_RERANK_FACTOR")
+
+# storage -> (column, type, generating expression, index operator class,
+# distance expression for a query vector)
+_COMPACT_COLUMNS = {
+    "halfvec": (
+        "embedding_halfvec",
+        "halfvec(768)",
+        "embedding::halfvec(768)",
+        "halfvec_cosine_ops",
+        "ce.embedding_halfvec <=> ({vector})::halfvec(768)",
+    ),
+    "bit": (
+        "embedding_bits",
+        "bit(768)",
+        "binary_quantize(embedding)::bit(768)",
+        "bit_hamming_ops",
+        "ce.embedding_bits <~> binary_quantize({vector})::bit(768)",
+    ),
+}
+
+
+def ensure_compact_column(cur: Cursor, storage: str = STORAGE) -> None:
+    """Add the generated compact column that ``storage`` scans, if it has one."""
+
+    if storage == "vector":
+        return
+    column, column_type, expression, *_ = _COMPACT_COLUMNS[storage]
+    cur.execute(
+        sql.SQL(
+            "ALTER TABLE course_embeddings ADD COLUMN IF NOT EXISTS {column} {type} "
+            "GENERATED ALWAYS AS ({expression}) STORED"
+        ).format(
+            column=sql.Identifier(column),
+            type=sql.SQL(column_type),
+            expression=sql.SQL(expression),
+        )
+    )
+
+
+def nearest_hits_sql(
+    vector: str, *, where: str, limit: str, storage: str = STORAGE
+) -> str:
+    """SQL selecting ``(course_id, cosine_distance)`` for the ``limit`` nearest rows.
+
+    ``vector``, ``where`` and ``limit`` are SQL snippets in the caller's
+    placeholder style; ``vector`` and ``limit`` may appear more than once.
+    Compact storage shortlists ``limit * rerank_factor(storage)`` rows through its
+    index, then orders them by exact cosine distance.
+    """
+
+    if storage == "vector":
+        return f"""
+            SELECT ce.course_id, ce.embedding <=> {vector} AS cosine_distance
+            FROM course_embeddings AS ce
+            JOIN courses AS c ON ce.course_id = c.id
+            {where}
+            ORDER BY cosine_distance
+            LIMIT {limit}
+        """
+    compact_distance = _COMPACT_COLUMNS[storage][4].format(vector=vector)
+    return f"""
+            SELECT s.course_id, s.embedding <=> {vector} AS cosine_distance
+            FROM (
+                SELECT ce.course_id, ce.embedding
+                FROM course_embeddings AS ce
+                JOIN courses AS c ON ce.course_id = c.id
+                {where}
+                ORDER BY {compact_distance}
+                LIMIT ({limit}) * {rerank_factor(storage)}
+            ) AS s
+            ORDER BY cosine_distance
+            LIMIT {limit}
+        """
+
+
+def rerank_factor(storage: str = STORAGE) -> int:
+    """Shortlisted rows per result; ``EMBEDDING_RERANK_FACTOR`` overrides compact modes."""
+
+    if storage == "vector":
+        return 1
+    return int(_RERANK_OVERRIDE or DEFAULT_RERANK_FACTORS[storage])
+
+
+def shortlist_size(limit: int, storage: str = STORAGE) -> int:
+    """Rows the ANN index must return for ``limit`` results under ``storage``."""
+
+    return limit * rerank_factor(storage)
+
+
+def ensure_vector_index(
+    cur: Cursor,
+    *,
+    method: str = DEFAULT_METHOD,
+    m: int = DEFAULT_HNSW_M,
+    ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION,
+    lists: int | None = None,
+    rebuild: bool = False,
+    maintenance_work_mem: str | None = None,
+    storage: str = STORAGE,
+) -> bool:
+    """Create or refresh the ANN index that ``storage`` searches.
+
+    That is the cosine index on ``course_embeddings.embedding``, or on its
+    compact copy for ``halfvec``/``bit`` storage (Hamming distance for bits).
+    The index is recreated when the method, column or build options changed. IVFFlat
+    centroids go stale as rows are replaced, so ``rebuild`` reindexes an
+    otherwise matching IVFFlat index; HNSW is maintained incrementally and is
+    left alone. Returns ``True`` when the index was (re)built.
+    """
+
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unknown vector index method: {method}")
+
+    if method == "hnsw":
+        options = {"m": m, "ef_construction": ef_construction}
+    else:
+        options = {"lists": lists or _default_ivfflat_lists(cur)}
+
+    if maintenance_work_mem:
+        cur.execute(
+            "SELECT set_config('maintenance_work_mem', %s, true)",
+            (maintenance_work_mem,),
+        )
+
+    if storage == "vector":
+        column, opclass = "embedding", "vector_cosine_ops"
+    else:
+        ensure_compact_column(cur, storage)
+        column, _, _, opclass, _ = _COMPACT_COLUMNS[storage]
+
+    existing = _describe_index(cur)
+    expected_options = sorted(f"{key}={value}" for key, value in options.items())
+    if existing == (method, expected_options, opclass):
+        if rebuild and method == "ivfflat":
+            cur.execute(sql.SQL("REINDEX INDEX {}").format(sql.Identifier(INDEX_NAME)))
+            return True
+        return False
+
+    drop_vector_index(cur)
+    cur.execute(
+        sql.SQL(
+            "CREATE INDEX {index} ON course_embeddings USING {method} "
+            "({column} {opclass}) WITH ({options})"
+        ).format(
+            index=sql.Identifier(INDEX_NAME),
+            method=sql.SQL(method),
+            column=sql.Identifier(column),
+            opclass=sql.SQL(opclass),
+            options=sql.SQL(", ").join(
+                sql.SQL("{} = {}").format(sql.SQL(key), sql.Literal(value))
+                for key, value in options.items()
+            ),
+        )
+    )
+    cur.execute("ANALYZE course_embeddings")
+    return True
+
+
+def drop_vector_index(cur: Cursor) -> None:
+    cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(INDEX_NAME)))
+
+
+def search_knob(
+    values: Mapping[str, object], key: str, default: int | None
+) -> int | None:
+    """Per-request ``ef_search``/``probes`` from ``values``, clamped to 1-1000.
+
+    Falls back to ``default`` when the key is missing or empty; raises
+    ``TypeError``/``ValueError`` for a non-integer value.
+    """
+
+    raw_value = values.get(key)
+    if raw_value in (None, ""):
+        return default
+    return max(1, min(int(raw_value), MAX_EF_SEARCH))
+
+
+def default_search_knobs() -> tuple[int | None, int | None]:
+    """``VECTOR_EF_SEARCH`` and ``VECTOR_PROBES``; ``None`` where unset."""
+
+    return tuple(
+        int(value) if value else None
+        for value in (os.getenv("VECTOR_EF_SEARCH"), os.getenv("VECTOR_PROBES"))
+    )
+
+
+def search_settings(
+    *,
+    limit: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtered: bool = False,
+    iterative_scan: bool = False,
+) -> dict[str, str]:
+    """pgvector settings for one vector query, as ``{name: value}``.
+
+    HNSW never returns more than ``ef_search`` rows, so it is raised to at least
+    ``limit`` (up to pgvector's maximum of 1000). A ``filtered`` query turns on
+    iterative scans when the server supports them (``iterative_scan``) and
+    otherwise widens ``ef_search``/``probes`` by ``FILTERED_SCAN_FACTOR``.
+    """
+
+    ef_search = min(max(ef_search or DEFAULT_EF_SEARCH, limit), MAX_EF_SEARCH)
+    probes = probes or DEFAULT_PROBES
+    settings = {}
+    if filtered and iterative_scan:
+        settings["hnsw.iterative_scan"] = "strict_order"
+        # IVFFlat only offers relaxed ordering; the callers re-sort the hits.
+        settings["ivfflat.iterative_scan"] = "relaxed_order"
+    elif filtered:
+        ef_search = min(ef_search * FILTERED_SCAN_FACTOR, MAX_EF_SEARCH)
+        probes *= FILTERED_SCAN_FACTOR
+    settings["hnsw.ef_search"] = str(ef_search)
+    settings["ivfflat.probes"] = str(probes)
+    return settings
+
+
+def supports_iterative_scan(cur: Cursor) -> bool:
+    """Whether the installed pgvector has iterative index scans (checked once)."""
+
+    global _iterative_scan
+    if _iterative_scan is None:
+        cur.execute(EXTENSION_VERSION_SQL)
+        row = cur.fetchone()
+        _iterative_scan = has_iterative_scan(row[0] if row else None)
+    return _iterative_scan
+
+
+def has_iterative_scan(extversion: str | None) -> bool:
+    """Whether pgvector ``extversion`` (``None`` if not installed) scans iteratively."""
+
+    if extversion is None:
+        return False
+    version = tuple(int(part) for part in extversion.split(".") if part.isdigit())
+    return version >= ITERATIVE_SCAN_VERSION
+
+
+def apply_search_params(
+    cur: Cursor,
+    *,
+    limit: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtered: bool = False,
+) -> dict[str, str]:
+    """Set per-transaction ANN search knobs for the next vector query.
+
+    See ``search_settings``; returns the settings applied. They are
+    transaction-local and vanish on commit/rollback.
+    """
+
+    settings = search_settings(
+        limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+        filtered=filtered,
+        iterative_scan=filtered and supports_iterative_scan(cur),
+    )
+    cur.execute(
+        "SELECT " + ", ".join(["set_config(%s, %s, true)"] * len(settings)),
+        [item for setting in settings.items() for item in setting],
+    )
+    return settings
+
+
+def add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the shared ``--index``/build-option flags on a loader CLI."""
+
+    parser.add_argument(
+        "--index",
+        choices=(*INDEX_METHODS, "none"),
+        default=DEFAULT_METHOD,
+        help=f"ANN index to maintain on course_embeddings (default: {DEFAULT_METHOD}).",
+    )
+    parser.add_argument(
+        "--hnsw-m",
+        type=int,
+        default=DEFAULT_HNSW_M,
+        help=f"HNSW graph degree (default: {DEFAULT_HNSW_M}).",
+    )
+    parser.add_argument(
+        "--hnsw-ef-construction",
+        type=int,
+        default=DEFAULT_HNSW_EF_CONSTRUCTION,
+        help=f"HNSW build candidate list size (default: {DEFAULT_HNSW_EF_CONSTRUCTION}).",
+    )
+    parser.add_argument(
+        "--ivfflat-lists",
+        type=int,
+        help="IVFFlat list count (default: rows / 1000, at least 10).",
+    )
+
+
+def ensure_index_from_args(cur: Cursor, args: argparse.Namespace) -> bool:
+    if args.index == "none":
+        return False
+    return ensure_vector_index(
+        cur,
+        method=args.index,
+        m=args.hnsw_m,
+        ef_construction=args.hnsw_ef_construction,
+        lists=args.ivfflat_lists,
+        rebuild=True,
+    )
+
+
+def recall_report(
+    cur: Cursor,
+    *,
+    samples: int = 100,
+    k: int = 10,
+    school: str | None = None,
+    ef_search_values: Sequence[int] = (10, 20, 40, 80, 160),
+    probes_values: Sequence[int] = (1, 5, 10, 20, 50),
+) -> dict[str, Any]:
+    """Measure recall@k and latency of the ANN index against an exact scan.
+
+    Query vectors are sampled from stored course embeddings, so no model is
+    needed. Each query runs once with index scans disabled (ground truth) and
+    once per search setting of the index method currently in place. This is
+    done across all schools and again filtered to ``school`` (by default the
+    smallest school, where filtering after the index scan loses the most).
+    """
+
+    method = (_describe_index(cur) or ("none", [], ""))[0]
+    cur.execute(
+        "SELECT embedding::text FROM course_embeddings ORDER BY random() LIMIT %s",
+        (samples,),
+    )
+    query_vectors = [row[0] for row in cur.fetchall()]
+    if school is None:
+        cur.execute(
+            "SELECT school FROM courses GROUP BY school ORDER BY count(*) LIMIT 1"
+        )
+        row = cur.fetchone()
+        school = row[0] if row else None
+
+    if method == "hnsw":
+        knob, values = "ef_search", ef_search_values
+    elif method == "ivfflat":
+        knob, values = "probes", probes_values
+    else:
+        knob, values = None, ()
+
+    report: dict[str, Any] = {
+        "method": method,
+        "storage": STORAGE,
+        "samples": len(query_vectors),
+        "k": k,
+        **_measure_recall(
+            cur, query_vectors, k=k, school=None, knob=knob, values=values
+        ),
+    }
+    if school is not None:
+        report["filtered"] = {
+            "school": school.upper(),
+            "iterativeScan": supports_iterative_scan(cur),
+            **_measure_recall(
+                cur, query_vectors, k=k, school=school, knob=knob, values=values
+            ),
+        }
+    return report
+
+
+def _measure_recall(
+    cur: Cursor,
+    query_vectors: Sequence[str],
+    *,
+    k: int,
+    school: str | None,
+    knob: str | None,
+    values: Sequence[int],
+) -> dict[str, Any]:
+    cur.execute("SET LOCAL enable_indexscan = off")
+    exact_ids, exact_latencies = _run_queries(
+        cur, query_vectors, k=k, school=school, storage="vector"
+    )
+    cur.execute("SET LOCAL enable_indexscan = on")
+
+    measured: dict[str, Any] = {
+        "exact": _latency_summary(exact_latencies),
+        "settings": [],
+    }
+    setting_name = {"ef_search": "hnsw.ef_search", "probes": "ivfflat.probes"}.get(knob)
+    for value in values:
+        applied = apply_search_params(
+            cur, limit=shortlist_size(k), filtered=school is not None, **{knob: value}
+        )
+        approx_ids, latencies = _run_queries(
+            cur, query_vectors, k=k, school=school, storage=STORAGE
+        )
+        recalls = [
+            len(set(approx) & set(exact)) / max(len(exact), 1)
+            for approx, exact in zip(approx_ids, exact_ids)
+        ]
+        measured["settings"].append(
+            {
+                # What the scan ran with: raised to the shortlist size and, for
+                # a widened filtered scan, scaled by FILTERED_SCAN_FACTOR.
+                knob: int(applied[setting_name]),
+                "requested": value,
+                "recall": statistics.fmean(recalls) if recalls else 0.0,
+                "results": statistics.fmean(map(len, approx_ids))
+                if approx_ids
+                else 0.0,
+                **_latency_summary(latencies),
+            }
+        )
+    return measured
+
+
+def _run_queries(
+    cur: Cursor,
+    query_vectors: Sequence[str],
+    *,
+    k: int,
+    school: str | None,
+    storage: str,
+) -> tuple[list[list[int]], list[float]]:
+    school_filter = "WHERE c.school = %(school)s" if school else ""
+    statement = nearest_hits_sql(
+        "%(vector)s::vector", where=school_filter, limit="%(k)s", storage=storage
+    )
+
+    ids: list[list[int]] = []
+    latencies: list[float] = []
+    for vector in query_vectors:
+        params = {
+            "school": school.upper() if school else None,
+            "vector": vector,
+            "k": k,
+        }
+        started = time.perf_counter()
+        cur.execute(statement, params)
+        rows = cur.fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append([row[0] for row in rows])
+    return ids, latencies
+
+
+def _latency_summary(latencies: Sequence[float]) -> dict[str, float]:
+    if not latencies:
+        return {"mean_ms": 0.0, "p95_ms": 0.0}
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {"mean_ms": statistics.fmean(ordered), "p95_ms": p95}
+
+
+def _describe_index(cur: Cursor) -> tuple[str, list[str], str] | None:
+    cur.execute(
+        """
+        SELECT am.amname, COALESCE(cls.reloptions, '{}'), opc.opcname
+        FROM pg_class AS cls
+        JOIN pg_am AS am ON am.oid = cls.relam
+        JOIN pg_index AS ind ON ind.indexrelid = cls.oid
+        JOIN pg_opclass AS opc ON opc.oid = ind.indclass[0]
+        WHERE cls.relname = %s AND cls.relkind = 'i'
+        """,
+        (INDEX_NAME,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    method, reloptions, opclass = row
+    return method, sorted(reloptions), opclass
+
+
+def _default_ivfflat_lists(cur: Cursor) -> int:
+    # pgvector's guidance: rows / 1000 up to 1M rows.
+    cur.execute("SELECT count(*) FROM course_embeddings")
+    (row_count,) = cur.fetchone()
+    return max(10, row_count // 1000)
+
+
+def _connection_kwargs(database_url: str | None) -> dict[str, str]:
+    if database_url:
+        return {"dsn": database_url}
+    return resolve_connection_kwargs()
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    print(
+        f"{report['method']} index ({report['storage']} storage), recall@{report['k']} "
+        f"over {report['samples']} sampled queries"
+    )
+    _print_scope("all schools", report)
+    if "filtered" in report:
+        filtered = report["filtered"]
+        mode = "iterative scan" if filtered["iterativeScan"] else "widened scan"
+        _print_scope(f"school = {filtered['school']} ({mode})", filtered)
+
+
+def _print_scope(scope: str, measured: dict[str, Any]) -> None:
+    print(f"  {scope}")
+    exact = measured["exact"]
+    print(
+        f"    exact scan      mean {exact['mean_ms']:7.2f} ms  p95 {exact['p95_ms']:7.2f} ms"
+    )
+    for setting in measured["settings"]:
+        knob = "ef_search" if "ef_search" in setting else "probes"
+        asked = (
+            f" (asked {setting['requested']})"
+            if setting["requested"] != setting[knob]
+            else ""
+        )
+        print(
+            f"    {f'{knob}={setting[knob]}{asked}':<24} recall {setting['recall']:.3f}  "
+            f"results {setting['results']:5.1f}  "
+            f"mean {setting['mean_ms']:7.2f} ms  p95 {setting['p95_ms']:7.2f} ms"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build the course_embeddings ANN index or report its recall vs. latency."
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Optional PostgreSQL DSN to override config/env discovery.",
+    )
+    add_index_arguments(parser)
+    parser.add_argument(
+        "--maintenance-work-mem",
+        help="Override maintenance_work_mem for the index build (e.g. 1GB).",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="Skip building and print a recall-vs-latency report against an exact scan.",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=100, help="Sampled queries for --report."
+    )
+    parser.add_argument("--k", type=int, default=10, help="Top-k used for recall.")
+    parser.add_argument(
+        "--school",
+        help="School for the filtered part of --report (default: the smallest).",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Emit the --report as JSON."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    conn = psycopg2.connect(**_connection_kwargs(args.database_url))
+    cur = conn.cursor()
+
+    try:
+        if args.report:
+            report = recall_report(
+                cur, samples=args.samples, k=args.k, school=args.school
+            )
+            conn.rollback()
+            if args.json:
+                print(json.dumps(report, indent=2))
+            else:
+                _print_report(report)
+            return
+
+        if args.index == "none":
+            drop_vector_index(cur)
+            conn.commit()
+            print("Dropped course_embeddings ANN index.")
+            return
+
+        started = time.perf_counter()
+        built = ensure_vector_index(
+            cur,
+            method=args.index,
+            m=args.hnsw_m,
+            ef_construction=args.hnsw_ef_construction,
+            lists=args.ivfflat_lists,
+            rebuild=True,
+            maintenance_work_mem=args.maintenance_work_mem,
+        )
+        conn.commit()
+        if built:
+            print(f"Built {args.index} index in {time.perf_counter() - started:.1f}s.")
+        else:
+            print(f"{args.index} index already up to date.")
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, overload
+
+import numpy as np
+from psycopg2.extensions import cursor
+
+from data_version import read_data_version
+
+CourseRow = tuple[str, str, str, str, str, str]
+
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_POINTER = "CURRENT"
+SNAPSHOT_MATRIX = "embeddings.npy"
+SNAPSHOT_IDS = "course_ids.npy"
+SNAPSHOT_ROWS = "rows.npy"
+SNAPSHOT_ROW_OFFSETS = "row_offsets.npy"
+SNAPSHOT_MANIFEST = "manifest.json"
+
+
+class SnapshotRows(Sequence[CourseRow]):
+    """Course rows as JSON arrays in one byte blob, indexed by ``offsets``.
+
+    Row ``i`` is ``blob[offsets[i]:offsets[i + 1]]``. Snapshots memory-map
+    both arrays, so workers share the metadata through the page cache and only
+    decode the rows a search returns.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def encode(cls, rows: Sequence[CourseRow]) -> SnapshotRows:
+        encoded = [json.dumps(list(row)).encode("utf-8") for row in rows]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @overload
+    def __getitem__(self, position: int) -> CourseRow: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> List[CourseRow]: ...
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("row position out of range")
+        start, stop = self.offsets[position], self.offsets[position + 1]
+        return tuple(json.loads(self.blob[start:stop].tobytes()))
+
+
+class InMemoryIndex:
+    """Exact cosine search over every course embedding held in process memory.
+
+    Rows are ordered by school so each school's embeddings occupy one
+    contiguous slice of ``matrix``; a filtered search is a single
+    matrix-vector product over that slice followed by ``argpartition``.
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        rows: Sequence[CourseRow],
+        course_ids: np.ndarray,
+        school_ranges: Dict[str, tuple[int, int]],
+        *,
+        content_hash: Optional[str] = None,
+        source_fingerprint: Optional[str] = None,
+    ) -> None:
+        if matrix.shape[0] != len(rows):
+            raise ValueError("Embedding matrix and course rows must be the same length")
+        self.matrix = matrix
+        self.rows = rows
+        self.course_ids = course_ids
+        self.school_ranges = school_ranges
+        self.content_hash = content_hash
+        self.source_fingerprint = source_fingerprint
+        # Multi-vector (chunked) catalogs hold several rows per course.
+        self.multi_vector = bool(
+            len(course_ids) and np.unique(course_ids).size < len(course_ids)
+        )
+        self._positions: Optional[Dict[tuple[str, str, str], int]] = None
+
+    @classmethod
+    def load(cls, cur: cursor) -> InMemoryIndex:
+        """Read every embedding plus its course metadata from PostgreSQL."""
+
+        cur.execute(
+            """
+            SELECT
+                c.id,
+                c.school,
+                c.subject,
+                c.number,
+                c.name,
+                c.description,
+                c.credit_hours,
+                ce.embedding::text
+            FROM course_embeddings AS ce
+            JOIN courses AS c ON ce.course_id = c.id
+            ORDER BY c.school, c.id, ce.chunk
+            """
+        )
+        records = cur.fetchall()
+
+        rows: List[CourseRow] = []
+        course_ids = np.empty(len(records), dtype=np.int64)
+        vectors: List[np.ndarray] = []
+        for position, (course_id, *metadata, embedding) in enumerate(records):
+            course_ids[position] = course_id
+            rows.append(tuple(metadata))
+            vectors.append(parse_vector(embedding))
+
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        schools = [row[0] for row in rows]
+        return cls(normalise_rows(matrix), rows, course_ids, school_row_ranges(schools))
+
+    @classmethod
+    def from_snapshot(cls, path: str | Path) -> InMemoryIndex:
+        """Open a snapshot written by ``export_snapshot.py`` without copying it.
+
+        ``path`` may be the snapshot root (its ``CURRENT`` pointer is followed)
+        or one version directory. The matrix and course metadata are
+        memory-mapped read-only, so every worker on a host shares the same
+        page-cache pages.
+        """
+
+        directory = resolve_snapshot_dir(path)
+        manifest = json.loads((directory / SNAPSHOT_MANIFEST).read_text("utf-8"))
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format in {directory}")
+
+        matrix = np.load(directory / SNAPSHOT_MATRIX, mmap_mode="r")
+        course_ids = np.load(directory / SNAPSHOT_IDS, mmap_mode="r")
+        rows = SnapshotRows(
+            np.load(directory / SNAPSHOT_ROWS, mmap_mode="r"),
+            np.load(directory / SNAPSHOT_ROW_OFFSETS, mmap_mode="r"),
+        )
+        return cls(
+            matrix,
+            rows,
+            course_ids,
+            {school: tuple(bounds) for school, bounds in manifest["schools"].items()},
+            content_hash=manifest["content_hash"],
+            source_fingerprint=manifest["source_fingerprint"],
+        )
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        *,
+        school: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[tuple[int, float]]:
+        """Return ``(row_position, cosine_similarity)`` pairs, best first.
+
+        Courses with several rows appear once, at their best-scoring row.
+        """
+
+        return self.search_many(query_vector[None, :], [school], [limit])[0]
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        schools: Sequence[Optional[str]],
+        limits: Sequence[int],
+    ) -> List[List[tuple[int, float]]]:
+        """``search`` for each row of ``query_vectors``, with its own school and limit.
+
+        Queries filtered to the same school are scored together with one
+        matrix product against that school's rows.
+        """
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+        groups: Dict[Optional[str], List[int]] = {}
+        for position, school in enumerate(schools):
+            groups.setdefault(school.upper() if school else None, []).append(position)
+
+        results: List[List[tuple[int, float]]] = [[] for _ in schools]
+        for school, positions in groups.items():
+            if school:
+                start, stop = self.school_ranges.get(school, (0, 0))
+            else:
+                start, stop = 0, len(self)
+            if stop <= start:
+                continue
+            scores = queries[positions] @ self.matrix[start:stop].T
+            for row, position in enumerate(positions):
+                results[position] = self._rank(scores[row], start, limits[position])
+        return results
+
+    def _rank(
+        self, scores: np.ndarray, start: int, limit: int
+    ) -> List[tuple[int, float]]:
+        if limit < 1:
+            return []
+        if not self.multi_vector:
+            ordered = _top_k(scores, limit)
+            return [(start + int(index), float(scores[index])) for index in ordered]
+
+        course_ids = self.course_ids[start : start + scores.shape[0]]
+        wanted = limit
+        while True:
+            ordered = _top_k(scores, wanted)
+            _, first = np.unique(course_ids[ordered], return_index=True)
+            if first.size >= limit or wanted >= scores.shape[0]:
+                break
+            wanted *= 2
+        best = ordered[np.sort(first)][:limit]
+        return [(start + int(index), float(scores[index])) for index in best]
+
+    def position_of(self, school: str, subject: str, number: str) -> Optional[int]:
+        """Row position of a course's (first) embedding, by its natural key."""
+
+        if self._positions is None:
+            positions: Dict[tuple[str, str, str], int] = {}
+            for position, row in enumerate(self.rows):
+                key = (row[0].upper(), row[1].upper(), row[2].upper())
+                positions.setdefault(key, position)
+            self._positions = positions
+        return self._positions.get((school.upper(), subject.upper(), number.upper()))
+
+    def similar_rows(
+        self,
+        school: str,
+        subject: str,
+        number: str,
+        *,
+        target_school: Optional[str] = None,
+        limit: int = 5,
+    ) -> Optional[List[tuple[Any, ...]]]:
+        """Rows nearest to a stored course's embedding, excluding the course itself.
+
+        Returns ``None`` when the course is not in the index.
+        """
+
+        position = self.position_of(school, subject, number)
+        if position is None:
+            return None
+        own_id = self.course_ids[position]
+        hits = self.search(self.matrix[position], school=target_school, limit=limit + 1)
+        return [
+            (*self.rows[hit], 1 - similarity)
+            for hit, similarity in hits
+            if self.course_ids[hit] != own_id
+        ][:limit]
+
+    def result_rows(
+        self, query_vector: np.ndarray, *, school: Optional[str] = None, limit: int = 5
+    ) -> List[tuple[Any, ...]]:
+        """Search and return rows shaped like the SQL path's result rows."""
+
+        return [
+            (*self.rows[position], 1 - similarity)
+            for position, similarity in self.search(
+                query_vector, school=school, limit=limit
+            )
+        ]
+
+    def result_rows_many(
+        self,
+        query_vectors: np.ndarray,
+        schools: Sequence[Optional[str]],
+        limits: Sequence[int],
+    ) -> List[List[tuple[Any, ...]]]:
+        """``result_rows`` for a batch of queries, via ``search_many``."""
+
+        return [
+            [(*self.rows[position], 1 - similarity) for position, similarity in hits]
+            for hits in self.search_many(query_vectors, schools, limits)
+        ]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first."""
+
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def source_fingerprint(cur: cursor) -> str:
+    """Cheap token that changes whenever the embeddings table is reloaded.
+
+    Loaders delete and re-insert rows, so the SERIAL ``id`` high-water mark
+    moves on every rebuild even when the row count does not. The data version
+    covers incremental syncs that only touch course metadata.
+    """
+
+    cur.execute("SELECT count(*), COALESCE(max(id), 0) FROM course_embeddings")
+    count, max_id = cur.fetchone()
+    return f"{count}:{max_id}:{read_data_version(cur)}"
+
+
+def resolve_snapshot_dir(path: str | Path) -> Path:
+    directory = Path(path)
+    pointer = directory / SNAPSHOT_POINTER
+    if pointer.is_file():
+        return directory / pointer.read_text("utf-8").strip()
+    return directory
+
+
+def parse_vector(text: str) -> np.ndarray:
+    """Parse pgvector's ``[x,y,...]`` text form into a float32 array."""
+
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+
+def normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise rows into a fresh contiguous float32 matrix."""
+
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def school_row_ranges(schools: Sequence[str]) -> Dict[str, tuple[int, int]]:
+    """Map each school to its ``[start, stop)`` range in school-sorted rows."""
+
+    ranges: Dict[str, tuple[int, int]] = {}
+    for position, school in enumerate(schools):
+        start, _ = ranges.get(school, (position, position))
+        ranges[school] = (start, position + 1)
+    return ranges
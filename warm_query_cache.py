@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from embedding_cache import (
+    DEFAULT_SHARED_MAX_ENTRIES,
+    SharedEmbeddingCache,
+    normalise_query,
+)
+from embeddings_gen import DEFAULT_BATCH_SIZE, MODEL_KEY, generate_embeddings
+
+
+def warm_shared_cache(
+    cache: SharedEmbeddingCache,
+    queries: Iterable[str],
+    *,
+    top: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> tuple[int, int]:
+    """Embed the most frequent logged queries missing from ``cache``.
+
+    Returns ``(distinct_queries, newly_embedded)``.
+    """
+
+    counts = Counter(normalise_query(query) for query in queries)
+    counts.pop("", None)
+    candidates = [query for query, _ in counts.most_common(top)]
+    missing = [query for query in candidates if not cache.contains(query)]
+
+    for start in range(0, len(missing), batch_size * 8):
+        chunk = missing[start : start + batch_size * 8]
+        embeddings = generate_embeddings(chunk, batch_size=batch_size)
+        cache.put_many(zip(chunk, embeddings))
+    cache.evict()
+
+    return len(candidates), len(missing)
+
+
+def iter_logged_queries(path: Path) -> Iterator[str]:
+    """Yield queries from a log with one query per line or JSON lines with ``query``."""
+
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield line
+                    continue
+                query = record.get("query")
+                if isinstance(query, str):
+                    yield query
+            else:
+                yield line
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Pre-warm the shared on-disk query embedding cache from a query log."
+    )
+    parser.add_argument(
+        "log", help="Query log: plain lines or JSON lines with 'query'."
+    )
+    parser.add_argument(
+        "--cache-path",
+        required=True,
+        help="SQLite cache file (the value of QUERY_CACHE_PATH on the app hosts).",
+    )
+    parser.add_argument(
+        "--top", type=int, help="Only warm the N most frequent queries."
+    )
+    default_max_entries = int(
+        os.getenv("QUERY_CACHE_SHARED_MAX_ENTRIES", str(DEFAULT_SHARED_MAX_ENTRIES))
+    )
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=default_max_entries,
+        help="Entries the cache is trimmed to, as QUERY_CACHE_SHARED_MAX_ENTRIES "
+        f"on the app hosts (default: {default_max_entries}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Prompts per forward pass (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = SharedEmbeddingCache(
+        args.cache_path, model_name=MODEL_KEY, max_entries=args.max_entries
+    )
+    distinct, embedded = warm_shared_cache(
+        cache,
+        iter_logged_queries(Path(args.log)),
+        top=args.top,
+        batch_size=args.batch_size,
+    )
+    print(
+        f"Warmed {args.cache_path}: {embedded} new embeddings for {distinct} distinct queries."
+    )
+
+
+if __name__ == "__main__":
+    main()